@@ -0,0 +1,108 @@
+"""
+Measures the memory allocated by the parsing of the reports with tracemalloc.
+
+    python -m benchmarks.allocations <dir with reports> [--top N]
+
+The reports are parsed one by one without the block cache. For every report the peak of
+the traced memory, the number of the memory blocks allocated by the parser modules
+which are still alive after the parsing and the number of the objects of the report items
+constructed by the parsing are taken. The short-lived objects are freed before a snapshot,
+so they are counted by the calls of their constructors.
+Run it on two revisions to compare them.
+"""
+import argparse
+import cProfile
+import pstats
+import statistics
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Tuple
+
+from src.report_builder import ReportBuilder
+from src.util import paths
+from src.util.paths import Extension
+
+# the allocations of the other modules (pdfminer, the standard library) are not counted
+_PARSER_FILES = ("*/src/report.py", "*/src/report_item.py", "*/src/util/collections.py",
+                 "*/src/file_process.py")
+_ITEMS_FILE = "report_item.py"
+
+
+def count_item_constructions(profiler: cProfile.Profile) -> int:
+    calls_num = 0
+    for (file_name, _, function_name), call_stats in pstats.Stats(profiler).stats.items():
+        if file_name.endswith(_ITEMS_FILE) and function_name == "__init__":
+            calls_num += call_stats[1]
+    return calls_num
+
+
+def trace_report(report_builder: ReportBuilder, path: Path) -> Tuple[int, int, int, list]:
+    """
+    Parse the report under the tracing
+    :return: the peak of the traced memory in bytes, the number of the alive memory blocks
+    allocated by the parser, the number of the constructed report item objects
+    and the statistics of the parser allocations by lines
+    """
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        profiler.enable()
+        report = report_builder.build(path, complete=True)
+        profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        profiler.disable()
+        tracemalloc.stop()
+    parser_filters = [tracemalloc.Filter(True, file_pattern) for file_pattern in _PARSER_FILES]
+    line_stats = snapshot.filter_traces(parser_filters).statistics("lineno")
+    del report
+    return (peak, sum(stat.count for stat in line_stats), count_item_constructions(profiler),
+            line_stats)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("reports_dir", type=Path)
+    arg_parser.add_argument("--top", type=int, default=10,
+                            help="the number of the parser lines allocating the most blocks")
+    args = arg_parser.parse_args()
+    reports_paths = sorted(paths.collect_dir_content_by_extension(args.reports_dir,
+                                                                  Extension.PDF))
+    if not reports_paths:
+        sys.exit("No reports in %s" % args.reports_dir)
+    report_builder = ReportBuilder()
+    peaks = []
+    blocks_nums = []
+    constructions_nums = []
+    counts_by_lines = {}
+    for path in reports_paths:
+        try:
+            peak, blocks_num, constructions_num, line_stats = trace_report(report_builder, path)
+        except Exception as err:
+            print("%s: %s" % (path.name, err), file=sys.stderr)
+            continue
+        peaks.append(peak)
+        blocks_nums.append(blocks_num)
+        constructions_nums.append(constructions_num)
+        for stat in line_stats:
+            line = str(stat.traceback[0])
+            counts_by_lines[line] = counts_by_lines.get(line, 0) + stat.count
+    if not peaks:
+        sys.exit("No report has been parsed")
+    print("%d reports parsed" % len(peaks))
+    print("peak memory per report, KiB: median %.1f, max %.1f"
+          % (statistics.median(peaks) / 1024, max(peaks) / 1024))
+    print("parser memory blocks per report: median %d, max %d, total %d"
+          % (statistics.median(blocks_nums), max(blocks_nums), sum(blocks_nums)))
+    print("report item objects constructed per report: median %d, max %d, total %d"
+          % (statistics.median(constructions_nums), max(constructions_nums),
+             sum(constructions_nums)))
+    top_lines = sorted(counts_by_lines.items(), key=lambda item: item[1], reverse=True)
+    for line, count in top_lines[:args.top]:
+        print("%10d  %s" % (count, line))
+
+
+if __name__ == '__main__':
+    main()
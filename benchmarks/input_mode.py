@@ -0,0 +1,78 @@
+"""
+Compares the buffered and the memory-mapped reading of the reports on cold and warm page caches.
+
+    python -m benchmarks.input_mode <dir with reports> [--repeat N]
+
+The page cache is dropped for every report with posix_fadvise before a cold pass.
+It is a hint the kernel may not fully follow, e.g. for dirty pages or some network mounts,
+so drop the caches of the whole system (echo 3 > /proc/sys/vm/drop_caches) for exact numbers.
+"""
+import argparse
+import os
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, List
+
+from src.file_process import InputMode, ReportFileProcessor
+from src.util import paths
+from src.util.paths import Extension
+
+
+def drop_page_cache(path: Path):
+    with open(str(path), "rb") as raw_file:
+        os.posix_fadvise(raw_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def warm_page_cache(path: Path):
+    with open(str(path), "rb") as raw_file:
+        while raw_file.read(1024 ** 2):
+            pass
+
+
+def time_pass(reports_paths: List[Path], input_mode: InputMode,
+              prepare: Callable[[Path], None]) -> List[float]:
+    timings = []
+    for path in reports_paths:
+        prepare(path)
+        start = perf_counter()
+        try:
+            ReportFileProcessor(path, input_mode=input_mode)
+        except Exception as err:
+            print("%s: %s" % (path.name, err), file=sys.stderr)
+            continue
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("reports_dir", type=Path)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    reports_paths = sorted(paths.collect_dir_content_by_extension(args.reports_dir,
+                                                                  Extension.PDF))
+    if not reports_paths:
+        sys.exit("No reports in %s" % args.reports_dir)
+    caches = [("cold", drop_page_cache), ("warm", warm_page_cache)]
+    if not hasattr(os, "posix_fadvise"):
+        print("posix_fadvise is not available, the cold passes are skipped", file=sys.stderr)
+        caches = caches[1:]
+    print("%d reports, %d passes each" % (len(reports_paths), args.repeat))
+    print("%-5s %-9s %10s %10s %10s" % ("cache", "mode", "total, s", "median, ms", "max, ms"))
+    for cache_name, prepare in caches:
+        for input_mode in InputMode:
+            totals = []
+            timings = []
+            for _ in range(args.repeat):
+                pass_timings = time_pass(reports_paths, input_mode, prepare)
+                totals.append(sum(pass_timings))
+                timings.extend(pass_timings)
+            print("%-5s %-9s %10.3f %10.2f %10.2f"
+                  % (cache_name, input_mode.value, min(totals),
+                     statistics.median(timings) * 1000, max(timings) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import pickle
+import zlib
+from pathlib import Path
+from shutil import rmtree
+from typing import Union
+
+from src.file_process import (BlockStore, InputMode, ReportFileProcessor, ReportSpace,
+                              SpaceTableDetector)
+from src.profiling import PROFILER
+from src.util import buffers
+from src.util import paths
+from src.util.buffers import Buffer
+
+_ENTRY_SUFFIX = ".blocks"
+_TEMP_SUFFIX = ".tmp"
+_COMPRESSION_LEVEL = 6
+# share of the size limit the cache is trimmed to once the limit is exceeded
+_EVICTION_RATIO = 0.9
+
+
+class BlockCache(object):
+    """
+    Persistent cache of the blocks extracted from the reports.
+    Entries are keyed by a hash of the report bytes and grouped by the version of the layout
+    coordinates, so that moving any report space makes the whole previous generation stale.
+    The size limit is approximate while several processes write to the same cache.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], size_limit: int,
+                 layout_version: str = None):
+        if layout_version is None:
+            layout_version = ReportSpace.version()
+        cache_dir = Path(cache_dir)
+        self.__dir = Path(cache_dir, layout_version)
+        self.__size_limit = size_limit
+        self.__size = None
+        paths.create_dir(self.__dir)
+        BlockCache.__remove_outdated_generations(cache_dir, layout_version)
+
+    @property
+    def dir(self) -> Path:
+        return self.__dir
+
+    @property
+    def size_limit(self) -> int:
+        return self.__size_limit
+
+    @staticmethod
+    def digest(content: Buffer) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def extract_blocks(self, source: Union[str, Path, Buffer],
+                       space_table_detector: SpaceTableDetector = None,
+                       input_mode: InputMode = InputMode.BUFFERED) -> BlockStore:
+        """
+        Load the blocks of the report from the cache or extract and cache them on a miss
+        :param source: a path of the report or its content
+        :param space_table_detector: a detector of the report layout used on a miss
+        :param input_mode: the way the report file is read
+        :return: the blocks of the report
+        """
+        if not isinstance(source, (str, Path)):
+            return self.__extract_content_blocks(source, space_table_detector)
+        if input_mode == InputMode.MAPPED:
+            with buffers.map_file(source) as content:
+                return self.__extract_content_blocks(content, space_table_detector)
+        with open(str(source), "rb") as raw_file:
+            content = raw_file.read()
+        return self.__extract_content_blocks(content, space_table_detector)
+
+    def __extract_content_blocks(self, content: Buffer,
+                                 space_table_detector: SpaceTableDetector) -> BlockStore:
+        digest = BlockCache.digest(content)
+        blocks = self.load(digest)
+        if blocks is None:
+            blocks = ReportFileProcessor(content, space_table_detector).blocks
+            self.store(digest, blocks)
+        return blocks
+
+    @PROFILER.timed("block_cache.load")
+    def load(self, digest: str) -> Union[None, BlockStore]:
+        entry_path = self.__get_entry_path(digest)
+        try:
+            with open(str(entry_path), "rb") as entry_file:
+                data = entry_file.read()
+            # the modification time orders the entries for the eviction
+            os.utime(str(entry_path))
+        except OSError:
+            return None
+        try:
+            return pickle.loads(zlib.decompress(data))
+        except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            BlockCache.__remove_entry(entry_path)
+            return None
+
+    @PROFILER.timed("block_cache.store")
+    def store(self, digest: str, blocks: BlockStore):
+        data = zlib.compress(pickle.dumps(blocks, pickle.HIGHEST_PROTOCOL), _COMPRESSION_LEVEL)
+        entry_path = self.__get_entry_path(digest)
+        temp_path = entry_path.with_suffix("%s.%d%s" % (_ENTRY_SUFFIX, os.getpid(), _TEMP_SUFFIX))
+        with open(str(temp_path), "wb") as temp_file:
+            temp_file.write(data)
+        # the entry appears atomically, so concurrent readers never see a partial one
+        os.replace(str(temp_path), str(entry_path))
+        if self.__size is None:
+            self.__size = self.__calc_size()
+        else:
+            self.__size += len(data)
+        if self.__size > self.__size_limit:
+            self.__evict()
+
+    def __get_entry_path(self, digest: str) -> Path:
+        return Path(self.__dir, digest).with_suffix(_ENTRY_SUFFIX)
+
+    def __list_entries(self):
+        entries = []
+        for entry_path in paths.collect_dir_content_by_pattern(self.__dir, "*" + _ENTRY_SUFFIX):
+            try:
+                entry_stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+        return entries
+
+    def __calc_size(self) -> int:
+        return sum(size for _, size, _ in self.__list_entries())
+
+    def __evict(self):
+        entries = sorted(self.__list_entries())
+        size = sum(size for _, size, _ in entries)
+        target_size = self.__size_limit * _EVICTION_RATIO
+        for _, entry_size, entry_path in entries:
+            if size <= target_size:
+                break
+            BlockCache.__remove_entry(entry_path)
+            size -= entry_size
+        self.__size = size
+
+    @staticmethod
+    def __remove_entry(entry_path: Path):
+        try:
+            os.remove(str(entry_path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def __remove_outdated_generations(cache_dir: Path, layout_version: str):
+        for generation_dir in cache_dir.iterdir():
+            if generation_dir.is_dir() and generation_dir.name != layout_version:
+                rmtree(str(generation_dir), ignore_errors=True)
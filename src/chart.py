@@ -1,5 +1,9 @@
+import queue
+import signal
+from multiprocessing import Pipe, Process, Queue
+from multiprocessing.connection import Connection
 from pathlib import Path
-from typing import List, Iterable, Tuple, Callable, Any
+from typing import Any, Iterable, Iterator, List, Tuple, Union
 from datetime import timedelta as TimeDelta
 from datetime import datetime
 
@@ -7,8 +11,9 @@ import numpy as np
 from matplotlib import pyplot, dates
 
 from src.patient import Patient
+from src.profiling import PROFILER
 from src.report_logging import LOGGER
-from src.util import paths
+from src.util import paths, time_util as tutil
 from src.util.paths import Extension
 
 _DATE_FORMAT = "%d.%m.%Y"
@@ -31,6 +36,11 @@ def get_default_datetimes():
 
 
 DEFAULT_TIMES = get_default_datetimes()
+_DEFAULT_TIME_INDICES = {dt: i for i, dt in enumerate(DEFAULT_TIMES)}
+# the times of the day of the default times in minutes
+_DEFAULT_TIMES_OF_DAY = [tutil.calc_minutes_of_day(dt) for dt in DEFAULT_TIMES]
+# systolic and diastolic blood pressures and heart rates
+_VALUES_NUM = 3
 
 plt = pyplot
 
@@ -39,12 +49,26 @@ _FIGURE_SIZE_KEY = "figure.figsize"
 
 plt.rcParams[_FIGURE_SIZE_KEY] = 20, 16  # in inches
 
+# the time a patient waits to be sent to the renderer before it is checked to be alive
+_RENDERER_POLL_INTERVAL = 1
+
+
+# the times of the measurements among the default times with the systolic and diastolic
+# blood pressures and the heart rates at them
+NormalizedValues = Tuple[List[datetime], List[int], List[int], List[int]]
+
 
 class IncompleteDataError(Exception):
     pass
 
 
 class PatientChart(object):
+    """
+    Running aggregates of the patients grouped by their phenotypes: the sizes of the groups
+    and the sums of the normalized values the average plot is drawn from.
+    The common plot shows the values of every patient, so they are drawn onto its figure
+    as the patients are added instead of being kept by the chart.
+    """
 
     _saves_counter = 1
 
@@ -56,189 +80,270 @@ class PatientChart(object):
     _TIME_FORMAT = "%H:%M"
     _DATETIME_FORMAT = "%s %s" % (_DATE_FORMAT, _TIME_FORMAT)
 
-    def __init__(self, patients: List[Patient]):
-        groups = PatientChart._group_patients_by_blood_pressure_phenotype(patients)
-        self.__groups = groups
-        self.__sizes_of_groups = [len(group) for group in groups]
+    _NUMBER_OF_PHENOTYPES = 6
+    _ROWS_NUM = 2
+    _COLUMNS_NUM = 3
 
-    @property
-    def groups(self) -> List[List[Patient]]:
-        return self.__groups
+    def __init__(self, patients: Iterable[Patient] = ()):
+        groups_num = PatientChart._NUMBER_OF_PHENOTYPES + 1
+        self.__sizes_of_groups = [0 for _ in range(groups_num)]
+        # running sums of the normalized values over the default times for the average plot
+        self.__values_sums = np.zeros((groups_num, _VALUES_NUM, len(DEFAULT_TIMES)))
+        self.__values_counts = np.zeros((groups_num, len(DEFAULT_TIMES)), dtype=np.int64)
+        # the figure of the common plot is created with the first patient drawn on it
+        self.__common_figure = None
+        self.__common_axes_array = None
+        self.__drawn_groups = np.zeros(groups_num, dtype=bool)
+        self.add_patients(patients)
 
     @property
     def sizes_of_groups(self) -> List[int]:
         return self.__sizes_of_groups
 
-    def save_figures(self, basic_output_dir: Path, basic_name: str):
-        self.save_common_figure(basic_output_dir, basic_name)
-        self.save_avg_figure(basic_output_dir, basic_name)
-
-    def save_common_figure(self, basic_output_dir: Path, basic_name: str):
-        self.__save_figure(basic_output_dir, "%s_%s" % (basic_name, "common"),
-                           self.__draw_common_plot)
-
-    def save_avg_figure(self, basic_output_dir: Path, basic_name: str):
-        self.__save_figure(basic_output_dir, "%s_%s" % (basic_name, "avg"),
-                           self.__draw_avg_plot)
-
-    def __save_figure(self, basic_output_dir: Path,
-                      basic_name: str, drawer: Callable[['PatientChart', int, Any], None]):
-        rows_num = 2
-        columns_num = 3
-        figure, axes_array = plt.subplots(rows_num, columns_num, sharex=True, sharey=True)
-        for i in range(rows_num):
-            for j in range(columns_num):
-                group_index = j + i * columns_num + 1
-                axes = axes_array[i, j]
-                drawer(group_index, axes)
-                axes.grid()
-                x_major_lct = dates.AutoDateLocator(minticks=2, maxticks=10,
-                                                    interval_multiples=True)
-                x_minor_lct = dates.HourLocator(byhour=range(0, 25, 1))
-                x_fmt = dates.AutoDateFormatter(x_major_lct)
-                axes.xaxis.set_major_locator(x_major_lct)
-                axes.xaxis.set_minor_locator(x_minor_lct)
-                axes.xaxis.set_major_formatter(x_fmt)
-                for label in axes.get_xmajorticklabels():
-                    label.set_rotation(30)
-                    label.set_horizontalalignment("right")
+    def add_patients(self, patients: Iterable[Patient]):
+        for patient in patients:
+            try:
+                normalized_values = PatientChart._normalize_values(patient)
+            except IncompleteDataError:
+                normalized_values = None
+            self.add_values(patient.blood_pressure_phenotype, normalized_values)
+
+    def add_values(self, group_index: int, normalized_values: Union[None, NormalizedValues]):
+        """
+        Add a patient by its values normalized to the default times
+        :param group_index: the phenotype of the patient
+        :param normalized_values: the values or None if the data of the patient is incomplete
+        """
+        # patients with incomplete data are not drawn, so they are not counted in
+        # the groups of the phenotypes
+        if normalized_values is None:
+            if group_index == 0:
+                self.__sizes_of_groups[group_index] += 1
+            return
+        self.__sizes_of_groups[group_index] += 1
+        datetimes = normalized_values[0]
+        if not datetimes:
+            return
+        indices = [_DEFAULT_TIME_INDICES[dt] for dt in datetimes]
+        self.__values_sums[group_index][:, indices] += np.array(normalized_values[1:],
+                                                                dtype=np.float64)
+        self.__values_counts[group_index][indices] += 1
+        self.__draw_common_lines(group_index, normalized_values)
+
+    @PROFILER.timed("chart.save_figures")
+    def save_figures(self, basic_output_dir: Path, basic_name: str, rewrite: bool = False):
+        self.save_common_figure(basic_output_dir, basic_name, rewrite)
+        self.save_avg_figure(basic_output_dir, basic_name, rewrite)
+
+    def save_common_figure(self, basic_output_dir: Path, basic_name: str,
+                           rewrite: bool = False):
+        if self.__common_figure is None:
+            self.__common_figure, self.__common_axes_array = PatientChart.__create_figure()
+        # the figure stays open for the patients added later
+        self.__save_figure(self.__common_figure, self.__common_axes_array, basic_output_dir,
+                           "%s_%s" % (basic_name, "common"), rewrite)
+
+    def save_avg_figure(self, basic_output_dir: Path, basic_name: str, rewrite: bool = False):
+        figure, axes_array = PatientChart.__create_figure()
+        for group_index, axes in PatientChart.__iter_groups_axes(axes_array):
+            self.__draw_avg_plot(group_index, axes)
+        self.__save_figure(figure, axes_array, basic_output_dir, "%s_%s" % (basic_name, "avg"),
+                           rewrite)
+        plt.close(figure)
+
+    def close(self):
+        if self.__common_figure is not None:
+            plt.close(self.__common_figure)
+            self.__common_figure = None
+            self.__common_axes_array = None
+            self.__drawn_groups[:] = False
+
+    @staticmethod
+    def __iter_groups_axes(axes_array) -> Iterator[Tuple[int, Any]]:
+        for i in range(PatientChart._ROWS_NUM):
+            for j in range(PatientChart._COLUMNS_NUM):
+                yield j + i * PatientChart._COLUMNS_NUM + 1, axes_array[i, j]
+
+    @staticmethod
+    def __create_figure():
+        figure, axes_array = plt.subplots(PatientChart._ROWS_NUM, PatientChart._COLUMNS_NUM,
+                                          sharex=True, sharey=True)
+        for group_index, axes in PatientChart.__iter_groups_axes(axes_array):
+            axes.set_title("Phenotype #%d" % group_index)
+            axes.set_xlabel("Time")
+            axes.set_ylabel("Blood pressure/Heart rate")
+        return figure, axes_array
+
+    def __save_figure(self, figure, axes_array, basic_output_dir: Path, basic_name: str,
+                      rewrite: bool = False):
+        for _, axes in PatientChart.__iter_groups_axes(axes_array):
+            axes.grid(True)
+            x_major_lct = dates.AutoDateLocator(minticks=2, maxticks=10,
+                                                interval_multiples=True)
+            x_minor_lct = dates.HourLocator(byhour=range(0, 25, 1))
+            x_fmt = dates.AutoDateFormatter(x_major_lct)
+            axes.xaxis.set_major_locator(x_major_lct)
+            axes.xaxis.set_minor_locator(x_minor_lct)
+            axes.xaxis.set_major_formatter(x_fmt)
+            for label in axes.get_xmajorticklabels():
+                label.set_rotation(30)
+                label.set_horizontalalignment("right")
         axes_array[0, 0].legend()
         while True:
             new_name = "%s_%d" % (basic_name, self._saves_counter)
             output_path = Path(basic_output_dir, "figures")
             paths.create_dir(output_path)
             output_path = Path(output_path, new_name).with_suffix('.' + Extension.PNG.as_string())
-            if output_path.is_file():
+            if output_path.is_file() and not rewrite:
                 self.inc_counter()
                 continue
             else:
-                plt.savefig(str(output_path))
-                plt.close(figure)
+                figure.savefig(str(output_path))
                 LOGGER.info("The figure was saved as %s" % output_path.absolute())
                 break
 
     NIGHT_START_TIME = datetime.strptime("01.01.1970 23:00", _DATETIME_FORMAT).time()
     NIGHT_FINISH_TIME = datetime.strptime("02.01.1970 06:00", _DATETIME_FORMAT).time()
 
-    def __draw_common_plot(self, group_index: int, axes):
-        group = self.groups[group_index]
-        axes.set_title("Phenotype #%d" % group_index)
-        axes.set_xlabel("Time")
-        axes.set_ylabel("Blood pressure/Heart rate")
-        for i, patient in enumerate(group):
-            try:
-                normalized_values = PatientChart._normalize_values(patient)
-            except IncompleteDataError:
-                self.__sizes_of_groups[group_index] -= 1
-                continue
-            datetimes, systolic_bps, diastolic_bps, heart_rates = normalized_values
-            if i == 0:
-                axes.plot(datetimes, systolic_bps, "r-", label="systolic blood pressure")
-                axes.plot(datetimes, diastolic_bps, "b-", label="diastolic blood pressure")
-                # axes.plot(datetime, heart_rates, "g-", label="heart rate")
-            else:
-                axes.plot(datetimes, systolic_bps, "r-")
-                axes.plot(datetimes, diastolic_bps, "b-")
-                # axes.plot(datetime, heart_rates, "g-")
+    def __draw_common_lines(self, group_index: int, normalized_values: NormalizedValues):
+        if not 1 <= group_index <= PatientChart._NUMBER_OF_PHENOTYPES:
+            return
+        if self.__common_figure is None:
+            self.__common_figure, self.__common_axes_array = PatientChart.__create_figure()
+        row, column = divmod(group_index - 1, PatientChart._COLUMNS_NUM)
+        axes = self.__common_axes_array[row, column]
+        datetimes, systolic_bps, diastolic_bps, heart_rates = normalized_values
+        if not self.__drawn_groups[group_index]:
+            self.__drawn_groups[group_index] = True
+            axes.plot(datetimes, systolic_bps, "r-", label="systolic blood pressure")
+            axes.plot(datetimes, diastolic_bps, "b-", label="diastolic blood pressure")
+            # axes.plot(datetime, heart_rates, "g-", label="heart rate")
+        else:
+            axes.plot(datetimes, systolic_bps, "r-")
+            axes.plot(datetimes, diastolic_bps, "b-")
+            # axes.plot(datetime, heart_rates, "g-")
 
     def __draw_avg_plot(self, group_index: int, axes):
-        group = self.groups[group_index]
-        axes.set_title("Phenotype #%d" % group_index)
-        axes.set_xlabel("Time")
-        axes.set_ylabel("Blood pressure/Heart rate")
-        avg_values = self._avg_values(group)
+        avg_values = self.__calc_avg_values(group_index)
         datetimes, systolic_blood_pressures, diastolic_blood_pressures, heart_rates = avg_values
         axes.plot(datetimes, systolic_blood_pressures, "r-", label="systolic blood pressure")
         axes.plot(datetimes, diastolic_blood_pressures, "b-", label="diastolic blood pressure")
         # axes.plot(datetime, heart_rates, "g-", label="heart rate")
 
     @staticmethod
-    def _normalize_values(patient: Patient) -> Tuple[List[datetime], List[int],
-                                                     List[int], List[int]]:
+    @PROFILER.timed("chart.normalize_values")
+    def _normalize_values(patient: Patient) -> NormalizedValues:
         normalized_datetimes = []
-        normalized_systolic_blood_pressures = []
-        normalized_diastolic_blood_pressures = []
-        normalized_heart_rates = []
+        indices = []
         default_datetimes = DEFAULT_TIMES
         index = 0
-        measures_datetimes = patient.measures_datetimes
-        measures_datetimes_num = len(measures_datetimes)
-        for dt in default_datetimes:
+        measures_times_of_day = tutil.calc_minutes_of_day(patient.measures_datetimes)
+        measures_datetimes_num = len(measures_times_of_day)
+        for dt, time_of_day in zip(default_datetimes, _DEFAULT_TIMES_OF_DAY):
             if index < measures_datetimes_num:
-                measure_datetime = measures_datetimes[index]
-                if measure_datetime.time() == dt.time():
-                    systolic_blood_pressure = patient.systolic_blood_pressures[index]
-                    diastolic_blood_pressure = patient.diastolic_blood_pressures[index]
-                    heart_rate = patient.heart_rates[index]
+                if measures_times_of_day[index] == time_of_day:
                     normalized_datetimes.append(dt)
-                    normalized_systolic_blood_pressures.append(systolic_blood_pressure)
-                    normalized_diastolic_blood_pressures.append(diastolic_blood_pressure)
-                    normalized_heart_rates.append(heart_rate)
+                    indices.append(index)
                     index += 1
-                    if (isinstance(systolic_blood_pressure, str)
-                        or isinstance(diastolic_blood_pressure, str)
-                        or isinstance(heart_rate, str)):
-                        raise IncompleteDataError
-        return (normalized_datetimes, normalized_systolic_blood_pressures,
-                normalized_diastolic_blood_pressures, normalized_heart_rates)
+        values = patient.values
+        if values.missing[indices].any():
+            raise IncompleteDataError
+        return (normalized_datetimes,
+                values.systolic_blood_pressures.data[indices].tolist(),
+                values.diastolic_blood_pressures.data[indices].tolist(),
+                values.heart_rates.data[indices].tolist())
 
-    @staticmethod
-    def _avg_values(group: Iterable[Patient]) -> Tuple[List[datetime], List[float],
-                                                       List[float], List[float]]:
-        datetimes_list = []
-        systolic_blood_pressures_list = []
-        diastolic_blood_pressures_list = []
-        heart_rates_list = []
-        for patient in group:
-            try:
-                normalized_values = PatientChart._normalize_values(patient)
-            except IncompleteDataError:
-                continue
-            datetimes, systolic_bps, diastolic_bps, heart_rates = normalized_values
-            datetimes_list.append(datetimes)
-            systolic_blood_pressures_list.append(systolic_bps)
-            diastolic_blood_pressures_list.append(diastolic_bps)
-            heart_rates_list.append(heart_rates)
-        default_datetimes = DEFAULT_TIMES
-        avg_datetimes = [[] for _ in default_datetimes]
-        avg_systolic_blood_pressures = [[] for _ in default_datetimes]
-        avg_diastolic_blood_pressures = [[] for _ in default_datetimes]
-        avg_heart_rates = [[] for _ in default_datetimes]
-        for i, default_datetime in enumerate(default_datetimes):
-            for j, datetimes in enumerate(datetimes_list):
-                for k, dt in enumerate(datetimes):
-                    if dt == default_datetime:
-                        avg_datetimes[i].append(dt)
-                        systolic_blood_pressures = systolic_blood_pressures_list[j]
-                        avg_systolic_blood_pressures[i].append(systolic_blood_pressures[k])
-                        diastolic_blood_pressures = diastolic_blood_pressures_list[j]
-                        avg_diastolic_blood_pressures[i].append(diastolic_blood_pressures[k])
-                        heart_rates = heart_rates_list[j]
-                        avg_heart_rates[i].append(heart_rates[k])
-        indices = [i for i, avg_datetime in enumerate(avg_datetimes) if avg_datetime]
-        filtered_avg_datetimes = []
-        filtered_avg_systolic_blood_pressures = []
-        filtered_avg_diastolic_blood_pressures = []
-        filtered_avg_heart_rates = []
-        for index in indices:
-            filtered_avg_datetimes.append(avg_datetimes[index][0])
-            filtered_avg_systolic_blood_pressures.append(avg_systolic_blood_pressures[index])
-            filtered_avg_diastolic_blood_pressures.append(avg_diastolic_blood_pressures[index])
-            filtered_avg_heart_rates.append(avg_heart_rates[index])
-        avg_datetimes = filtered_avg_datetimes
-        avg_systolic_blood_pressures = list(map(np.mean, filtered_avg_systolic_blood_pressures))
-        avg_diastolic_blood_pressures = list(map(np.mean, filtered_avg_diastolic_blood_pressures))
-        avg_heart_rates = list(map(np.mean, filtered_avg_heart_rates))
-        # noinspection PyTypeChecker
+    def __calc_avg_values(self, group_index: int) -> Tuple[List[datetime], List[float],
+                                                          List[float], List[float]]:
+        counts = self.__values_counts[group_index]
+        indices = np.flatnonzero(counts)
+        avg_values = self.__values_sums[group_index][:, indices] / counts[indices]
+        avg_datetimes = [DEFAULT_TIMES[index] for index in indices]
+        avg_systolic_blood_pressures, avg_diastolic_blood_pressures, avg_heart_rates = [
+            list(values) for values in avg_values]
         return (avg_datetimes, avg_systolic_blood_pressures,
                 avg_diastolic_blood_pressures, avg_heart_rates)
 
-    @staticmethod
-    def _group_patients_by_blood_pressure_phenotype(
-            patients: Iterable[Patient]) -> List[List[Patient]]:
-        number_of_phenotypes = 6
-        groups = [[] for _ in range(number_of_phenotypes + 1)]
+
+def _render(values_queue: Queue, sizes_connection: Connection, basic_output_dir: Path,
+            basic_name: str, rewrite: bool):
+    # the interruption is handled by the parent process, which stops the renderer itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    patient_chart = PatientChart()
+    while True:
+        item = values_queue.get()
+        if item is None:
+            break
+        patient_chart.add_values(*item)
+    patient_chart.save_figures(basic_output_dir, basic_name, rewrite)
+    patient_chart.close()
+    sizes_connection.send(patient_chart.sizes_of_groups)
+    sizes_connection.close()
+
+
+class ChartRenderer(object):
+    """
+    Draws the chart in a process of its own while the reports are being parsed.
+    The patients are normalized in the calling process and only their values are sent
+    to the renderer, which draws them onto the common plot as they arrive
+    and saves the figures once it is closed.
+    """
+
+    def __init__(self, basic_output_dir: Path, basic_name: str, queue_size: int,
+                 rewrite: bool = False):
+        self.__values_queue = Queue(max(1, queue_size))
+        self.__sizes_connection, child_connection = Pipe(duplex=False)
+        self.__process = Process(target=_render, args=(self.__values_queue, child_connection,
+                                                       basic_output_dir, basic_name, rewrite),
+                                 daemon=True)
+        self.__process.start()
+        child_connection.close()
+        self.__sizes_of_groups = None
+
+    @property
+    def sizes_of_groups(self) -> Union[None, List[int]]:
+        """
+        The sizes of the groups once the figures have been saved
+        """
+        return self.__sizes_of_groups
+
+    def add_patients(self, patients: Iterable[Patient]):
         for patient in patients:
-            group = groups[patient.blood_pressure_phenotype]
-            group.append(patient)
-        return groups
+            try:
+                normalized_values = PatientChart._normalize_values(patient)
+            except IncompleteDataError:
+                normalized_values = None
+            self.__put((patient.blood_pressure_phenotype, normalized_values))
+
+    def close(self):
+        """
+        Wait for the figures to be saved
+        """
+        try:
+            if self.__put(None):
+                self.__sizes_of_groups = self.__sizes_connection.recv()
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.__process.join()
+            self.__sizes_connection.close()
+        if self.__sizes_of_groups is None:
+            LOGGER.error("The figures have not been saved as the renderer has exited with code %s"
+                         % self.__process.exitcode)
+
+    def terminate(self):
+        if self.__process.is_alive():
+            self.__process.kill()
+        self.__process.join()
+        self.__sizes_connection.close()
+
+    def __put(self, item) -> bool:
+        # the queue is bounded, so the patients wait for the renderer to catch up,
+        # unless it has exited, then the figures are not saved, which is logged on closing
+        while self.__process.is_alive():
+            try:
+                self.__values_queue.put(item, timeout=_RENDERER_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,90 @@
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+# the phenotype by whether the average awake systolic pressure is normal,
+# the systolic pressure within the first hour is normal and their difference is normal,
+# the bits go in this order from the highest one
+_PHENOTYPES_BY_CONDITIONS = np.array([6, 3, 4, 3, 5, 3, 2, 1], dtype=np.int8)
+# the profile by the interval of the night time dip between the bounds
+_PROFILES_BY_INTERVALS = np.array([3, 2, 1, 4], dtype=np.int8)
+# the phenotype and the profile of a patient with missing values
+UNKNOWN_CLASS = 0
+
+Values = Union[Sequence[float], np.ndarray, np.ma.MaskedArray]
+
+
+def _to_masked(values: Values) -> np.ma.MaskedArray:
+    # the missing values are either masked or not numbers
+    return np.ma.masked_invalid(np.ma.asarray(values, dtype=np.float64))
+
+
+class CohortClassifier(object):
+    """
+    Assigns the blood pressure phenotypes and profiles to the whole cohort of patients at once.
+    The values are given by arrays, the ones which are masked or not numbers
+    give the unknown class
+    """
+
+    def __init__(self, awake_systolic_norm: float = 135, white_coat_difference_norm: float = 10,
+                 dip_bounds: Tuple[float, float, float] = (0., 10., 20.)):
+        """
+        :param awake_systolic_norm: the systolic pressure from which it is high, both
+        the average one while awake and the one within the first hour of the white coat window
+        :param white_coat_difference_norm: the difference between them from which
+        the white coat effect is present
+        :param dip_bounds: the upper bounds of the night time dips of the reverse dippers,
+        the non-dippers and the dippers, the extreme dippers are above
+        """
+        if list(dip_bounds) != sorted(dip_bounds) or len(dip_bounds) != 3:
+            raise ValueError("The bounds of the dips have to be three increasing numbers")
+        self.__awake_systolic_norm = awake_systolic_norm
+        self.__white_coat_difference_norm = white_coat_difference_norm
+        self.__dip_bounds = np.array(dip_bounds, dtype=np.float64)
+
+    @property
+    def awake_systolic_norm(self) -> float:
+        return self.__awake_systolic_norm
+
+    @property
+    def white_coat_difference_norm(self) -> float:
+        return self.__white_coat_difference_norm
+
+    @property
+    def dip_bounds(self) -> Tuple[float, float, float]:
+        return tuple(self.__dip_bounds.tolist())
+
+    def classify_phenotypes(self, avg_awake_systolic: Values,
+                            first_hour_systolic: Values) -> np.ndarray:
+        """
+        :param avg_awake_systolic: the average systolic pressures of the patients while awake
+        :param first_hour_systolic: the systolic pressures within the first hour
+        of the white coat window
+        :return: the phenotypes from 1 to 6 or UNKNOWN_CLASS
+        """
+        avg_awake_systolic = _to_masked(avg_awake_systolic)
+        first_hour_systolic = _to_masked(first_hour_systolic)
+        if avg_awake_systolic.shape != first_hour_systolic.shape:
+            raise ValueError("There are %d first hour values for %d average values"
+                             % (first_hour_systolic.size, avg_awake_systolic.size))
+        avg_data = avg_awake_systolic.filled(0.)
+        first_hour_data = first_hour_systolic.filled(0.)
+        conditions = ((avg_data < self.__awake_systolic_norm).astype(np.intp) << 2
+                      | (first_hour_data < self.__awake_systolic_norm).astype(np.intp) << 1
+                      | (np.abs(avg_data - first_hour_data) < self.__white_coat_difference_norm))
+        phenotypes = _PHENOTYPES_BY_CONDITIONS[conditions]
+        phenotypes[np.ma.getmaskarray(avg_awake_systolic)
+                   | np.ma.getmaskarray(first_hour_systolic)] = UNKNOWN_CLASS
+        return phenotypes
+
+    def classify_profiles(self, systolic_night_time_dips: Values) -> np.ndarray:
+        """
+        :param systolic_night_time_dips: the night time dips of the systolic pressures in percent
+        :return: the profiles from 1 to 4 or UNKNOWN_CLASS
+        """
+        dips = _to_masked(systolic_night_time_dips)
+        # the bounds belong to the intervals below them
+        intervals = np.searchsorted(self.__dip_bounds, dips.filled(0.), side='left')
+        profiles = _PROFILES_BY_INTERVALS[intervals]
+        profiles[np.ma.getmaskarray(dips)] = UNKNOWN_CLASS
+        return profiles
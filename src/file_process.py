@@ -1,7 +1,11 @@
+import hashlib
 from collections import defaultdict
 from enum import Enum
+from functools import partial
 from pathlib import Path
-from typing import Tuple, Union, Iterable, NewType, Dict, Callable, List
+from typing import Tuple, Union, Iterable, NewType, Dict, Callable, List, BinaryIO
+
+import numpy as np
 
 from pdfminer.converter import PDFPageAggregator
 from pdfminer.layout import LAParams, LTTextLine, LTTextBox, LTPage
@@ -10,9 +14,12 @@ from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
 from pdfminer.pdfpage import PDFPage
 from pdfminer.pdfparser import PDFParser
 
+from src.profiling import PROFILER
 from src.report_item import ReportBlock
+from src.util import buffers
 from src.util import collections
 from src.util import strings
+from src.util.buffers import Buffer, MemoryReader
 
 _EXTRA_FONT_INFO = "(cid:9)"
 
@@ -20,6 +27,8 @@ _EXTRA_FONT_INFO = "(cid:9)"
 def remove_extra_font_info(string: str) -> str:
     return string.replace(_EXTRA_FONT_INFO, '')
 
+_VERSION_LENGTH = 12
+
 ReportBlockCoordinates = NewType('ReportBlockCoordinates', Tuple[float, float, float, float])
 
 
@@ -64,6 +73,12 @@ class ReportSpace(Enum):
         for item in cls:
             yield item.index
 
+    @classmethod
+    def version(cls) -> str:
+        # changes whenever any space is added, removed or moved
+        table = ';'.join("%s=%s" % (item.name, item.coordinates) for item in cls)
+        return hashlib.sha1(table.encode('utf-8')).hexdigest()[:_VERSION_LENGTH]
+
     @property
     def coordinates(self) -> Tuple[int, int, int, int]:
         return self.__coordinates
@@ -85,6 +100,82 @@ class ReportSpace(Enum):
         return left_bottom_border_match and right_top_border_match
 
 
+class ReportSpaceTable(object):
+    """
+    Coordinates of the report spaces packed into arrays, so that all the text items of a page
+    are assigned to the spaces in one batch
+    """
+
+    COMPLEX_VALUES_BLOCK_SPACES = [ReportSpace.PATIENT, ReportSpace.DAY_NIGHT,
+                                   ReportSpace.READINGS_BP, ReportSpace.AVG_BP,
+                                   ReportSpace.WHITE_COAT_WINDOW,
+                                   ReportSpace.NIGHT_TIME_DIP]
+    VALUE_COLUMN_SPACES = [ReportSpace.VALUES_1_COLUMN_SD,
+                           ReportSpace.VALUES_1_COLUMN_HR,
+                           ReportSpace.VALUES_2_COLUMN_SD,
+                           ReportSpace.VALUES_2_COLUMN_HR,
+                           ReportSpace.VALUES_3_COLUMN_SD,
+                           ReportSpace.VALUES_3_COLUMN_HR,
+                           ReportSpace.VALUES_4_COLUMN_SD,
+                           ReportSpace.VALUES_4_COLUMN_HR]
+
+    _NO_KEY = -1
+
+    def __init__(self, coordinates: Dict[ReportSpace, ReportBlockCoordinates] = None):
+        if coordinates is None:
+            coordinates = {space: space.coordinates for space in ReportSpace}
+        self.__coordinates = coordinates
+        spaces = ([ReportSpace.VALUES] + ReportSpaceTable.VALUE_COLUMN_SPACES
+                  + ReportSpaceTable.COMPLEX_VALUES_BLOCK_SPACES)
+        self.__table = np.array([coordinates[space] for space in spaces], dtype=np.float64)
+        self.__column_indices = np.array(
+            [space.index for space in ReportSpaceTable.VALUE_COLUMN_SPACES])
+        self.__complex_indices = np.array(
+            [space.index for space in ReportSpaceTable.COMPLEX_VALUES_BLOCK_SPACES])
+
+    @property
+    def coordinates(self) -> Dict[ReportSpace, ReportBlockCoordinates]:
+        return self.__coordinates
+
+    def includes_items(self, bboxes: np.ndarray) -> np.ndarray:
+        """
+        Check which spaces include which items
+        :param bboxes: an array of the items' bounding boxes with the shape (items, 4)
+        :return: a boolean array with the shape (items, spaces)
+        """
+        bboxes = bboxes[:, np.newaxis, :]
+        table = self.__table[np.newaxis, :, :]
+        left_bottom_border_match = np.all(bboxes[:, :, :2] >= table[:, :, :2], axis=2)
+        right_top_border_match = np.all(bboxes[:, :, 2:] <= table[:, :, 2:], axis=2)
+        return left_bottom_border_match & right_top_border_match
+
+    def define_blocks_keys(self, bboxes: np.ndarray) -> List[List[int]]:
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        inclusions = self.includes_items(bboxes)
+        columns_num = len(self.__column_indices)
+        values_inclusions = inclusions[:, 0]
+        column_inclusions = inclusions[:, 1:columns_num + 1]
+        complex_inclusions = inclusions[:, columns_num + 1:]
+        # the first space of a group including the item wins
+        column_keys = np.where(column_inclusions.any(axis=1),
+                               self.__column_indices[column_inclusions.argmax(axis=1)],
+                               ReportSpaceTable._NO_KEY)
+        complex_keys = np.where(complex_inclusions.any(axis=1),
+                                self.__complex_indices[complex_inclusions.argmax(axis=1)],
+                                ReportSpaceTable._NO_KEY)
+        second_keys = np.where(values_inclusions, ReportSpace.VALUES.index, complex_keys)
+        third_keys = np.where(values_inclusions, column_keys, ReportSpaceTable._NO_KEY)
+        blocks_keys = []
+        for second_key, third_key in zip(second_keys.tolist(), third_keys.tolist()):
+            keys = [ReportSpace.ALL.index]
+            if second_key != ReportSpaceTable._NO_KEY:
+                keys.append(second_key)
+                if third_key != ReportSpaceTable._NO_KEY:
+                    keys.append(third_key)
+            blocks_keys.append(keys)
+        return blocks_keys
+
+
 class InvalidPdfError(Exception):
     pass
 
@@ -104,30 +195,39 @@ class BlockStore(object):
         self.__inner_store[key.index] = block
 
 
+class InputMode(Enum):
+    """
+    The way the report file is read: through a buffered file or a memory map of it
+    """
+    BUFFERED = "buffered"
+    MAPPED = "mapped"
+
+
+# picks the coordinates of the spaces for the page of the document given its layout
+SpaceTableDetector = Callable[[PDFDocument, PDFPage, LTPage], ReportSpaceTable]
+
+
 class ReportFileProcessor(object):
 
-    _COMPLEX_VALUES_BLOCK_SPACES = [ReportSpace.PATIENT, ReportSpace.DAY_NIGHT,
-                                    ReportSpace.READINGS_BP, ReportSpace.AVG_BP,
-                                    ReportSpace.WHITE_COAT_WINDOW,
-                                    ReportSpace.NIGHT_TIME_DIP]
-    _VALUE_COLUMN_SPACES = [ReportSpace.VALUES_1_COLUMN_SD,
-                            ReportSpace.VALUES_1_COLUMN_HR,
-                            ReportSpace.VALUES_2_COLUMN_SD,
-                            ReportSpace.VALUES_2_COLUMN_HR,
-                            ReportSpace.VALUES_3_COLUMN_SD,
-                            ReportSpace.VALUES_3_COLUMN_HR,
-                            ReportSpace.VALUES_4_COLUMN_SD,
-                            ReportSpace.VALUES_4_COLUMN_HR]
-
-    def __init__(self, path: Path):
-        blocks = ReportFileProcessor.__parse_document(path, ReportFileProcessor.extract_blocks)
+    def __init__(self, source: Union[Path, Buffer],
+                 space_table_detector: SpaceTableDetector = None,
+                 input_mode: InputMode = InputMode.BUFFERED):
+        blocks_extractor = partial(ReportFileProcessor.extract_blocks,
+                                   space_table_detector=space_table_detector)
+        blocks = ReportFileProcessor.__parse_document(source, blocks_extractor, input_mode)
         self.__blocks = blocks
 
     @staticmethod
-    def extract_blocks(document: PDFDocument) -> BlockStore:
+    def extract_blocks(document: PDFDocument,
+                       space_table_detector: SpaceTableDetector = None) -> BlockStore:
         page = ReportFileProcessor.__extract_page(document)
         page_layout = ReportFileProcessor.__extract_page_layout(page)
-        blocks = ReportFileProcessor.__extract_blocks(page_layout)
+        if space_table_detector is None:
+            space_table = DEFAULT_SPACE_TABLE
+        else:
+            with PROFILER.stage("layout.detect"):
+                space_table = space_table_detector(document, page, page_layout)
+        blocks = ReportFileProcessor.__extract_blocks(page_layout, space_table)
         return blocks
 
     @property
@@ -135,15 +235,28 @@ class ReportFileProcessor(object):
         return self.__blocks
 
     @staticmethod
-    def __parse_document(path: Path,
+    def __parse_document(source: Union[Path, Buffer],
+                         blocks_extractor: Callable[[PDFDocument], BlockStore],
+                         input_mode: InputMode) -> BlockStore:
+        if not isinstance(source, (str, Path)):
+            with MemoryReader(source) as raw_file:
+                return ReportFileProcessor.__parse_raw_file(raw_file, blocks_extractor)
+        if input_mode == InputMode.MAPPED:
+            with buffers.map_file(source) as content, MemoryReader(content) as raw_file:
+                return ReportFileProcessor.__parse_raw_file(raw_file, blocks_extractor)
+        with open(str(source), "rb") as raw_file:
+            return ReportFileProcessor.__parse_raw_file(raw_file, blocks_extractor)
+
+    @staticmethod
+    def __parse_raw_file(raw_file: BinaryIO,
                          blocks_extractor: Callable[[PDFDocument], BlockStore]) -> BlockStore:
-        with open(str(path), "rb") as raw_file:
+        with PROFILER.stage("pdf.document"):
             parser = PDFParser(raw_file)
             document = PDFDocument(parser)
-            if document.is_extractable:
-                return blocks_extractor(document)
-            else:
-                raise InvalidPdfError
+        if document.is_extractable:
+            return blocks_extractor(document)
+        else:
+            raise InvalidPdfError("the text of the document is not extractable")
 
     @staticmethod
     def __extract_page(document: PDFDocument) -> PDFPage:
@@ -152,6 +265,7 @@ class ReportFileProcessor(object):
             return page
 
     @staticmethod
+    @PROFILER.timed("pdf.layout")
     def __extract_page_layout(page: PDFPage) -> LTPage:
         resource_manager = PDFResourceManager()
         layout_analysis_parameters = LAParams()
@@ -174,34 +288,29 @@ class ReportFileProcessor(object):
         return text_chunks
 
     @staticmethod
-    def __extract_blocks(layout: LTPage) -> BlockStore:
+    @PROFILER.timed("blocks.extract")
+    def __extract_blocks(layout: LTPage, space_table: ReportSpaceTable) -> BlockStore:
         blocks = defaultdict(list)
-        for item in layout:
-            if isinstance(item, LTTextBox) or isinstance(item, LTTextLine):
-                block_keys = ReportFileProcessor.define_block_keys(item)
-                text_chunks = ReportFileProcessor.__process_item_text(item.get_text())
-                for block_key in block_keys:
-                    current_block = blocks[block_key]
-                    if current_block:
-                        current_block.extend(ReportBlock(text_chunks))
-                    else:
-                        blocks[block_key] = ReportBlock(text_chunks[:])
+        items = [item for item in layout
+                 if isinstance(item, LTTextBox) or isinstance(item, LTTextLine)]
+        bboxes = np.array([item.bbox for item in items], dtype=np.float64)
+        with PROFILER.stage("blocks.define_keys"):
+            blocks_keys = space_table.define_blocks_keys(bboxes)
+        for item, block_keys in zip(items, blocks_keys):
+            text_chunks = ReportFileProcessor.__process_item_text(item.get_text())
+            for block_key in block_keys:
+                current_block = blocks[block_key]
+                if current_block:
+                    current_block.extend(ReportBlock(text_chunks))
+                else:
+                    blocks[block_key] = ReportBlock(text_chunks[:])
 
         block_store = BlockStore(dict(blocks))
         return block_store
 
     @staticmethod
     def define_block_keys(item: Union[LTTextBox, LTTextLine]) -> Iterable[int]:
-        keys = [ReportSpace.ALL.index]
-        if ReportSpace.VALUES.includes_item(item):
-            keys.append(ReportSpace.VALUES.index)
-            for value_column_space in ReportFileProcessor._VALUE_COLUMN_SPACES:
-                if value_column_space.includes_item(item):
-                    keys.append(value_column_space.index)
-                    break
-            return keys
-        for block_space in ReportFileProcessor._COMPLEX_VALUES_BLOCK_SPACES:
-            if block_space.includes_item(item):
-                keys.append(block_space.index)
-                break
-        return keys
+        return DEFAULT_SPACE_TABLE.define_blocks_keys(np.array([item.bbox]))[0]
+
+
+DEFAULT_SPACE_TABLE = ReportSpaceTable()
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple, Union, Iterable
+
+from pdfminer.layout import LTPage, LTTextBox, LTTextLine
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import decode_text
+
+from src.file_process import ReportSpace, ReportSpaceTable, ReportBlockCoordinates
+from src.util import paths
+from src.util.paths import Extension
+
+_VERSION_LENGTH = 12
+_DEFAULT_TEMPLATE_NAME = "default"
+_PRODUCER_KEY = "Producer"
+
+# fingerprint key -> template name, shared by all the reports parsed in the process
+_DETECTION_CACHE = {}
+
+
+class InvalidLayoutTemplateError(Exception):
+    pass
+
+
+class LayoutFingerprint(object):
+    """
+    Cheap traits of a report which are known before its layout is analyzed
+    """
+
+    def __init__(self, page_size: Tuple[int, int], producer: str):
+        self.__page_size = page_size
+        self.__producer = producer
+
+    @classmethod
+    def of(cls, document: PDFDocument, page: PDFPage) -> 'LayoutFingerprint':
+        x0, y0, x1, y1 = page.mediabox
+        page_size = int(round(x1 - x0)), int(round(y1 - y0))
+        producer = ""
+        for info in document.info:
+            value = resolve1(info.get(_PRODUCER_KEY))
+            if isinstance(value, bytes):
+                producer = decode_text(value)
+                break
+            if isinstance(value, str):
+                producer = value
+                break
+        return cls(page_size, producer)
+
+    @property
+    def page_size(self) -> Tuple[int, int]:
+        return self.__page_size
+
+    @property
+    def producer(self) -> str:
+        return self.__producer
+
+    @property
+    def key(self) -> Tuple[Tuple[int, int], str]:
+        return self.__page_size, self.__producer
+
+
+class LayoutAnchor(object):
+    """
+    A label which is expected to be found inside the given space of the page
+    """
+
+    def __init__(self, pattern: str, coordinates: ReportBlockCoordinates):
+        self.__pattern = pattern
+        self.__regex = re.compile(pattern)
+        self.__coordinates = tuple(coordinates)
+
+    @property
+    def pattern(self) -> str:
+        return self.__pattern
+
+    @property
+    def coordinates(self) -> ReportBlockCoordinates:
+        return self.__coordinates
+
+    def is_found(self, items: Iterable[Union[LTTextBox, LTTextLine]]) -> bool:
+        for item in items:
+            if (ReportSpace._corresponds_to_borders(self.__coordinates, tuple(item.bbox))
+                    and self.__regex.search(item.get_text())):
+                return True
+        return False
+
+
+class LayoutTemplate(object):
+    """
+    Coordinates of the report spaces for one layout of the report
+    together with the traits the layout is recognized by.
+    Spaces which are not listed keep their default coordinates.
+    """
+
+    def __init__(self, name: str, coordinates: Dict[ReportSpace, ReportBlockCoordinates] = None,
+                 page_size: Tuple[int, int] = None, producer_pattern: str = None,
+                 anchors: List[LayoutAnchor] = None):
+        self.__name = name
+        default_coordinates = {space: space.coordinates for space in ReportSpace}
+        if coordinates:
+            default_coordinates.update(coordinates)
+        self.__space_table = ReportSpaceTable(default_coordinates)
+        self.__page_size = tuple(page_size) if page_size else None
+        self.__producer_pattern = producer_pattern
+        self.__producer_regex = re.compile(producer_pattern) if producer_pattern else None
+        self.__anchors = anchors or []
+
+    @classmethod
+    def default(cls) -> 'LayoutTemplate':
+        return cls(_DEFAULT_TEMPLATE_NAME)
+
+    @classmethod
+    def load(cls, path: Path) -> 'LayoutTemplate':
+        """
+        Load the template from a JSON file of the form
+        {"name": ..., "page_size": [w, h], "producer": <regex>,
+         "anchors": [{"pattern": <regex>, "coordinates": [x0, y0, x1, y1]}, ...],
+         "spaces": {<ReportSpace name>: [x0, y0, x1, y1], ...}}
+        :param path: a path of the template file
+        :return: the template
+        """
+        with open(str(path), encoding='utf-8') as template_file:
+            try:
+                description = json.load(template_file)
+                coordinates = {ReportSpace[name]: tuple(space_coordinates)
+                               for name, space_coordinates in description["spaces"].items()}
+                anchors = [LayoutAnchor(anchor["pattern"], anchor["coordinates"])
+                           for anchor in description.get("anchors", [])]
+                return cls(description.get("name", path.stem), coordinates,
+                           description.get("page_size"), description.get("producer"), anchors)
+            except (ValueError, KeyError, TypeError, re.error) as err:
+                raise InvalidLayoutTemplateError("%s: %s" % (path, err))
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def space_table(self) -> ReportSpaceTable:
+        return self.__space_table
+
+    @property
+    def version(self) -> str:
+        coordinates = self.__space_table.coordinates
+        table = ';'.join("%s=%s" % (space.name, coordinates[space]) for space in ReportSpace)
+        anchors = ';'.join("%s@%s" % (anchor.pattern, anchor.coordinates)
+                           for anchor in self.__anchors)
+        description = "|".join((self.__name, str(self.__page_size), str(self.__producer_pattern),
+                                anchors, table))
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()[:_VERSION_LENGTH]
+
+    def matches_fingerprint(self, fingerprint: LayoutFingerprint) -> bool:
+        if self.__page_size is not None and self.__page_size != fingerprint.page_size:
+            return False
+        if (self.__producer_regex is not None
+                and not self.__producer_regex.search(fingerprint.producer)):
+            return False
+        return True
+
+    def matches_anchors(self, items: List[Union[LTTextBox, LTTextLine]]) -> bool:
+        return all(anchor.is_found(items) for anchor in self.__anchors)
+
+
+class LayoutRegistry(object):
+    """
+    Templates the report layout is detected among. The templates are probed in order,
+    the default template goes last and matches any report.
+    """
+
+    def __init__(self, templates: List[LayoutTemplate]):
+        self.__templates = templates + [LayoutTemplate.default()]
+        self.__templates_by_names = {template.name: template for template in self.__templates}
+        versions = ';'.join(template.version for template in self.__templates)
+        self.__version = hashlib.sha1(versions.encode('utf-8')).hexdigest()[:_VERSION_LENGTH]
+
+    @classmethod
+    def load(cls, templates_dir: Union[str, Path]) -> 'LayoutRegistry':
+        templates_dir = Path(templates_dir)
+        templates = []
+        if templates_dir.is_dir():
+            templates_paths = paths.collect_dir_content_by_extension(templates_dir,
+                                                                     Extension.JSON)
+            templates = [LayoutTemplate.load(path) for path in sorted(templates_paths)]
+        return cls(templates)
+
+    @property
+    def templates(self) -> List[LayoutTemplate]:
+        return self.__templates
+
+    @property
+    def version(self) -> str:
+        return self.__version
+
+    def detect(self, document: PDFDocument, page: PDFPage, layout: LTPage) -> LayoutTemplate:
+        fingerprint = LayoutFingerprint.of(document, page)
+        cache_key = self.__version, fingerprint.key
+        template_name = _DETECTION_CACHE.get(cache_key)
+        if template_name is not None:
+            return self.__templates_by_names[template_name]
+        default_template = self.__templates[-1]
+        candidates = [template for template in self.__templates[:-1]
+                      if template.matches_fingerprint(fingerprint)]
+        items = [item for item in layout
+                 if isinstance(item, LTTextBox) or isinstance(item, LTTextLine)]
+        if not candidates:
+            # no template can match the fingerprint, whatever the text of the report is
+            _DETECTION_CACHE[cache_key] = default_template.name
+            return default_template
+        if len(candidates) == 1:
+            # the fingerprint alone identifies the layout once its anchors are found,
+            # a report missing them does not say anything about the next ones of the kind
+            template = candidates[0]
+            if not template.matches_anchors(items):
+                return default_template
+            _DETECTION_CACHE[cache_key] = template.name
+            return template
+        for template in candidates:
+            if template.matches_anchors(items):
+                return template
+        return default_template
+
+    def detect_space_table(self, document: PDFDocument, page: PDFPage,
+                           layout: LTPage) -> ReportSpaceTable:
+        return self.detect(document, page, layout).space_table
@@ -1,78 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import cpu_count, freeze_support
 from pathlib import Path
-from typing import Iterable
+from time import sleep
+from typing import Union
 
-from src.patient import Patient
+from src.block_cache import BlockCache
+from src.file_process import InputMode
+from src.layout import LayoutRegistry
+from src.manifest import RunManifest
+from src.pipeline import ReportPipeline
+from src.profiling import PROFILER, ProfilingSettings
 from src.report_logging import LOGGER
 from src.chart import PatientChart
-from src.file_process import ReportFileProcessor
-from src.report_logging import ReportEventMessageBuilder, ReportsStatistics
-from src.report_dataframe import PatientDataFrame
+from src.report_logging import ReportsStatistics
+from src.report_dataframe import PatientTableWriter
 from src.util import paths
-from src.report import Report
+from src.report_builder import ReportBuilder
+from src.quarantine import Quarantine
+from src.report_source import ReportSourceCollection
+from src.report_stream import WORKER_QUEUE_SIZE, create_executor, stream_patients_with_logging
 from src.util.paths import Extension
+from src.watch import ReportFolderWatcher
+from src.worker_pool import RenewablePoolExecutor, WorkerLimits
 
 
 INPUT_DIR = Path('..', "raw")
 INPUT_EXT = Extension.PDF
+# mapping the reports into memory saves the copies made by the buffered reads
+INPUT_MODE = InputMode.MAPPED
 OUTPUT_DIR = Path('..', "output")
 OUTPUT_EXT = Extension.CSV
 OUTPUT_FILE_NAME = "output"
 OUTPUT_PATH = Path(OUTPUT_DIR, OUTPUT_FILE_NAME)
+# the parsed reports are archived, so that they are analyzed again without being parsed
+# (None disables the archive)
+ARCHIVE_PATH = Path(OUTPUT_DIR, paths.extend_file_name(OUTPUT_FILE_NAME,
+                                                       Extension.REPORT_ARCHIVE))
+LAYOUTS_DIR = Path('..', "layouts")
+BLOCK_CACHE_DIR = Path('..', "cache")
+# the cache is disabled when the limit is zero
+BLOCK_CACHE_SIZE_LIMIT = 512 * 1024 ** 2
+MANIFEST_DIR = Path('..', "manifest")
+# skip the reports which have not changed since they were parsed by one of the previous runs
+RESUME = True
+# the number of worker processes parsing reports in parallel (1 disables the process pool)
+WORKERS_NUM = cpu_count()
+# seconds a worker may parse one report for before it is killed (None disables the limit)
+REPORT_TIMEOUT = 300
+# bytes of memory a worker may take (None disables the limit, not supported on Windows)
+REPORT_MEMORY_LIMIT = 2 * 1024 ** 3
+# reports a worker parses before it is replaced, so that its leaked memory is released
+WORKER_MAX_REPORTS = 200
+# the rows of the table are flushed to the file every this number of patients
+TABLE_FLUSH_INTERVAL = 100
+# the reports which have exceeded the limits, they are skipped until their files change
+QUARANTINE_PATH = Path('..', "quarantine.json")
+# keep running and parse the reports as they appear in the input directory
+WATCH_MODE = False
+# seconds between the polls of the input directory in the watch mode
+WATCH_INTERVAL = 5
+# time the stages of the handling of the reports and write their statistics into PROFILE_DIR
+PROFILE = False
+# the name of the report to run under cProfile if PROFILE is set, None for no report
+PROFILED_REPORT = None
+PROFILE_DIR = Path(OUTPUT_DIR, "profile")
+PROFILE_SUMMARY_PATH = Path(PROFILE_DIR, "stages.json")
 
 
-def stream_patients_with_logging(reports_paths: Iterable[Path],
-                                 report_statistics: ReportsStatistics):
-    reports_paths = list(reports_paths)
-    for index, path in enumerate(reports_paths):
-        start_num = index + 1
-        report = __build_report_with_logging(start_num, path, report_statistics)
-        yield Patient(report)
+def __create_manifest(report_builder: ReportBuilder) -> Union[None, RunManifest]:
+    if not RESUME:
+        return None
+    return RunManifest(MANIFEST_DIR, report_builder.version)
 
 
-def __build_report(report_path: Path) -> Report:
-    report_file = ReportFileProcessor(report_path)
-    blocks = report_file.blocks
-    report_name = report_path.stem
-    return Report(report_name, blocks)
+def __create_worker_limits() -> Union[None, WorkerLimits]:
+    if REPORT_TIMEOUT is None and REPORT_MEMORY_LIMIT is None and WORKER_MAX_REPORTS is None:
+        return None
+    return WorkerLimits(REPORT_TIMEOUT, REPORT_MEMORY_LIMIT, WORKER_MAX_REPORTS)
 
 
-def __build_report_with_logging(index: int, path: Path, statistics: ReportsStatistics) -> Report:
-    report_name = path.stem
-    message_builder = ReportEventMessageBuilder(report_name, index, statistics)
-    try:
-        report = __build_report(path)
-        if report.success:
-            message = message_builder.create_message("has been parsed")
-            LOGGER.info(message)
-        else:
-            message = message_builder.create_message("has been parsed with missing values (%s)"
-                                                     % report.message)
-            LOGGER.warning(message)
-        return report
-    except (KeyError, TypeError, ValueError) as err:
-        message = message_builder.create_message("has not been parsed")
-        statistics.inc_counter_of_fails()
-        LOGGER.error(message)
-        LOGGER.debug(err)
+def __create_report_builder() -> ReportBuilder:
+    layout_registry = LayoutRegistry.load(LAYOUTS_DIR)
+    block_cache = None
+    if BLOCK_CACHE_SIZE_LIMIT > 0:
+        blocks_version = ReportBuilder.blocks_version(layout_registry)
+        block_cache = BlockCache(BLOCK_CACHE_DIR, BLOCK_CACHE_SIZE_LIMIT, blocks_version)
+    profiling = ProfilingSettings(PROFILED_REPORT, PROFILE_DIR) if PROFILE else None
+    return ReportBuilder(block_cache, layout_registry, INPUT_MODE, profiling)
 
 
 def main():
-    reports_paths = list(paths.collect_dir_content_by_extension(INPUT_DIR, Extension.PDF))
-    statistics = ReportsStatistics(reports_paths)
-    patients = []
-    for patient in stream_patients_with_logging(reports_paths, statistics):
-        patients.append(patient)
-    patient_chart = PatientChart(patients)
-    patient_chart.save_figures(OUTPUT_DIR, OUTPUT_FILE_NAME)
-    LOGGER.info("Sizes of groups: %s" % patient_chart.sizes_of_groups)
-    patient_dataframe = PatientDataFrame(patients)
-    patient_dataframe.save_csv(OUTPUT_DIR, OUTPUT_FILE_NAME, separator=',')
+    reports_sources = ReportSourceCollection(INPUT_DIR, INPUT_EXT)
+    # the reports of the compressed TAR archives are counted as they are streamed
+    statistics = ReportsStatistics.of_number(reports_sources.length)
+    report_builder = __create_report_builder()
+    manifest = __create_manifest(report_builder)
+    worker_limits = __create_worker_limits()
+    quarantine = Quarantine(QUARANTINE_PATH)
+    # the pipeline parses the reports in the executor even if there is a single worker
+    executor = (create_executor(WORKERS_NUM, worker_limits)
+                or RenewablePoolExecutor(partial(ProcessPoolExecutor, max_workers=1)))
+    with executor:
+        pipeline = ReportPipeline(report_builder, executor, WORKERS_NUM * WORKER_QUEUE_SIZE,
+                                  manifest, quarantine, ARCHIVE_PATH, TABLE_FLUSH_INTERVAL)
+        sizes_of_groups, _ = pipeline.run(reports_sources, statistics, OUTPUT_DIR,
+                                          OUTPUT_FILE_NAME, separator=',')
+    if PROFILE:
+        PROFILER.write_json(PROFILE_SUMMARY_PATH)
+    if sizes_of_groups is not None:
+        LOGGER.info("Sizes of groups: %s" % sizes_of_groups)
     LOGGER.info("Successfully handled: %d/%d"
                 % (statistics.number_of_successes, statistics.number_of_reports))
     LOGGER.info("Press ENTER to exit")
     input()
 
 
+def watch():
+    report_builder = __create_report_builder()
+    manifest = __create_manifest(report_builder)
+    worker_limits = __create_worker_limits()
+    quarantine = Quarantine(QUARANTINE_PATH)
+    watcher = ReportFolderWatcher(INPUT_DIR, INPUT_EXT)
+    # the pool is kept for the whole session instead of being created on every poll
+    executor = create_executor(WORKERS_NUM, worker_limits)
+    patient_chart = PatientChart()
+    table_writer = PatientTableWriter(OUTPUT_DIR, OUTPUT_FILE_NAME, separator=',',
+                                      flush_interval=TABLE_FLUSH_INTERVAL)
+    patients_by_names = {}
+    rewrite = False
+    LOGGER.info("Watching %s for new reports, press Ctrl+C to stop" % INPUT_DIR.absolute())
+    try:
+        table_writer.open()
+        while True:
+            reports_paths, removed_paths = watcher.poll()
+            if not reports_paths and not removed_paths:
+                sleep(WATCH_INTERVAL)
+                continue
+            statistics = ReportsStatistics(reports_paths)
+            # the patients of the changed and removed reports can not be taken off the table
+            # and the chart, so they are made up anew, the new patients are appended to them
+            is_rebuilt = False
+            for path in reports_paths + removed_paths:
+                is_rebuilt |= patients_by_names.pop(path.stem, None) is not None
+            patients = list(stream_patients_with_logging(reports_paths, statistics, WORKERS_NUM,
+                                                         report_builder, manifest, worker_limits,
+                                                         quarantine, executor))
+            for patient in patients:
+                patients_by_names[patient.report_name] = patient
+            if is_rebuilt:
+                patient_chart.close()
+                patient_chart = PatientChart(patients_by_names.values())
+                table_writer.close()
+                table_writer = PatientTableWriter(OUTPUT_DIR, OUTPUT_FILE_NAME, separator=',',
+                                                  flush_interval=TABLE_FLUSH_INTERVAL,
+                                                  rewrite=True)
+                table_writer.open()
+                table_writer.write(patients_by_names.values())
+            else:
+                patient_chart.add_patients(patients)
+                table_writer.write(patients)
+            table_writer.flush()
+            patient_chart.save_figures(OUTPUT_DIR, OUTPUT_FILE_NAME, rewrite)
+            # the figures of the session are updated in place from now on
+            rewrite = True
+            LOGGER.info("Sizes of groups: %s" % patient_chart.sizes_of_groups)
+            LOGGER.info("Successfully handled: %d/%d (%d in total, %d removed)"
+                        % (statistics.number_of_successes, statistics.number_of_reports,
+                           len(patients_by_names), len(removed_paths)))
+            if PROFILE:
+                PROFILER.write_json(PROFILE_SUMMARY_PATH)
+    except KeyboardInterrupt:
+        LOGGER.info("Watching has been stopped")
+    finally:
+        table_writer.close()
+        patient_chart.close()
+        if executor is not None:
+            executor.shutdown()
+
+
 if __name__ == '__main__':
+    # required by the process pool when the program is frozen into an executable
+    freeze_support()
     paths.create_dir(OUTPUT_DIR)
-    main()
+    if PROFILE:
+        PROFILER.enable()
+    if WATCH_MODE:
+        watch()
+    else:
+        main()
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import pickle
+import zlib
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Union
+
+from src.profiling import PROFILER
+from src.report import Report
+from src.report_source import ReportSource
+from src.util import paths
+
+_MANIFEST_FILE_NAME = "manifest.jsonl"
+_RESULTS_DIR_NAME = "results"
+_RESULT_SUFFIX = ".report"
+_TEMP_SUFFIX = ".tmp"
+_COMPRESSION_LEVEL = 6
+# the manifest is compacted on loading once it has this many times more lines than entries
+_COMPACTION_RATIO = 2
+
+
+class ReportOutcome(Enum):
+    PARSED = "parsed"
+    PARSED_WITH_MISSING_VALUES = "missing"
+    FAILED = "failed"
+
+    def as_string(self) -> str:
+        return self.value
+
+
+class ManifestEntry(object):
+
+    def __init__(self, path: str, size: int, mtime: int, digest: str, outcome: ReportOutcome,
+                 layout_version: str):
+        self.__path = path
+        self.__size = size
+        self.__mtime = mtime
+        self.__digest = digest
+        self.__outcome = outcome
+        self.__layout_version = layout_version
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Union[str, int]]) -> 'ManifestEntry':
+        return cls(entry["path"], entry["size"], entry["mtime"], entry["digest"],
+                   ReportOutcome(entry["outcome"]), entry["layout_version"])
+
+    def as_dict(self) -> Dict[str, Union[str, int]]:
+        return {"path": self.__path, "size": self.__size, "mtime": self.__mtime,
+                "digest": self.__digest, "outcome": self.__outcome.as_string(),
+                "layout_version": self.__layout_version}
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def mtime(self) -> int:
+        return self.__mtime
+
+    @property
+    def digest(self) -> str:
+        return self.__digest
+
+    @property
+    def outcome(self) -> ReportOutcome:
+        return self.__outcome
+
+    @property
+    def layout_version(self) -> str:
+        return self.__layout_version
+
+    @property
+    def succeeded(self) -> bool:
+        return self.__outcome != ReportOutcome.FAILED
+
+
+class RunManifest(object):
+    """
+    Journal of the handled reports: their paths, sizes, modification times, content hashes
+    and outcomes. Each report is appended as soon as it is handled, so an interrupted run
+    loses nothing. Reports which are unchanged since they were successfully parsed are
+    restored from the stored results instead of being parsed again.
+    """
+
+    def __init__(self, manifest_dir: Union[str, Path], layout_version: str = ""):
+        manifest_dir = Path(manifest_dir)
+        self.__manifest_path = Path(manifest_dir, _MANIFEST_FILE_NAME)
+        self.__results_dir = Path(manifest_dir, _RESULTS_DIR_NAME)
+        self.__layout_version = layout_version
+        paths.create_dir(self.__results_dir)
+        self.__entries = self.__load_entries()
+
+    @property
+    def entries(self) -> Dict[str, ManifestEntry]:
+        return self.__entries
+
+    @PROFILER.timed("manifest.restore")
+    def restore(self, report_source: Union[Path, ReportSource]) -> Union[None, Report]:
+        """
+        Load the report parsed by one of the previous runs
+        :param report_source: a path of the report file or the report source
+        :return: the report or None if the report is new, has changed or has not been parsed
+        """
+        report_source = ReportSource.of(report_source)
+        entry = self.__entries.get(report_source.key)
+        if (entry is None or not entry.succeeded
+                or entry.layout_version != self.__layout_version):
+            return None
+        try:
+            size, mtime = report_source.size, report_source.mtime
+            if (size, mtime) != (entry.size, entry.mtime):
+                if size != entry.size or report_source.digest() != entry.digest:
+                    return None
+                # the report has been touched or copied, but its content is the same
+                self.__append(ManifestEntry(entry.path, size, mtime, entry.digest,
+                                            entry.outcome, entry.layout_version))
+        except OSError:
+            return None
+        return self.__load_result(entry.path, entry.digest)
+
+    @PROFILER.timed("manifest.record")
+    def record(self, report_source: Union[Path, ReportSource], report: Union[None, Report]):
+        """
+        Append the outcome of the report to the manifest and store the report
+        :param report_source: a path of the report file or the report source
+        :param report: the parsed report or None if it has not been parsed
+        """
+        report_source = ReportSource.of(report_source)
+        digest = report_source.digest()
+        if report is None:
+            outcome = ReportOutcome.FAILED
+        else:
+            # the fields which have not been read are stored parsed as well
+            report.parse_all()
+            self.__store_result(report_source.key, digest, report)
+            if report.success:
+                outcome = ReportOutcome.PARSED
+            else:
+                outcome = ReportOutcome.PARSED_WITH_MISSING_VALUES
+        previous_entry = self.__entries.get(report_source.key)
+        self.__append(ManifestEntry(report_source.key, report_source.size, report_source.mtime,
+                                    digest, outcome, self.__layout_version))
+        # the result of the previous content of the report is not restored anymore
+        if previous_entry is not None and previous_entry.digest != digest:
+            self.__get_result_path(previous_entry.path, previous_entry.digest).unlink(
+                missing_ok=True)
+
+    def __get_result_path(self, key: str, digest: str) -> Path:
+        # the reports of the same content are stored apart, they have their own names
+        key_hash = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return Path(self.__results_dir, "%s_%s" % (digest, key_hash)).with_suffix(_RESULT_SUFFIX)
+
+    def __load_result(self, key: str, digest: str) -> Union[None, Report]:
+        try:
+            with open(str(self.__get_result_path(key, digest)), "rb") as result_file:
+                return pickle.loads(zlib.decompress(result_file.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError,
+                ImportError):
+            return None
+
+    def __store_result(self, key: str, digest: str, report: Report):
+        data = zlib.compress(pickle.dumps(report, pickle.HIGHEST_PROTOCOL), _COMPRESSION_LEVEL)
+        result_path = self.__get_result_path(key, digest)
+        temp_path = result_path.with_suffix(_RESULT_SUFFIX + _TEMP_SUFFIX)
+        with open(str(temp_path), "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(str(temp_path), str(result_path))
+
+    def __append(self, entry: ManifestEntry):
+        self.__entries[entry.path] = entry
+        with open(str(self.__manifest_path), "a", encoding='utf-8') as manifest_file:
+            manifest_file.write(json.dumps(entry.as_dict()) + '\n')
+
+    def __load_entries(self) -> Dict[str, ManifestEntry]:
+        entries = {}
+        lines_num = 0
+        is_cut_off = False
+        if not self.__manifest_path.is_file():
+            return entries
+        with open(str(self.__manifest_path), encoding='utf-8') as manifest_file:
+            for line in manifest_file:
+                lines_num += 1
+                # the last line may be cut off by an interruption
+                is_cut_off = not line.endswith('\n')
+                try:
+                    entry = ManifestEntry.from_dict(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                entries[entry.path] = entry
+        # the next entry would be appended to the cut off line and lost with it
+        if is_cut_off or lines_num > _COMPACTION_RATIO * len(entries):
+            self.__rewrite_entries(entries)
+        return entries
+
+    def __rewrite_entries(self, entries: Dict[str, ManifestEntry]):
+        temp_path = self.__manifest_path.with_suffix(_TEMP_SUFFIX)
+        with open(str(temp_path), "w", encoding='utf-8') as manifest_file:
+            for entry in entries.values():
+                manifest_file.write(json.dumps(entry.as_dict()) + '\n')
+        os.replace(str(temp_path), str(self.__manifest_path))
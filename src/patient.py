@@ -1,17 +1,27 @@
-from typing import Union, List
-# noinspection PyPep8Naming
-from datetime import timedelta as TimeDelta, datetime
+from typing import Union
+
+import numpy as np
+
+from src.cohort import CohortClassifier
+from src.profiling import PROFILER
 from src.report import Report
 from src.report_item import ReportItemKey
+from src.report_values import ReportValues
+from src.util.windows import WindowIndex
 
 EMPTY_VALUE_STR = "--"
 
-_BP_AWAKE_SYS_NORM = 135
-_DIFF_BP_SYS_NORM = 10
+_CLASSIFIER = CohortClassifier()
+_LAST_HOUR = np.timedelta64(1, 'h')
+
+
+def _to_float(value) -> float:
+    return np.nan if value == EMPTY_VALUE_STR else float(value)
 
 
 class Patient(object):
 
+    @PROFILER.timed("patient.init")
     def __init__(self, report: Report):
         self.__report_name = report.name
         self.__id = report.patient_id
@@ -37,11 +47,8 @@ class Patient(object):
             ReportItemKey.DIASTOLIC][ReportItemKey.ASLEEP]
         self.__avg_heart_rate_while_asleep = report.avg_bp[
             ReportItemKey.HEART_RATE][ReportItemKey.ASLEEP]
-        values = report.values
-        self.__measures_datetimes = values[ReportItemKey.DATETIME]
-        self.__systolic_blood_pressures = values[ReportItemKey.SYSTOLIC]
-        self.__diastolic_blood_pressures = values[ReportItemKey.DIASTOLIC]
-        self.__heart_rates = values[ReportItemKey.HEART_RATE]
+        self.__values = report.values
+        self.__windows = {}
         self.__blood_pressure_profile = Patient._calc_blood_pressure_profile(report.night_time_dip)
         self.__blood_pressure_phenotype = Patient._calc_blood_pressure_phenotype(
             report.avg_bp, report.white_coat_window)
@@ -117,85 +124,58 @@ class Patient(object):
         return self.__last_hour_max_systolic_blood_pressure
 
     @property
-    def measures_datetimes(self) -> List[datetime]:
-        return self.__measures_datetimes
+    def values(self) -> ReportValues:
+        return self.__values
 
     @property
-    def systolic_blood_pressures(self) -> List[Union[str, int]]:
-        return self.__systolic_blood_pressures
+    def measures_datetimes(self) -> np.ndarray:
+        return self.__values.datetimes
 
     @property
-    def diastolic_blood_pressures(self) -> List[Union[str, int]]:
-        return self.__diastolic_blood_pressures
+    def systolic_blood_pressures(self) -> np.ma.MaskedArray:
+        return self.__values.systolic_blood_pressures
 
     @property
-    def heart_rates(self) -> List[Union[str, int]]:
-        return self.__heart_rates
+    def diastolic_blood_pressures(self) -> np.ma.MaskedArray:
+        return self.__values.diastolic_blood_pressures
 
-    def __calc_last_hour_max_systolic_blood_pressure(self) -> Union[None, int]:
-        last_index = len(self.measures_datetimes) - 1
-        last_hour = self.measures_datetimes[-1] - TimeDelta(hours=1)
-        last_hour_index = last_index
-        for i, time in enumerate(self.measures_datetimes):
-            if time >= last_hour:
-                last_hour_index = i
-        last_hour_systolic_blood_pressures = self.systolic_blood_pressures[
-                                             last_hour_index:last_index + 1]
-        try:
-            if isinstance(last_hour_systolic_blood_pressures, list):
-                last_hour_max_systolic_blood_pressure = max(last_hour_systolic_blood_pressures)
+    @property
+    def heart_rates(self) -> np.ma.MaskedArray:
+        return self.__values.heart_rates
+
+    def windows(self, key: ReportItemKey) -> WindowIndex:
+        """
+        :param key: SYSTOLIC, DIASTOLIC or HEART_RATE
+        :return: the index of the queries over the values of the key within the windows of time
+        """
+        windows = self.__windows.get(key)
+        if windows is None:
+            if key == ReportItemKey.SYSTOLIC:
+                values = self.systolic_blood_pressures
+            elif key == ReportItemKey.DIASTOLIC:
+                values = self.diastolic_blood_pressures
+            elif key == ReportItemKey.HEART_RATE:
+                values = self.heart_rates
             else:
-                last_hour_max_systolic_blood_pressure = last_hour_systolic_blood_pressures
-        except ValueError:
+                raise KeyError("There are no values of %s" % key)
+            windows = WindowIndex(self.measures_datetimes, values)
+            self.__windows[key] = windows
+        return windows
+
+    def __calc_last_hour_max_systolic_blood_pressure(self) -> Union[None, int]:
+        if not len(self.measures_datetimes):
             return None
-        return last_hour_max_systolic_blood_pressure
+        last_datetime = self.measures_datetimes.max()
+        return self.windows(ReportItemKey.SYSTOLIC).max(last_datetime - _LAST_HOUR, last_datetime)
 
     @staticmethod
     def _calc_blood_pressure_profile(night_time_dip) -> int:
         ntd_sys = night_time_dip[ReportItemKey.SYSTOLIC][ReportItemKey.DIP]
-        if ntd_sys == EMPTY_VALUE_STR:
-            return 0
-        if 10. < ntd_sys <= 20:
-            return 1
-        elif 0. < ntd_sys <= 10:
-            return 2
-        elif ntd_sys <= 0.:
-            return 3
-        elif 20. < ntd_sys:
-            return 4
+        return int(_CLASSIFIER.classify_profiles([_to_float(ntd_sys)])[0])
 
     @staticmethod
     def _calc_blood_pressure_phenotype(avg_bp, white_coat_window) -> int:
-        avg_bp_sys = avg_bp[ReportItemKey.SYSTOLIC]
-        avg_bp_sys_awake = avg_bp_sys[ReportItemKey.AWAKE]
-        wcw_sys = white_coat_window[ReportItemKey.SYSTOLIC]
-        wcw_sys_first_hour = wcw_sys[ReportItemKey.FIRST_HOUR]
-        if wcw_sys_first_hour == EMPTY_VALUE_STR:
-            return 0
-        diff = abs(avg_bp_sys_awake - wcw_sys_first_hour)
-        if (avg_bp_sys_awake < _BP_AWAKE_SYS_NORM
-            and wcw_sys_first_hour < _BP_AWAKE_SYS_NORM
-            and diff < _DIFF_BP_SYS_NORM):
-            return 1
-        elif (avg_bp_sys_awake < _BP_AWAKE_SYS_NORM and wcw_sys_first_hour < _BP_AWAKE_SYS_NORM
-              and diff >= _DIFF_BP_SYS_NORM):
-            return 2
-        elif ((avg_bp_sys_awake >= _BP_AWAKE_SYS_NORM or wcw_sys_first_hour >= _BP_AWAKE_SYS_NORM)
-              and diff < _DIFF_BP_SYS_NORM):
-            return 3
-        elif (avg_bp_sys_awake >= _BP_AWAKE_SYS_NORM > wcw_sys_first_hour
-              and diff >= _DIFF_BP_SYS_NORM):
-            return 4
-        elif (avg_bp_sys_awake < _BP_AWAKE_SYS_NORM <= wcw_sys_first_hour
-              and diff >= _DIFF_BP_SYS_NORM):
-            return 5
-        elif (avg_bp_sys_awake >= _BP_AWAKE_SYS_NORM
-              and wcw_sys_first_hour >= _BP_AWAKE_SYS_NORM
-              and diff >= _DIFF_BP_SYS_NORM):
-            return 6
-
-
-
-
-
-
+        avg_bp_sys_awake = avg_bp[ReportItemKey.SYSTOLIC][ReportItemKey.AWAKE]
+        wcw_sys_first_hour = white_coat_window[ReportItemKey.SYSTOLIC][ReportItemKey.FIRST_HOUR]
+        return int(_CLASSIFIER.classify_phenotypes([_to_float(avg_bp_sys_awake)],
+                                                   [_to_float(wcw_sys_first_hour)])[0])
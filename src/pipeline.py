@@ -0,0 +1,192 @@
+import asyncio
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from src.chart import ChartRenderer
+from src.manifest import RunManifest
+from src.patient import Patient
+from src.quarantine import Quarantine
+from src.report import Report
+from src.report_archive import ReportArchiveWriter
+from src.report_builder import ReportBuilder
+from src.report_dataframe import PatientTableWriter
+from src.report_logging import ReportsStatistics
+from src.report_source import ReportSource
+from src.report_stream import build_report_with_logging, log_quarantined_report, \
+    log_restored_report
+
+# one thread lists the reports and restores them from the manifest, the other one records them
+# to the manifest and writes the archive
+_IO_WORKERS_NUM = 2
+
+# a report source with its report restored from the manifest, if it is quarantined,
+# and the future of its parsing
+PipelineItem = Tuple[ReportSource, Union[None, Report], bool, Union[None, Future]]
+
+
+class ReportPipeline(object):
+    """
+    Runs the stages of the handling concurrently: the reports are listed and restored from
+    the manifest in a thread, read and parsed in the executor and added to the chart
+    and the table in the order they are listed. The chart is drawn in a process of its own
+    meanwhile and its figures are saved at the end.
+    The stages are connected by bounded queues, so the listing waits for the parsing
+    and at most a queue of reports is held in memory. The rows of the table are written
+    as the patients are added.
+    The parsed reports are appended to the archive as they are added if its path is given.
+    """
+
+    def __init__(self, report_builder: ReportBuilder, executor: Executor, queue_size: int,
+                 manifest: RunManifest = None, quarantine: Quarantine = None,
+                 archive_path: Path = None, table_flush_interval: int = 100):
+        self.__report_builder = report_builder
+        self.__executor = executor
+        self.__queue_size = max(1, queue_size)
+        self.__manifest = manifest
+        self.__quarantine = quarantine
+        self.__archive_path = archive_path
+        self.__table_flush_interval = table_flush_interval
+
+    def run(self, reports_sources: Iterable[Union[Path, ReportSource]],
+            statistics: ReportsStatistics, output_dir: Path, output_file_name: str,
+            separator: str = ',') -> Tuple[Union[None, List[int]], Path]:
+        """
+        :return: the sizes of the groups of the chart, None if the figures have not been saved,
+        and the path of the table
+        """
+        loop = asyncio.new_event_loop()
+        io_executor = ThreadPoolExecutor(max_workers=_IO_WORKERS_NUM)
+        try:
+            return loop.run_until_complete(self.__run(reports_sources, statistics, output_dir,
+                                                      output_file_name, separator, io_executor))
+        finally:
+            io_executor.shutdown()
+            loop.close()
+
+    async def __run(self, reports_sources: Iterable[Union[Path, ReportSource]],
+                    statistics: ReportsStatistics, output_dir: Path, output_file_name: str,
+                    separator: str, io_executor: Executor
+                    ) -> Tuple[Union[None, List[int]], Path]:
+        loop = asyncio.get_event_loop()
+        # the figures are drawn in a process of their own while the reports are parsed
+        chart_renderer = ChartRenderer(output_dir, output_file_name, self.__queue_size)
+        archive_writer = None
+        if self.__archive_path is not None:
+            archive_writer = ReportArchiveWriter(self.__archive_path)
+        table_writer = PatientTableWriter(output_dir, output_file_name, separator=separator,
+                                          flush_interval=self.__table_flush_interval)
+        try:
+            with table_writer:
+                await self.__run_stages(reports_sources, statistics, chart_renderer,
+                                        table_writer, archive_writer, io_executor)
+        except BaseException:
+            chart_renderer.terminate()
+            if archive_writer is not None:
+                archive_writer.discard()
+            raise
+        archive_writing = None
+        if archive_writer is not None:
+            archive_writing = loop.run_in_executor(io_executor, archive_writer.close)
+        await loop.run_in_executor(io_executor, chart_renderer.close)
+        if archive_writing is not None:
+            await archive_writing
+        return chart_renderer.sizes_of_groups, table_writer.output_path
+
+    async def __run_stages(self, reports_sources: Iterable[Union[Path, ReportSource]],
+                           statistics: ReportsStatistics, chart_renderer: ChartRenderer,
+                           table_writer: PatientTableWriter,
+                           archive_writer: Union[None, ReportArchiveWriter],
+                           io_executor: Executor):
+        read_queue = asyncio.Queue(maxsize=self.__queue_size)
+        parse_queue = asyncio.Queue(maxsize=self.__queue_size)
+        stages = [
+            asyncio.ensure_future(self.__read(iter(reports_sources), read_queue, io_executor)),
+            asyncio.ensure_future(self.__parse(read_queue, parse_queue)),
+            asyncio.ensure_future(self.__collect(parse_queue, statistics, chart_renderer,
+                                                 table_writer, archive_writer, io_executor))
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            for stage in stages:
+                stage.cancel()
+            raise
+
+    async def __read(self, reports_sources: Iterator[Union[Path, ReportSource]],
+                     read_queue: asyncio.Queue, io_executor: Executor):
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await loop.run_in_executor(io_executor, self.__read_next, reports_sources)
+            await read_queue.put(item)
+            if item is None:
+                break
+
+    def __read_next(self, reports_sources: Iterator[Union[Path, ReportSource]]
+                    ) -> Union[None, PipelineItem]:
+        source = next(reports_sources, None)
+        if source is None:
+            return None
+        source = ReportSource.of(source)
+        restored_report = None
+        if self.__manifest is not None:
+            restored_report = self.__manifest.restore(source)
+        is_quarantined = self.__quarantine is not None and self.__quarantine.contains(source)
+        # a report file is sent to the worker by its path and read there in the input mode
+        # of the builder, the members of the archives are already read by the collection
+        return source, restored_report, is_quarantined, None
+
+    async def __parse(self, read_queue: asyncio.Queue, parse_queue: asyncio.Queue):
+        while True:
+            item = await read_queue.get()
+            if item is None:
+                await parse_queue.put(None)
+                break
+            source, restored_report, is_quarantined, _ = item
+            future = None
+            if restored_report is None and not is_quarantined:
+                future = self.__executor.submit(self.__report_builder.build, source,
+                                                complete=True)
+            # the queue holds the reports being parsed, so it bounds the submitted ones
+            await parse_queue.put((source, restored_report, is_quarantined, future))
+
+    async def __collect(self, parse_queue: asyncio.Queue, statistics: ReportsStatistics,
+                        chart_renderer: ChartRenderer, table_writer: PatientTableWriter,
+                        archive_writer: Union[None, ReportArchiveWriter], io_executor: Executor):
+        loop = asyncio.get_event_loop()
+        index = 0
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                break
+            index += 1
+            statistics.count_report()
+            source, restored_report, is_quarantined, future = item
+            if restored_report is not None:
+                log_restored_report(index, source, statistics)
+                self.__add_patient(restored_report, chart_renderer, table_writer, archive_writer)
+                continue
+            if is_quarantined:
+                log_quarantined_report(index, source, statistics, self.__quarantine)
+                continue
+            try:
+                await asyncio.wrap_future(future)
+            except Exception:
+                # the failure is logged below
+                pass
+            report = build_report_with_logging(index, source, statistics, self.__report_builder,
+                                               future, self.__quarantine)
+            if self.__manifest is not None:
+                await loop.run_in_executor(io_executor, self.__manifest.record, source, report)
+            if report is not None:
+                self.__add_patient(report, chart_renderer, table_writer, archive_writer)
+
+    @staticmethod
+    def __add_patient(report: Report, chart_renderer: ChartRenderer,
+                      table_writer: PatientTableWriter,
+                      archive_writer: Union[None, ReportArchiveWriter]):
+        patient = Patient(report)
+        chart_renderer.add_patients([patient])
+        table_writer.write([patient])
+        if archive_writer is not None:
+            archive_writer.add(report)
@@ -0,0 +1,164 @@
+import cProfile
+import json
+from array import array
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from functools import wraps
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, ContextManager, Dict, List, Tuple, TypeVar, Union
+
+import numpy as np
+
+from src.util import paths
+
+T = TypeVar('T')
+
+# the durations of the stages in seconds by their names and the counters by their names
+ProfileSample = Tuple[Dict[str, List[float]], Dict[str, int]]
+
+_PERCENTILES = 50, 95
+_PROFILE_SUFFIX = ".prof"
+_NULL_STAGE = nullcontext()
+
+
+class _Stage(object):
+    __slots__ = ('__durations', '__start')
+
+    def __init__(self, durations: array):
+        self.__durations = durations
+        self.__start = None
+
+    def __enter__(self):
+        self.__start = perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__durations.append(perf_counter() - self.__start)
+
+
+class StageProfiler(object):
+    """
+    Times the stages of the handling of the reports and counts the events within them.
+    It does nothing until it is enabled, so the stages are left instrumented.
+    Every process has its own profiler, the samples of the workers are merged
+    into the profiler of the main process.
+    """
+
+    def __init__(self):
+        self.__enabled = False
+        self.__durations = defaultdict(lambda: array('d'))
+        self.__counters = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    def enable(self):
+        self.__enabled = True
+
+    def disable(self):
+        self.__enabled = False
+
+    def stage(self, name: str) -> ContextManager:
+        """
+        Time the code within the context as the stage of the given name
+        """
+        if not self.__enabled:
+            return _NULL_STAGE
+        return _Stage(self.__durations[name])
+
+    def timed(self, name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+        """
+        Time the calls of the decorated function as the stage of the given name
+        """
+        def decorate(func: Callable[..., T]) -> Callable[..., T]:
+            @wraps(func)
+            def timed_func(*args, **kwargs) -> T:
+                if not self.__enabled:
+                    return func(*args, **kwargs)
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.__durations[name].append(perf_counter() - start)
+            return timed_func
+        return decorate
+
+    def count(self, name: str, number: int = 1):
+        if self.__enabled:
+            self.__counters[name] += number
+
+    def drain(self) -> ProfileSample:
+        """
+        Take the durations and the counters collected since the last drain
+        """
+        sample = ({name: durations.tolist() for name, durations in self.__durations.items()},
+                  dict(self.__counters))
+        self.__durations.clear()
+        self.__counters.clear()
+        return sample
+
+    def merge(self, sample: Union[None, ProfileSample]):
+        if sample is None:
+            return
+        durations_by_names, counters = sample
+        for name, durations in durations_by_names.items():
+            self.__durations[name].extend(durations)
+        self.__counters.update(counters)
+
+    def summarize(self) -> Dict[str, Dict[str, Dict[str, Union[int, float]]]]:
+        """
+        :return: the numbers, the total, the median, the 95th percentile and the maximum
+        of the durations of the stages in seconds and the counters
+        """
+        stages = {}
+        for name in sorted(self.__durations):
+            durations = np.frombuffer(self.__durations[name], dtype=np.float64)
+            if not len(durations):
+                continue
+            p50, p95 = np.percentile(durations, _PERCENTILES)
+            stages[name] = {"count": len(durations), "total": float(durations.sum()),
+                            "p50": float(p50), "p95": float(p95),
+                            "max": float(durations.max())}
+        return {"stages": stages, "counters": dict(sorted(self.__counters.items()))}
+
+    def write_json(self, path: Path):
+        paths.create_dir(path.parent)
+        with open(str(path), "w", encoding='utf-8') as summary_file:
+            json.dump(self.summarize(), summary_file, indent=2)
+
+
+PROFILER = StageProfiler()
+
+
+class ProfilingSettings(object):
+    """
+    Enables the profiler of the processes the reports are built in.
+    The report of the given name is also run under cProfile and its statistics are dumped
+    into the output directory
+    """
+
+    def __init__(self, profiled_report_name: str = None, output_dir: Path = None):
+        self.__profiled_report_name = profiled_report_name
+        self.__output_dir = output_dir
+
+    @property
+    def profiled_report_name(self) -> Union[None, str]:
+        return self.__profiled_report_name
+
+    @property
+    def output_dir(self) -> Union[None, Path]:
+        return self.__output_dir
+
+    def run(self, report_name: str, func: Callable[[], T]) -> T:
+        """
+        Run the building of the report under cProfile if it is the profiled one
+        """
+        if report_name != self.__profiled_report_name or self.__output_dir is None:
+            return func()
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func)
+        finally:
+            paths.create_dir(self.__output_dir)
+            profile.dump_stats(str(Path(self.__output_dir, report_name + _PROFILE_SUFFIX)))
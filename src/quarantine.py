@@ -0,0 +1,51 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Union
+
+from src.report_source import ReportSource
+
+_TEMP_SUFFIX = ".tmp"
+
+
+class Quarantine(object):
+    """
+    Reports which have exceeded the limits of the workers or are malformed.
+    They are skipped by the later runs until their files change.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.__path = Path(path)
+        self.__entries = self.__load_entries()
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Union[str, int]]]:
+        return self.__entries
+
+    def contains(self, report_source: Union[Path, ReportSource]) -> bool:
+        report_source = ReportSource.of(report_source)
+        entry = self.__entries.get(report_source.key)
+        if entry is None:
+            return False
+        try:
+            return (entry["size"], entry["mtime"]) == (report_source.size, report_source.mtime)
+        except OSError:
+            return False
+
+    def add(self, report_source: Union[Path, ReportSource], reason: str):
+        report_source = ReportSource.of(report_source)
+        self.__entries[report_source.key] = {"size": report_source.size,
+                                             "mtime": report_source.mtime, "reason": reason}
+        temp_path = self.__path.with_suffix(_TEMP_SUFFIX)
+        with open(str(temp_path), "w", encoding='utf-8') as quarantine_file:
+            json.dump(self.__entries, quarantine_file, indent=2, sort_keys=True)
+        os.replace(str(temp_path), str(self.__path))
+
+    def __load_entries(self) -> Dict[str, Dict[str, Union[str, int]]]:
+        if not self.__path.is_file():
+            return {}
+        with open(str(self.__path), encoding='utf-8') as quarantine_file:
+            try:
+                return json.load(quarantine_file)
+            except ValueError:
+                return {}
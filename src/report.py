@@ -1,15 +1,57 @@
 import operator
 from collections import defaultdict
-from datetime import datetime
 
 from sys import stderr
 
-import collections
-from typing import Tuple, Dict, TypeVar, List, Union
+import collections.abc
+from typing import Callable, Generic, Tuple, Dict, TypeVar, List, Union
+
+import numpy as np
 
 from src.file_process import ReportSpace, BlockStore
-from src.report_item import ReportItem, ReportItemKey, ReportItemPattern, ReportString, ReportBlock
-from src.util import math_util as mutil
+from src.profiling import PROFILER, ProfileSample
+from src.report_item import ReportItem, ReportItemKey, ReportItemPattern, ReportString, \
+    ReportBlock, NumberColumn
+from src.report_values import ReportValues
+from src.util import partition, time_util as tutil
+
+T = TypeVar('T')
+
+
+class _LazyField(Generic[T]):
+    """
+    The field of the report which is parsed on the first access. The parsed value is put
+    into the report under the name of the field, so it hides the field from then on.
+    The parses take their items out of the blocks, so a field parsed after the others
+    from the same block declares them as its dependencies and they are parsed first
+    """
+
+    def __init__(self, parse: Callable[['Report'], T], dependencies: Tuple[str, ...]):
+        self.__parse = parse
+        self.__dependencies = dependencies
+        self.__name = parse.__name__
+        self.__stage_name = "report.%s" % self.__name.lstrip('_')
+
+    def __set_name__(self, owner: type, name: str):
+        self.__name = name
+        self.__stage_name = "report.%s" % name.lstrip('_')
+
+    def __get__(self, report: 'Report', owner: type = None) -> Union['_LazyField[T]', T]:
+        if report is None:
+            return self
+        for dependency in self.__dependencies:
+            getattr(report, dependency)
+        # the dependencies are timed as their own stages
+        with PROFILER.stage(self.__stage_name):
+            value = self.__parse(report)
+        report.__dict__[self.__name] = value
+        return value
+
+
+def _lazy_field(*dependencies: str) -> Callable[[Callable[['Report'], T]], _LazyField[T]]:
+    def decorate(parse: Callable[['Report'], T]) -> _LazyField[T]:
+        return _LazyField(parse, dependencies)
+    return decorate
 
 
 class Report(object):
@@ -35,28 +77,14 @@ class Report(object):
 
     _MAX_COLUMN_VALUES_NUM = 25
 
+    # the version of the parsed values, it is changed when they are stored differently,
+    # so that the reports restored by the manifest are parsed again
+    VERSION = 4
+
     def __init__(self, name: str, blocks: BlockStore):
         self.__name = name
         self.__blocks = blocks
-        main_block = blocks.get(ReportSpace.ALL)
-        main_block.remove_item(ReportItemPattern.PAGINATOR)
-        self.__title = self.__parse_title()
-        self.__physician = self.__parse_physician()
-        self.__period = self.__parse_period()
-        self.__study_date = self.__parse_study_date()
-        self.__awake, self.__asleep = self.__parse_awake_asleep
-        self.__bp_threshold = self.__parse_bp_threshold()
-        self.__readings = self.__parse_readings()
-        self.__bp_load = self.__parse_bp_load()
-        main_block.remove_item(ReportItemPattern.PERIOD)
-        self.__patient_id = self.__parse_patient_id()
-        self.__patient_name = self.__parse_patient_name()
-        sex_and_age_and_dob = self.__parse_sex_age_dob_triplet()
-        self.__patient_sex, self.__patient_age, self.__patient_date_of_birth = sex_and_age_and_dob
-        self.__avg_bp = self.__parse_avg_bp()
-        self.__white_coat_window = self.__parse_white_coat_window()
-        self.__night_time_dip = self.__parse_night_time_dip()
-        self.__values, self.__success, self.__message = self.__parse_values()
+        self.__profile_sample = None
 
     @property
     def name(self) -> str:
@@ -66,112 +94,92 @@ class Report(object):
     def blocks(self) -> BlockStore:
         return self.__blocks
 
-    @property
-    def title(self) -> str:
-        return self.__title
-
-    @property
-    def physician(self) -> str:
-        return self.__physician
-
-    @property
-    def period(self) -> Dict[ReportItemKey, Dict[ReportItemKey, str]]:
-        return self.__period
-
-    @property
-    def study_date(self) -> str:
-        return self.__study_date
-
     @property
     def awake(self) -> str:
-        return self.__awake
+        return self._awake_asleep[0]
 
     @property
     def asleep(self) -> str:
-        return self.__asleep
-
-    @property
-    def bp_threshold(self) -> Dict[ReportItemKey, str]:
-        return self.__bp_threshold
-
-    @property
-    def readings(self) -> Dict[ReportItemKey, str]:
-        return self.__readings
-
-    @property
-    def bp_load(self) -> Dict[ReportItemKey, str]:
-        return self.__bp_load
-
-    @property
-    def patient_id(self) -> str:
-        return self.__patient_id
-
-    @property
-    def patient_name(self) -> str:
-        return self.__patient_name
+        return self._awake_asleep[1]
 
     @property
     def patient_sex(self) -> str:
-        return self.__patient_sex
+        return self._patient_sex_age_dob[0]
 
     @property
     def patient_age(self) -> str:
-        return self.__patient_age
+        return self._patient_sex_age_dob[1]
 
     @property
     def patient_date_of_birth(self) -> str:
-        return self.__patient_date_of_birth
-
-    @property
-    def values(self) -> Dict[ReportItemKey, List[Union[str, int, datetime]]]:
-        return self.__values
-
-    @property
-    def avg_bp(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, int]]]:
-        return self.__avg_bp
+        return self._patient_sex_age_dob[2]
 
     @property
-    def night_time_dip(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, float]]]:
-        return self.__night_time_dip
-
-    @property
-    def white_coat_window(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, int]]]:
-        return self.__white_coat_window
+    def values(self) -> ReportValues:
+        return self._values_success_message[0]
 
     @property
     def success(self) -> bool:
-        return self.__success
+        return self._values_success_message[1]
 
     @property
     def message(self) -> str:
-        return self.__message
-
-    def __parse_title(self) -> str:
+        return self._values_success_message[2]
+
+    def attach_profile_sample(self, sample: ProfileSample):
+        """
+        Attach the timings of the building of the report in a worker,
+        so that they are sent to the main process with it
+        """
+        self.__profile_sample = sample
+
+    def take_profile_sample(self) -> Union[None, ProfileSample]:
+        sample = self.__profile_sample
+        self.__profile_sample = None
+        return sample
+
+    def parse_all(self):
+        """
+        Parse the fields which have not been accessed yet,
+        so that the report is complete when it is pickled
+        """
+        for name, attribute in vars(Report).items():
+            if isinstance(attribute, _LazyField):
+                getattr(self, name)
+
+    @_lazy_field()
+    def title(self) -> str:
         main_block = self.blocks.get(ReportSpace.ALL)
+        main_block.remove_item(ReportItemPattern.PAGINATOR)
         title = main_block.remove_item(ReportItemPattern.TITLE)
         return str(title)
 
-    def __parse_physician(self) -> str:
+    @_lazy_field('title')
+    def physician(self) -> str:
         main_block = self.blocks.get(ReportSpace.ALL)
         physician_entry = main_block.remove_item(ReportItemPattern.PHYSICIAN_ENTRY).as_entry()
         physician = physician_entry[1]
         return physician
 
-    def __parse_study_date(self) -> str:
+    @_lazy_field('physician')
+    def study_date(self) -> str:
         main_block = self.blocks.get(ReportSpace.ALL)
         study_date = main_block.remove_item(ReportItemPattern.STUDY_DATE)
         study_date = study_date.matches(ReportItemPattern.DATE)
         return study_date
 
-    def __parse_patient_id(self) -> str:
+    @_lazy_field('readings')
+    def patient_id(self) -> str:
         main_block = self.blocks.get(ReportSpace.ALL)
+        main_block.remove_item(ReportItemPattern.PERIOD)
         patient_block = self.blocks.get(ReportSpace.PATIENT)
         patient_id = str(patient_block.remove_item(ReportItemPattern.PATIENT_ID))
         if not patient_id:
             patient_id = str(main_block.remove_item(ReportItemPattern.PATIENT_ID))
         return "'%s'" % patient_id
 
-    def __parse_patient_name(self) -> str:
+    @_lazy_field('patient_id')
+    def patient_name(self) -> str:
         main_block = self.blocks.get(ReportSpace.ALL)
         patient_block = self.blocks.get(ReportSpace.PATIENT)
         patient_name = str(patient_block.remove_item(ReportItemPattern.PATIENT_NAME))
@@ -179,7 +187,8 @@ class Report(object):
             patient_name = str(main_block.remove_item(ReportItemPattern.PATIENT_NAME))
         return patient_name
 
-    def __parse_period(self) -> Dict[ReportItemKey, Dict[ReportItemKey, str]]:
+    @_lazy_field()
+    def period(self) -> Dict[ReportItemKey, Dict[ReportItemKey, str]]:
         day_night_block = self.blocks.get(ReportSpace.DAY_NIGHT)
         day_night_block.remove_item(ReportItemPattern.PERIOD)
         num_of_values = 2
@@ -196,8 +205,8 @@ class Report(object):
                                ReportItem.PERIOD_INTERVAL.key: period_interval}
         return period
 
-    @property
-    def __parse_awake_asleep(self) -> Tuple[str, str]:
+    @_lazy_field('period')
+    def _awake_asleep(self) -> Tuple[str, str]:
         day_night_block = self.blocks.get(ReportSpace.DAY_NIGHT)
         awake = None
         asleep = None
@@ -209,7 +218,8 @@ class Report(object):
             asleep = ReportString(awake_asleep[1]).as_entry()
         return awake[1], asleep[1]
 
-    def __parse_readings(self) -> Dict[ReportItemKey, str]:
+    @_lazy_field('study_date')
+    def readings(self) -> Dict[ReportItemKey, str]:
         readings = {}
         main_block = self.blocks.get(ReportSpace.ALL)
         readings_block = self.blocks.get(ReportSpace.READINGS_BP)
@@ -222,7 +232,8 @@ class Report(object):
         readings[ReportItemKey.SUCCESSFUL_READINGS] = str(successful_readings)
         return readings
 
-    def __parse_bp_threshold(self) -> Dict[ReportItemKey, str]:
+    @_lazy_field('_awake_asleep')
+    def bp_threshold(self) -> Dict[ReportItemKey, str]:
         bp_value = {}
         num_of_values = 2
         day_night_block = self.blocks.get(ReportSpace.DAY_NIGHT)
@@ -234,7 +245,8 @@ class Report(object):
                 bp_value[key] = ReportString(threshold[1]).as_value()
         return bp_value
 
-    def __parse_bp_load(self) -> Dict[ReportItemKey, str]:
+    @_lazy_field('readings')
+    def bp_load(self) -> Dict[ReportItemKey, str]:
         bp_value = {}
         num_of_values = 2
         day_night_block = self.blocks.get(ReportSpace.READINGS_BP)
@@ -249,7 +261,8 @@ class Report(object):
                 bp_value[key] = str(load)
         return bp_value
 
-    def __parse_sex_age_dob_triplet(self) -> Tuple[str, str, str]:
+    @_lazy_field('patient_name')
+    def _patient_sex_age_dob(self) -> Tuple[str, str, str]:
         num_of_values = 2
         patient_block = self.blocks.get(ReportSpace.PATIENT)
         patient_sex, age_and_birth_date = patient_block.search_sequence_by_header_pattern(
@@ -290,7 +303,8 @@ class Report(object):
         return row
 
     # TODO: Try to refactor it.
-    def __parse_avg_bp(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, int]]]:
+    @_lazy_field()
+    def avg_bp(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, int]]]:
         avg_bp = defaultdict(dict)
         avg_bp_block = self.blocks.get(ReportSpace.AVG_BP)
         avg_bp_block.remove_item(ReportItemPattern.AVG_BLOOD_PRESSURE)
@@ -318,8 +332,8 @@ class Report(object):
         return dict(avg_bp)
 
     # TODO: Try to refactor it.
-    def __parse_white_coat_window(self) -> Dict[ReportItemKey, Dict[ReportItemKey,
-                                                                    Union[str, int]]]:
+    @_lazy_field()
+    def white_coat_window(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, int]]]:
         white_coat_window = defaultdict(dict)
         white_coat_window_block = self.blocks.get(ReportSpace.WHITE_COAT_WINDOW)
         white_coat_window_block.remove_item(ReportItemPattern.WHITE_COAT_WINDOW)
@@ -349,7 +363,8 @@ class Report(object):
                 values_by_type[Report._WHITE_COAT_WINDOW_KEYS[j]] = value
         return dict(white_coat_window)
 
-    def __parse_night_time_dip(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, float]]]:
+    @_lazy_field()
+    def night_time_dip(self) -> Dict[ReportItemKey, Dict[ReportItemKey, Union[str, float]]]:
         night_time_dip = defaultdict(dict)
         night_time_dip_block = self.blocks.get(ReportSpace.NIGHT_TIME_DIP)
         night_time_dip_block.remove_item(ReportItemPattern.NIGHT_TIME_DIP)
@@ -372,223 +387,70 @@ class Report(object):
             values_by_type[ReportItemKey.DIP] = parse_night_time_dip_value(value_item.pattern)
         return dict(night_time_dip)
 
-    def __parse_values(self) -> Tuple[Dict[ReportItemKey, List[Union[str, int, datetime]]],
-                                      bool, str]:
-        all_vals = {}
+    @_lazy_field()
+    def _values_success_message(self) -> Tuple[ReportValues, bool, str]:
         dt_cols, t_nums = self.__parse_datetime_columns(remove_after=True)
+        if not dt_cols:
+            raise ValueError("There are no times of the measurements in the report")
         hr_cols = self.__parse_hr_columns(t_nums)
         sd_cols, (success, message) = self.__parse_sd_columns(t_nums)
-        sys_cols, dia_cols = sd_cols
-        for _ in t_nums:
-            all_vals[ReportItemKey.DATETIME] = [item for sublist in dt_cols for item in sublist]
-            all_vals[ReportItemKey.SYSTOLIC] = [item for sublist in sys_cols for item in sublist]
-            all_vals[ReportItemKey.DIASTOLIC] = [item for sublist in dia_cols for item in sublist]
-            all_vals[ReportItemKey.HEART_RATE] = [item for sublist in hr_cols for item in sublist]
-        return all_vals, success, message
+        columns = []
+        for dt_col, sd_col, hr_col in zip(dt_cols, sd_cols, hr_cols):
+            sys_col, dia_col = sd_col if sd_col is not None else (None, None)
+            columns.append(ReportValues.of_column(dt_col, sys_col, dia_col, hr_col))
+        return ReportValues.concatenate(columns), success, message
 
     def __parse_sd_columns(
-            self, t_nums:
-            List[Union[Tuple[int, ...], int, str]]) -> Tuple[Tuple[List[List[Union[int, str]]],
-                                                                   List[List[Union[int, str]]]],
-                                                             Tuple[bool, str]]:
-        sys_cols = []
-        dia_cols = []
+            self, t_nums: List[Union[Tuple[int, ...], int]]
+    ) -> Tuple[List[Union[None, Tuple[np.ndarray, np.ndarray]]], Tuple[bool, str]]:
+        sd_cols = []
         message = None
         global_success = True
         for i, t_num in enumerate(t_nums):
-            res, local_success = self.__parse_sd_column(Report._VALUES_SD_KEYS[i], t_num)
+            sd_col, local_success = self.__parse_sd_column(Report._VALUES_SD_KEYS[i], t_num)
             if not local_success:
                 global_success = local_success
                 message = "Please enter the values of periodic measurements of " \
                           "the blood pressure (systolic and diastolic) of the column #%d " \
                           "manually" % (i + 1)
-            sys_col, dia_col = res
-            if sys_col:
-                sys_cols.append(sys_col)
-            if dia_col:
-                dia_cols.append(dia_col)
-        return (sys_cols, dia_cols), (global_success, message)
+            sd_cols.append(sd_col)
+        return sd_cols, (global_success, message)
 
     def __parse_sd_column(
-            self, sd_key: ReportSpace, t_num: Union[Tuple[int, ...],
-                                                    int]) -> Union[
-                                                             Tuple[Tuple[List[int], ...], bool],
-                                                             Tuple[List[int], List[int]]]:
-        sys_column = []
-        dia_column = []
-        sd_col = []
-        num_group = []
+            self, sd_key: ReportSpace, t_num: Union[Tuple[int, ...], int]
+    ) -> Tuple[Union[None, Tuple[np.ndarray, np.ndarray]], bool]:
+        """
+        :return: the systolic and diastolic columns or None if they have to be entered manually
+        and whether they have been parsed
+        """
         block = self.blocks.get(sd_key)
         if not block:
-            return sys_column, dia_column
-        index, _ = block.search_first_occurrence_by_pattern(ReportItemPattern.TWO_THREE_DIGITS_NUM)
-        while index < len(block):
-            value = block[index]
-            match = ReportString(value).matches(ReportItemPattern.TWO_THREE_DIGITS_NUM)
-            if match:
-                num_group.append(int(value))
-            elif num_group:
-                sd_col.append(num_group)
-                num_group = []
-            index += 1
-        if num_group:
-            sd_col.append(num_group)
-        col_pair = None
-
-        def distribute_columns_by_mean(columns: List[List[int]]):
-            if mutil.mean(columns[0]) < mutil.mean(columns[1]):
-                columns[0], columns[1] = columns[1], columns[0]
-
-        def merge_columns(col_first_part, col_second_part):
-            columns = [col_first_part[0] + col_second_part[0],
-                       col_first_part[1] + col_second_part[1]]
-            return columns
-
-        def distribute_and_merge_columns(col_first_part, col_second_part):
-            distribute_columns_by_mean(col_first_part)
-            distribute_columns_by_mean(col_second_part)
-            return merge_columns(col_first_part, col_second_part)
-
-        def process_columns(columns: List[Tuple[int, List[int]]]):
-            columns = columns[:2]
-            return [each[0] for each in columns], [each[1] for each in columns]
-
-        def process_double_columns(columns):
-            k, columns = columns[0]
-            half_len = int(len(columns) / 2)
-            return k, [columns[:half_len], columns[half_len:]]
-
-        def clear_values(indices: List[int]):
-            for idx in sorted(indices, reverse=True):
-                del sd_col[idx]
-
-        if isinstance(t_num, tuple):
-            tn_full = sum(t_num)
-            if len(t_num) == 2:
-                tn_fp, tn_sp = t_num
-                double_tn_fp, double_tn_sp = tuple([2 * each for each in t_num])
-                sd_fp, sd_sp = [], []
-                double_sd_fp, double_sd_sp = [], []
-                sd_full = []
-                for j, value in enumerate(sd_col):
-                    val_len = len(value)
-                    if val_len == tn_fp:
-                        sd_fp.append((j, value))
-                    elif val_len == tn_sp:
-                        sd_sp.append((j, value))
-                    elif double_tn_fp != double_tn_sp:
-                        if val_len == double_tn_fp:
-                            double_sd_fp.append((j, value))
-                        elif val_len == double_tn_sp:
-                            double_sd_sp.append((j, value))
-                        elif val_len == tn_full:
-                            sd_full.append((j, value))
-                    elif val_len == tn_full:
-                        sd_full.append((j, value))
-                sd_fp_len = len(sd_fp)
-                sd_sp_len = len(sd_sp)
-                double_sd_fp_len = len(double_sd_fp)
-                double_sd_sp_len = len(double_sd_sp)
-                sd_full_len = len(sd_full)
-                remove_indices = []
-                if sd_fp_len >= 2:
-                    indcs, sd_fp = process_columns(sd_fp)
-                    remove_indices.extend(indcs)
-                    if sd_sp_len >= 2:
-                        indcs, sd_sp = process_columns(sd_sp)
-                        remove_indices.extend(indcs)
-                        col_pair = distribute_and_merge_columns(sd_fp, sd_sp)
-                        clear_values(remove_indices)
-                    elif double_sd_sp_len >= 1:
-                        index, double_sd_sp = process_double_columns(double_sd_sp)
-                        remove_indices.append(index)
-                        col_pair = distribute_and_merge_columns(sd_fp, double_sd_sp)
-                        clear_values(remove_indices)
-                    elif sd_full_len >= 1:
-                        indcs, sd_full = process_columns(sd_full)
-                        col_pair = [sd_fp[0] + sd_fp[1], sd_full[0]]
-                        distribute_columns_by_mean(col_pair)
-                        clear_values(indcs)
-                elif double_sd_fp_len >= 1:
-                    index, double_sd_fp = process_double_columns(double_sd_fp)
-                    remove_indices.append(index)
-                    if sd_sp_len >= 2:
-                        indcs, sd_sp = process_columns(sd_sp)
-                        remove_indices.extend(indcs)
-                        col_pair = distribute_and_merge_columns(double_sd_fp, sd_sp)
-                        clear_values(remove_indices)
-                    elif double_sd_sp_len >= 1:
-                        index, double_sd_sp = process_double_columns(double_sd_sp)
-                        remove_indices.append(index)
-                        col_pair = distribute_and_merge_columns(double_sd_fp, double_sd_sp)
-                        clear_values(remove_indices)
-                elif sd_fp_len >= 1 and sd_sp_len >= 1 and sd_full_len >= 1:
-                    indcs, sd_fp = process_columns(sd_fp)
-                    remove_indices.extend(indcs)
-                    indcs, sd_sp = process_columns(sd_sp)
-                    remove_indices.extend(indcs)
-                    indcs, sd_full = process_columns(sd_full)
-                    col_pair = [sd_fp[0] + sd_sp[0], sd_full[0]]
-                    distribute_columns_by_mean(col_pair)
-                    clear_values(indcs)
-                if sd_full_len >= 2:
-                    indcs, sd_full = process_columns(sd_full)
-                    distribute_columns_by_mean(sd_full)
-                    col_pair = sd_full
-                    clear_values(indcs)
-            if not col_pair:
-                col_pair = []
-                for _ in range(2):
-                    # noinspection PyUnusedLocal
-                    col_pair.append(['' for temp in range(tn_full)])
-                return tuple(col_pair), False
-        else:
-            pair = []
-            for j, value in enumerate(sd_col):
-                val_len = len(value)
-                double_time_num = t_num * 2
-                if val_len == t_num:
-                    pair.append((j, value))
-                    if len(pair) == 2:
-                        indcs, pair = process_columns(pair)
-                        distribute_columns_by_mean(pair)
-                        col_pair = pair
-                        clear_values(indcs)
-                        break
-                elif val_len == double_time_num:
-                    _, double_col = process_double_columns([(j, value)])
-                    distribute_columns_by_mean(double_col)
-                    col_pair = double_col
-                    clear_values([j])
-                    break
-        return tuple(col_pair), True
-
-    def __parse_hr_columns(self, t_nums):
-        hr_columns = []
-        for i, t_num in enumerate(t_nums):
-            hr_column = self.__parse_hr_column(Report._VALUES_HR_KEYS[i], t_num)
-            if hr_column:
-                hr_columns.append(hr_column)
-        return hr_columns
-
-    def __parse_hr_column(self, hr_key: ReportSpace, t_num):
-        hr_column = []
-        num_group = []
+            return None, False
+        sd_col = self.__tokenize_column(sd_key, block)
+        # the columns of the dates are the parts of the systolic and diastolic columns
+        parts_lengths = t_num if isinstance(t_num, tuple) else (t_num,)
+        pieces = partition.partition_into_column_pair(sd_col.groups_lengths, parts_lengths)
+        if pieces is None:
+            if isinstance(t_num, tuple):
+                return None, False
+            raise ValueError("The values of the column %s do not match their times"
+                             % sd_key.name)
+        return partition.merge_column_pair(list(sd_col), pieces), True
+
+    def __parse_hr_columns(
+            self, t_nums: List[Union[Tuple[int, ...], int]]) -> List[Union[None, np.ndarray]]:
+        return [self.__parse_hr_column(Report._VALUES_HR_KEYS[i], t_num)
+                for i, t_num in enumerate(t_nums)]
+
+    def __parse_hr_column(self, hr_key: ReportSpace,
+                          t_num: Union[Tuple[int, ...], int]) -> Union[None, np.ndarray]:
+        """
+        :return: the heart rates or None if they do not match their times
+        """
         block = self.blocks.get(hr_key)
         if not block:
-            return hr_column
-        index, _ = block.search_first_occurrence_by_pattern(ReportItemPattern.TWO_THREE_DIGITS_NUM)
-        while index < len(block):
-            value = block[index]
-            match = ReportString(value).matches(ReportItemPattern.TWO_THREE_DIGITS_NUM)
-            if match:
-                num_group.append(int(value))
-            elif num_group:
-                hr_column.append(num_group)
-                num_group = []
-            index += 1
-        if num_group:
-            hr_column.append(num_group)
+            return None
+        hr_column = list(self.__tokenize_column(hr_key, block))
         if isinstance(t_num, tuple):
             buff = []
             for num in t_num:
@@ -597,17 +459,20 @@ class Report(object):
                         buff.append(part)
                         break
             if len(buff) == len(t_num):
-                hr_column = [item for sublist in buff for item in sublist]
+                return np.concatenate(buff)
             elif len(hr_column[0]) == sum(t_num):
-                hr_column = hr_column[0]
-            else:
-                print("Wrong number of values", file=stderr)
-        else:
-            if len(hr_column[0]) == t_num:
-                hr_column = hr_column[0]
-            else:
-                print("Wrong number of values", file=stderr)
-        return hr_column
+                return hr_column[0]
+        elif len(hr_column[0]) == t_num:
+            return hr_column[0]
+        print("Wrong number of values", file=stderr)
+        return None
+
+    @staticmethod
+    def __tokenize_column(key: ReportSpace, block: ReportBlock) -> NumberColumn:
+        column = block.tokenize_numbers()
+        if not len(column):
+            raise ValueError("There are no values in the column %s" % key.name)
+        return column
 
     def __parse_datetime_columns(self, remove_after=False):
         datetime_columns = []
@@ -616,7 +481,7 @@ class Report(object):
         for key in Report._VALUES_SD_KEYS:
             datetime_column, t_num, date_result = self.__parse_datetime_column(key, remove_after,
                                                                                date_result)
-            if datetime_column:
+            if len(datetime_column):
                 datetime_columns.append(datetime_column)
                 t_nums.append(t_num)
         return datetime_columns, t_nums
@@ -633,22 +498,26 @@ class Report(object):
         if not date_result:
             _, date_result = block.search_first_occurrence_by_pattern(ReportItemPattern.DATE)
             date_result = str(date_result)
+        # the date is parsed once for all its times, when the first of them is met
+        date_minutes = None
         index, time_result = block.search_first_occurrence_by_pattern(ReportItemPattern.TIME)
         while index is not None and index < len(block):
-            value = block[index]
-            match = ReportString(value).matches(ReportItemPattern.DATE)
+            value = block.get_report_string(index)
+            match = value.matches(ReportItemPattern.DATE)
             if match:
                 datetime_column.extend(times)
                 time_num.append(counter)
-                date_result = value
+                date_result = str(value)
+                date_minutes = None
                 times = []
                 counter = 0
             else:
-                match = ReportString(value).matches(ReportItemPattern.TIME)
+                match = value.matches(ReportItemPattern.TIME)
                 if match:
-                    time_result = value
-                    dt = " ".join((date_result, time_result))
-                    times.append(datetime.strptime(dt, Report._DATE_TIME_FORMAT))
+                    time_result = str(value)
+                    if date_minutes is None:
+                        date_minutes = tutil.parse_date(date_result, Report._DATE_FORMAT)
+                    times.append(date_minutes + tutil.parse_time(time_result))
                     counter += 1
                 elif times:
                     datetime_column.extend(times)
@@ -662,6 +531,7 @@ class Report(object):
         if times:
             datetime_column.extend(times)
             time_num.append(counter)
+        datetime_column = tutil.to_datetimes(datetime_column)
         if len(time_num) == 1:
             time_num = time_num[0]
         else:
@@ -672,7 +542,7 @@ class Report(object):
         if remove_after:
             new_data = []
             first = False
-            if isinstance(block, collections.Iterable):
+            if isinstance(block, collections.abc.Iterable):
                 for item in block:
                     item_report_str = ReportString(item)
                     if not (item_report_str.matches(ReportItemPattern.DATE)
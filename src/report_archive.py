@@ -0,0 +1,447 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.cohort import CohortClassifier
+from src.patient import EMPTY_VALUE_STR
+from src.profiling import PROFILER
+from src.report import Report
+from src.report_item import ReportItemKey
+from src.report_values import VALUE_DTYPE, ReportValues
+from src.util import paths, time_util as tutil
+
+# it is raised whenever the layout of the archive changes, the archives of the other versions
+# are not read
+FORMAT_VERSION = 1
+
+_MAGIC = b"WCHARCH\0"
+# the magic, the version of the format and the length of the header
+_PREAMBLE = struct.Struct("<8sII")
+_HEADER_ENCODING = 'utf-8'
+# the sections start at the aligned offsets, so their arrays are aligned in the mapped file
+_ALIGNMENT = 64
+_TEMP_SUFFIX = ".tmp"
+
+_VALUES_KEYS = ReportItemKey.SYSTOLIC, ReportItemKey.DIASTOLIC, ReportItemKey.HEART_RATE
+_AVG_KEYS = ReportItemKey.TWENTY_FOUR_HOURS, ReportItemKey.AWAKE, ReportItemKey.ASLEEP
+_WHITE_COAT_WINDOW_KEYS = ReportItemKey.READINGS, ReportItemKey.FIRST_HOUR
+_NIGHT_TIME_DIP_KEYS = ReportItemKey.SYSTOLIC, ReportItemKey.DIASTOLIC
+_STRING_FIELDS = "name", "patient_id", "patient_name", "patient_date_of_birth", "message"
+_SUMMARY_DTYPE = np.dtype(np.int32)
+_DIP_DTYPE = np.dtype(np.float64)
+
+# the summary values of a report by their keys, the numbers are either ints or floats
+SummaryTable = Dict[ReportItemKey, Dict[ReportItemKey, Union[str, int, float]]]
+
+
+class ArchivedReport(object):
+    """
+    The report restored from an archive. It has the fields of the report a patient is made of,
+    the measurements are the views of the mapped archive
+    """
+
+    def __init__(self, strings: Dict[str, Union[None, str]],
+                 summary_rows: Dict[str, List[list]], values: ReportValues, success: bool):
+        self.__strings = strings
+        self.__summary_rows = summary_rows
+        self.__values = values
+        self.__success = success
+        self.__tables = {}
+
+    @property
+    def name(self) -> str:
+        return self.__strings["name"]
+
+    @property
+    def patient_id(self) -> str:
+        return self.__strings["patient_id"]
+
+    @property
+    def patient_name(self) -> str:
+        return self.__strings["patient_name"]
+
+    @property
+    def patient_date_of_birth(self) -> str:
+        return self.__strings["patient_date_of_birth"]
+
+    @property
+    def message(self) -> str:
+        return self.__strings["message"]
+
+    @property
+    def success(self) -> bool:
+        return self.__success
+
+    @property
+    def values(self) -> ReportValues:
+        return self.__values
+
+    @property
+    def avg_bp(self) -> SummaryTable:
+        return self.__get_table("avg_bp", _VALUES_KEYS, _AVG_KEYS)
+
+    @property
+    def white_coat_window(self) -> SummaryTable:
+        return self.__get_table("white_coat_window", _VALUES_KEYS, _WHITE_COAT_WINDOW_KEYS)
+
+    @property
+    def night_time_dip(self) -> SummaryTable:
+        return self.__get_table("night_time_dip", _NIGHT_TIME_DIP_KEYS, (ReportItemKey.DIP,))
+
+    def __get_table(self, field: str, row_keys: Sequence[ReportItemKey],
+                    column_keys: Sequence[ReportItemKey]) -> SummaryTable:
+        # the patient reads a table many times, so it is made up once
+        table = self.__tables.get(field)
+        if table is None:
+            table = {row_key: dict(zip(column_keys, row))
+                     for row_key, row in zip(row_keys, self.__summary_rows[field])}
+            self.__tables[field] = table
+        return table
+
+
+ArchivableReport = Union[Report, ArchivedReport]
+
+
+def _to_array(table: SummaryTable, row_keys: Sequence[ReportItemKey],
+              column_keys: Sequence[ReportItemKey]) -> Tuple[List[List[float]], List[List[bool]]]:
+    values = []
+    missing = []
+    for row_key in row_keys:
+        row = table.get(row_key, {})
+        values.append([])
+        missing.append([])
+        for column_key in column_keys:
+            value = row.get(column_key)
+            is_missing = isinstance(value, (str, type(None)))
+            values[-1].append(0 if is_missing else value)
+            missing[-1].append(is_missing)
+    return values, missing
+
+
+class _SpooledSection(object):
+    """
+    A section of the archive which is appended to a temporary file as the reports are added
+    """
+
+    def __init__(self, dtype: np.dtype, item_shape: Tuple[int, ...], spool_dir: Path):
+        self.__dtype = np.dtype(dtype)
+        self.__item_shape = item_shape
+        self.__items_num = 0
+        self.__spool_file = tempfile.TemporaryFile(dir=str(spool_dir))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.__dtype
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return (self.__items_num,) + self.__item_shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.__items_num * int(np.prod(self.__item_shape, dtype=np.int64)) \
+            * self.__dtype.itemsize
+
+    def append(self, items):
+        items = np.ascontiguousarray(items, dtype=self.__dtype).reshape((-1,) + self.__item_shape)
+        self.__spool_file.write(items.tobytes())
+        self.__items_num += len(items)
+
+    def copy_to(self, archive_file):
+        self.__spool_file.seek(0)
+        shutil.copyfileobj(self.__spool_file, archive_file)
+
+    def close(self):
+        self.__spool_file.close()
+
+
+class ReportArchiveWriter(object):
+    """
+    Writes the reports to an archive as they are added. Every section of the archive is
+    appended to a temporary file of its own, so a report is not kept once it is added,
+    and the sections are put together behind the header when the writer is closed.
+    The archive appears atomically, it does not appear at all if the writer is discarded
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.__path = Path(path)
+        spool_dir = self.__path.parent
+        paths.create_dir(spool_dir)
+        self.__sections = {}
+        for field in _STRING_FIELDS:
+            self.__sections[field + ".data"] = _SpooledSection(np.uint8, (), spool_dir)
+            self.__sections[field + ".offsets"] = _SpooledSection(np.int64, (), spool_dir)
+            self.__sections[field + ".none"] = _SpooledSection(bool, (), spool_dir)
+        for field, column_keys in (("avg_bp", _AVG_KEYS),
+                                   ("white_coat_window", _WHITE_COAT_WINDOW_KEYS)):
+            shape = len(_VALUES_KEYS), len(column_keys)
+            self.__sections[field] = _SpooledSection(_SUMMARY_DTYPE, shape, spool_dir)
+            self.__sections[field + ".missing"] = _SpooledSection(bool, shape, spool_dir)
+        self.__sections["night_time_dip"] = _SpooledSection(_DIP_DTYPE,
+                                                            (len(_NIGHT_TIME_DIP_KEYS),),
+                                                            spool_dir)
+        self.__sections["success"] = _SpooledSection(bool, (), spool_dir)
+        self.__sections["values.offsets"] = _SpooledSection(np.int64, (), spool_dir)
+        self.__sections["values.datetimes"] = _SpooledSection(np.int64, (), spool_dir)
+        for key in _VALUES_KEYS:
+            self.__sections["values.%s" % key.value] = _SpooledSection(VALUE_DTYPE, (),
+                                                                       spool_dir)
+            self.__sections["values.%s.missing" % key.value] = _SpooledSection(bool, (),
+                                                                               spool_dir)
+        # the offsets start with zero and go on with the running ends of the reports
+        self.__ends = {field + ".offsets": 0 for field in _STRING_FIELDS + ("values",)}
+        for offsets_name in self.__ends:
+            self.__sections[offsets_name].append([0])
+        self.__reports_num = 0
+
+    def __len__(self):
+        return self.__reports_num
+
+    def __enter__(self) -> 'ReportArchiveWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def add(self, report: ArchivableReport):
+        for field in _STRING_FIELDS:
+            string = getattr(report, field)
+            encoded = b"" if string is None else string.encode('utf-8')
+            self.__append_chunk(field + ".data", field + ".offsets",
+                                np.frombuffer(encoded, dtype=np.uint8))
+            self.__sections[field + ".none"].append([string is None])
+        for field, column_keys in (("avg_bp", _AVG_KEYS),
+                                   ("white_coat_window", _WHITE_COAT_WINDOW_KEYS)):
+            values, missing = _to_array(getattr(report, field), _VALUES_KEYS, column_keys)
+            self.__sections[field].append(values)
+            self.__sections[field + ".missing"].append(missing)
+        dips, dips_missing = _to_array(report.night_time_dip, _NIGHT_TIME_DIP_KEYS,
+                                       (ReportItemKey.DIP,))
+        self.__sections["night_time_dip"].append([np.nan if is_missing[0] else dip[0]
+                                                  for dip, is_missing in zip(dips, dips_missing)])
+        self.__sections["success"].append([bool(report.success)])
+        values = report.values
+        self.__append_chunk("values.datetimes", "values.offsets",
+                            values.datetimes.astype(np.int64))
+        for key, column in zip(_VALUES_KEYS, (values.systolic_blood_pressures,
+                                              values.diastolic_blood_pressures,
+                                              values.heart_rates)):
+            self.__sections["values.%s" % key.value].append(column.filled(0))
+            self.__sections["values.%s.missing" % key.value].append(np.ma.getmaskarray(column))
+        self.__reports_num += 1
+
+    def add_all(self, reports: Iterable[ArchivableReport]):
+        for report in reports:
+            self.add(report)
+
+    @PROFILER.timed("archive.write")
+    def close(self):
+        """
+        Put the sections together into the archive
+        """
+        temp_path = self.__path.with_name(self.__path.name + _TEMP_SUFFIX)
+        try:
+            with open(str(temp_path), "wb") as archive_file:
+                _write_sections(archive_file, self.__sections, self.__reports_num)
+            os.replace(str(temp_path), str(self.__path))
+        finally:
+            self.discard()
+
+    def discard(self):
+        for section in self.__sections.values():
+            section.close()
+
+    def __append_chunk(self, data_name: str, offsets_name: str, chunk: np.ndarray):
+        # the chunk of the report is followed by its end in the offsets
+        self.__sections[data_name].append(chunk)
+        self.__ends[offsets_name] += len(chunk)
+        self.__sections[offsets_name].append([self.__ends[offsets_name]])
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _write_sections(archive_file, sections: Dict[str, _SpooledSection], reports_num: int):
+    layout = {}
+    offset = 0
+    for name, section in sections.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": section.dtype.str, "shape": list(section.shape),
+                        "offset": offset}
+        offset += section.nbytes
+    header = json.dumps({"reports_num": reports_num,
+                         "sections": layout}).encode(_HEADER_ENCODING)
+    # the offsets of the sections are counted from the start of the data
+    data_start = _align(_PREAMBLE.size + len(header))
+    archive_file.write(_PREAMBLE.pack(_MAGIC, FORMAT_VERSION, len(header)))
+    archive_file.write(header)
+    position = _PREAMBLE.size + len(header)
+    for name, section in sections.items():
+        section_start = data_start + layout[name]["offset"]
+        archive_file.write(bytes(section_start - position))
+        section.copy_to(archive_file)
+        position = section_start + section.nbytes
+
+
+class ReportArchive(object):
+    """
+    Archive of the parsed reports. The file is mapped into memory and its sections are read
+    as arrays without copying, so the reports are analyzed again without being parsed.
+    It is written by ReportArchiveWriter
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.__path = Path(path)
+        # the plain arrays are sliced faster than the memory maps, the map stays their base
+        raw = np.memmap(str(self.__path), dtype=np.uint8, mode='r').view(np.ndarray)
+        if raw.size < _PREAMBLE.size:
+            raise ValueError("%s is not an archive of reports" % self.__path)
+        magic, version, header_length = _PREAMBLE.unpack(raw[:_PREAMBLE.size].tobytes())
+        if magic != _MAGIC:
+            raise ValueError("%s is not an archive of reports" % self.__path)
+        if version != FORMAT_VERSION:
+            raise ValueError("The version %d of the archive %s is not supported"
+                             % (version, self.__path))
+        header_end = _PREAMBLE.size + header_length
+        header = json.loads(raw[_PREAMBLE.size:header_end].tobytes().decode(_HEADER_ENCODING))
+        data_start = _align(header_end)
+        self.__reports_num = header["reports_num"]
+        self.__sections = {}
+        for name, section in header["sections"].items():
+            dtype = np.dtype(section["dtype"])
+            shape = tuple(section["shape"])
+            start = data_start + section["offset"]
+            end = start + dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            self.__sections[name] = raw[start:end].view(dtype).reshape(shape)
+        self.__values = self.__read_values()
+        self.__summary_rows = None
+
+    @staticmethod
+    def write(path: Union[str, Path], reports: Iterable[ArchivableReport]):
+        with ReportArchiveWriter(path) as writer:
+            writer.add_all(reports)
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def __len__(self):
+        return self.__reports_num
+
+    def __getitem__(self, index: int) -> ArchivedReport:
+        if not -self.__reports_num <= index < self.__reports_num:
+            raise IndexError("The archive has %d reports" % self.__reports_num)
+        index %= self.__reports_num
+        strings = {field: self.__read_string(field, index) for field in _STRING_FIELDS}
+        start, end = self.values_offsets[index:index + 2]
+        columns = [np.ma.MaskedArray(self.__sections["values.%s" % key.value][start:end],
+                                     mask=self.__sections["values.%s.missing"
+                                                          % key.value][start:end])
+                   for key in _VALUES_KEYS]
+        values = ReportValues(self.__values.datetimes[start:end], *columns)
+        if self.__summary_rows is None:
+            self.__summary_rows = self.__read_summary_rows()
+        summary_rows = {field: rows[index] for field, rows in self.__summary_rows.items()}
+        return ArchivedReport(strings, summary_rows, values,
+                              bool(self.__sections["success"][index]))
+
+    def __iter__(self) -> Iterator[ArchivedReport]:
+        for index in range(self.__reports_num):
+            yield self[index]
+
+    @property
+    def values(self) -> ReportValues:
+        """
+        :return: the measurements of all the reports one after another
+        """
+        return self.__values
+
+    @property
+    def values_offsets(self) -> np.ndarray:
+        """
+        :return: the offsets of the measurements of the reports and the end of the last ones
+        """
+        return self.__sections["values.offsets"]
+
+    @property
+    def avg_bp(self) -> np.ma.MaskedArray:
+        """
+        :return: the average values of the reports by the types of the values and the periods
+        """
+        return self.__read_summary("avg_bp")
+
+    @property
+    def white_coat_window(self) -> np.ma.MaskedArray:
+        """
+        :return: the values of the white coat window of the reports by the types of the values
+        """
+        return self.__read_summary("white_coat_window")
+
+    @property
+    def night_time_dip(self) -> np.ndarray:
+        """
+        :return: the systolic and diastolic night time dips of the reports, NaN if missing
+        """
+        return self.__sections["night_time_dip"]
+
+    @property
+    def success(self) -> np.ndarray:
+        return self.__sections["success"]
+
+    def classify(self, classifier: CohortClassifier) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classify the patients of all the reports without restoring them
+        :return: the blood pressure phenotypes and profiles of the patients
+        """
+        systolic_index = _VALUES_KEYS.index(ReportItemKey.SYSTOLIC)
+        phenotypes = classifier.classify_phenotypes(
+            self.avg_bp[:, systolic_index, _AVG_KEYS.index(ReportItemKey.AWAKE)],
+            self.white_coat_window[:, systolic_index,
+                                   _WHITE_COAT_WINDOW_KEYS.index(ReportItemKey.FIRST_HOUR)])
+        profiles = classifier.classify_profiles(
+            self.night_time_dip[:, _NIGHT_TIME_DIP_KEYS.index(ReportItemKey.SYSTOLIC)])
+        return phenotypes, profiles
+
+    def read_strings(self, field: str) -> List[Union[None, str]]:
+        """
+        :param field: the name of the string field of the reports, e.g. patient_id
+        """
+        return [self.__read_string(field, index) for index in range(self.__reports_num)]
+
+    def __read_string(self, field: str, index: int) -> Union[None, str]:
+        if self.__sections[field + ".none"][index]:
+            return None
+        start, end = self.__sections[field + ".offsets"][index:index + 2]
+        return self.__sections[field + ".data"][start:end].tobytes().decode('utf-8')
+
+    def __read_summary(self, field: str) -> np.ma.MaskedArray:
+        return np.ma.MaskedArray(self.__sections[field], mask=self.__sections[field + ".missing"])
+
+    def __read_summary_rows(self) -> Dict[str, List[list]]:
+        # the values which are not numbers are restored as the empty value
+        dips = np.ma.masked_invalid(self.night_time_dip)[:, :, np.newaxis]
+        return {field: summary.astype(object).filled(EMPTY_VALUE_STR).tolist()
+                for field, summary in (("avg_bp", self.avg_bp),
+                                       ("white_coat_window", self.white_coat_window),
+                                       ("night_time_dip", dips))}
+
+    def __read_values(self) -> ReportValues:
+        datetimes = self.__sections["values.datetimes"].view(tutil.DATETIME_DTYPE)
+        columns = [np.ma.MaskedArray(self.__sections["values.%s" % key.value],
+                                     mask=self.__sections["values.%s.missing" % key.value])
+                   for key in _VALUES_KEYS]
+        return ReportValues(datetimes, *columns)
@@ -0,0 +1,84 @@
+from functools import partial
+from pathlib import Path
+from typing import Union
+
+from src.block_cache import BlockCache
+from src.file_process import InputMode, ReportFileProcessor, ReportSpace
+from src.layout import LayoutRegistry
+from src.profiling import PROFILER, ProfilingSettings
+from src.report import Report
+from src.report_source import ReportSource
+
+
+class ReportBuilder(object):
+    """
+    Builds reports from their files, it is sent as is to the worker processes
+    """
+
+    def __init__(self, block_cache: BlockCache = None, layout_registry: LayoutRegistry = None,
+                 input_mode: InputMode = InputMode.BUFFERED, profiling: ProfilingSettings = None):
+        self.__block_cache = block_cache
+        self.__layout_registry = layout_registry
+        self.__input_mode = input_mode
+        self.__profiling = profiling
+
+    @property
+    def block_cache(self) -> BlockCache:
+        return self.__block_cache
+
+    @property
+    def layout_registry(self) -> LayoutRegistry:
+        return self.__layout_registry
+
+    @property
+    def input_mode(self) -> InputMode:
+        return self.__input_mode
+
+    @property
+    def profiling(self) -> Union[None, ProfilingSettings]:
+        return self.__profiling
+
+    @property
+    def version(self) -> str:
+        return "%s-report%d" % (ReportBuilder.blocks_version(self.__layout_registry),
+                                Report.VERSION)
+
+    @staticmethod
+    def blocks_version(layout_registry: LayoutRegistry = None) -> str:
+        if layout_registry is None:
+            return ReportSpace.version()
+        return layout_registry.version
+
+    def build(self, report_source: Union[Path, ReportSource], complete: bool = False) -> Report:
+        """
+        :param report_source: a path of the report file or the report source
+        :param complete: parse all the fields of the report at once, it is done for the reports
+        which are sent from the workers, otherwise the fields are parsed as they are read
+        :return: the report
+        """
+        report_source = ReportSource.of(report_source)
+        if self.__profiling is None:
+            return self.__build(report_source, complete)
+        # the builder may run in a worker, which has a profiler of its own,
+        # so the timings collected by it are taken along with the report
+        PROFILER.enable()
+        report = self.__profiling.run(report_source.name,
+                                      partial(self.__build, report_source, complete))
+        report.attach_profile_sample(PROFILER.drain())
+        return report
+
+    @PROFILER.timed("report.build")
+    def __build(self, report_source: ReportSource, complete: bool) -> Report:
+        space_table_detector = None
+        if self.__layout_registry is not None:
+            space_table_detector = self.__layout_registry.detect_space_table
+        if self.__block_cache is None:
+            blocks = ReportFileProcessor(report_source.data, space_table_detector,
+                                         self.__input_mode).blocks
+        else:
+            blocks = self.__block_cache.extract_blocks(report_source.data, space_table_detector,
+                                                       self.__input_mode)
+        report = Report(report_source.name, blocks)
+        if complete:
+            report.parse_all()
+        return report
@@ -1,20 +1,27 @@
+import csv
 from datetime import datetime
 # noinspection PyPep8Naming
 from datetime import timedelta as TimeDelta
 from enum import Enum
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, List, Sequence, Tuple, Union
 
 import numpy as np
-from pandas import DataFrame
+from pandas import DataFrame, MultiIndex, concat
+from pandas.arrays import IntegerArray
 
 from src.patient import Patient
+from src.profiling import PROFILER
 from src.report_logging import LOGGER
 from src.patient import EMPTY_VALUE_STR
-from src.report_item import ReportItemKey
-from src.util.collections import Block
+from src.report_values import VALUE_DTYPE
 from src.util.paths import Extension
-from src.util import math_util as mutil, paths
+from src.util import math_util as mutil, paths, time_util as tutil
+
+_CLASS_DTYPE = "Int8"
+_SUMMARY_DTYPE = "Int32"
+# the phenotypes and the profiles go first among the summary values
+_CLASS_COLUMNS_NUM = 2
 
 
 class PatientDataFrameKey(Enum):
@@ -49,6 +56,16 @@ class PatientDataFrameKey(Enum):
         return self.value
 
 
+def _cumsum_by_rows(values: np.ndarray, rows: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    :param rows: the indices of the rows of the values, the rows go one after another
+    :param offsets: the offsets of the rows
+    :return: the cumulative sums of the values within their rows
+    """
+    sums = np.cumsum(values)
+    return sums - (sums - values)[offsets][rows]
+
+
 class PatientDataFrame(object):
 
     _saves_counter = 1
@@ -67,6 +84,14 @@ class PatientDataFrame(object):
                  PatientDataFrameKey.MSD_NIGHT_DIASTOLIC, PatientDataFrameKey.MSD_ALT_NIGHT_DIASTOLIC)
     _MEASUREMENT_KEYS = (PatientDataFrameKey.SYSTOLIC, PatientDataFrameKey.DIASTOLIC,
                          PatientDataFrameKey.HEART_RATE)
+    _AVG_FIELDS = ("avg_systolic_blood_pressure_per_day", "avg_diastolic_blood_pressure_per_day",
+                   "avg_heart_rate_per_day", "avg_systolic_blood_pressure_while_awake",
+                   "avg_diastolic_blood_pressure_while_awake", "avg_heart_rate_while_awake",
+                   "avg_systolic_blood_pressure_while_asleep",
+                   "avg_diastolic_blood_pressure_while_asleep", "avg_heart_rate_while_asleep")
+    _CATEGORICAL_POSITIONS = 0, 1
+    # the columns of the summary values, their missing values are written as the empty value
+    _EMPTY_VALUE_POSITIONS = tuple(range(3, len(_SINGLE_KEYS) + len(_AVG_FIELDS) + 1))
 
     _DATE_FORMAT = "%d.%m.%Y"
     _TIME_FORMAT = "%H:%M"
@@ -85,117 +110,202 @@ class PatientDataFrame(object):
     _DAY_LEN = _FIRST_NIGHT_START_TIME - _FIRST_DAY_START_TIME
     _NIGHT_LEN = _FIRST_DAY_START_TIME + _TIME_PERIOD - _FIRST_NIGHT_START_TIME
     _TIME_INTERVAL_NUM = int(_TIME_PERIOD / _TIME_INTERVAL)
+    _SLOT_INTERVAL_MINUTES = int(_TIME_INTERVAL / TimeDelta(minutes=1))
+    # the minutes of the day of the time slots
+    _SLOT_MINUTES = ((tutil.calc_minutes_of_day(_START_TIME)
+                      + np.arange(_TIME_INTERVAL_NUM) * _SLOT_INTERVAL_MINUTES)
+                     % tutil.MINUTES_IN_DAY).tolist()
+    # the cells of the measurements of a patient
+    _SLOT_CELLS_NUM = _TIME_INTERVAL_NUM * len(_MEASUREMENT_KEYS)
 
     def __new__(cls, *args, **kwargs):
-        cls.DAY_NIGHT_INTERVALS = cls._calc_day_night_intervals()
-        cls.DAY_NIGHT_ALT_INTERVALS = cls._calc_day_night_alt_intervals()
+        cls._init_intervals()
         return super(PatientDataFrame, cls).__new__(cls)
 
-    def __init__(self, patients: Iterable[Patient]):
-        self.__columns = PatientDataFrame._prepare_columns()
-        data = []
-        for patient in patients:
-            data.append(PatientDataFrame._prepare_data(patient))
-        self.__frame = DataFrame(np.asarray(data), columns=self.__columns)
+    def __init__(self, patients: Iterable[Patient] = ()):
+        self.__frame = PatientDataFrame._build_frame(list(patients))
 
     @classmethod
     def inc_counter(cls):
         cls._saves_counter += 1
 
+    @classmethod
+    def _init_intervals(cls):
+        cls.DAY_NIGHT_INTERVALS = cls._calc_day_night_intervals()
+        cls.DAY_NIGHT_ALT_INTERVALS = cls._calc_day_night_alt_intervals()
+        cls.MSD_SLOTS = cls._calc_msd_slots()
+
+    @classmethod
+    def _choose_output_path(cls, basic_output_dir: Path, basic_name: str,
+                            rewrite: bool = False) -> Path:
+        while True:
+            new_name = "%s_%d" % (basic_name, cls._saves_counter)
+            output_path = Path(basic_output_dir, "tables")
+            paths.create_dir(output_path)
+            output_path = Path(output_path, new_name).with_suffix('.' + Extension.CSV.as_string())
+            if output_path.is_file() and not rewrite:
+                cls.inc_counter()
+                continue
+            return output_path
+
+    def update(self, patients: Iterable[Patient]):
+        # the rows of the reports which have already been added are replaced in place
+        new_frame = PatientDataFrame._build_frame(list(patients))
+        index = self.__frame.index
+        order = index.append(new_frame.index[~new_frame.index.isin(index)])
+        frame = concat([self.__frame[~index.isin(new_frame.index)], new_frame]).loc[order]
+        self.__frame = PatientDataFrame._categorize(frame)
+
+    def remove(self, report_names: Iterable[str]):
+        report_names = [name for name in report_names if name in self.__frame.index]
+        if report_names:
+            self.__frame = self.__frame.drop(index=report_names)
+
     @staticmethod
-    def _prepare_data(patient: Patient):
-        measure_keys = (ReportItemKey.SYSTOLIC, ReportItemKey.DIASTOLIC, ReportItemKey.HEART_RATE)
-        # noinspection PyListCreation
-        data = []
-        data.append(patient.id)
-        data.append(patient.name)
-        data.append(patient.date_of_birth)
-        phenotype = patient.blood_pressure_phenotype
-        if phenotype:
-            data.append(phenotype)
-        else:
-            data.append(EMPTY_VALUE_STR)
-        profile = patient.blood_pressure_profile
-        if profile:
-            data.append(profile)
-        else:
-            data.append(EMPTY_VALUE_STR)
-        last_hour_max_systolic_blood_pressure = patient.last_hour_max_systolic_blood_pressure
-        if last_hour_max_systolic_blood_pressure:
-            data.append(last_hour_max_systolic_blood_pressure)
-        else:
-            data.append(EMPTY_VALUE_STR)
-        data.append(patient.avg_systolic_blood_pressure_per_day)
-        data.append(patient.avg_diastolic_blood_pressure_per_day)
-        data.append(patient.avg_heart_rate_per_day)
-        data.append(patient.avg_systolic_blood_pressure_while_awake)
-        data.append(patient.avg_diastolic_blood_pressure_while_awake)
-        data.append(patient.avg_heart_rate_while_awake)
-        data.append(patient.avg_systolic_blood_pressure_while_asleep)
-        data.append(patient.avg_diastolic_blood_pressure_while_asleep)
-        data.append(patient.avg_heart_rate_while_asleep)
-        data.append(patient.first_hour_of_white_coat_window_systolic_blood_pressure)
-        time_columns = []
-        curr_time = PatientDataFrame._START_TIME
-        for i in range(PatientDataFrame._TIME_INTERVAL_NUM):
-            time_columns.append(curr_time.time())
-            curr_time += PatientDataFrame._TIME_INTERVAL
-        index = 0
-        measure_times = patient.measures_datetimes
-        measure_times_num = len(measure_times)
-        sys_all = []
-        dia_all = []
-        for time in time_columns:
-            if index < measure_times_num:
-                report_time = measure_times[index].time()
-            else:
-                report_time = None
-            if report_time == time:
-                systolic_blood_pressures = patient.systolic_blood_pressures
-                diastolic_blood_pressures = patient.diastolic_blood_pressures
-                heart_rates = patient.heart_rates
-                sys_all.append(systolic_blood_pressures[index])
-                dia_all.append(diastolic_blood_pressures[index])
-                data.append(systolic_blood_pressures[index])
-                data.append(diastolic_blood_pressures[index])
-                data.append(heart_rates[index])
-                index += 1
-            else:
-                sys_all.append(None)
-                dia_all.append(None)
-                for _ in measure_keys:
-                    data.append("")
-        sys_all = Block[int](sys_all)
-        dia_all = Block[int](dia_all)
-        # noinspection PyUnresolvedReferences
-        dn_intervals = [v for k, v in PatientDataFrame.DAY_NIGHT_INTERVALS]
-        # noinspection PyUnresolvedReferences
-        dna_intervals = [v for k, v in PatientDataFrame.DAY_NIGHT_ALT_INTERVALS]
-        sys_intervals = sys_all.divide_into_parts(dn_intervals)
-        dia_intervals = dia_all.divide_into_parts(dn_intervals)
-        sysa_intervals = sys_all.divide_into_parts(dna_intervals)
-        diaa_intervals = dia_all.divide_into_parts(dna_intervals)
-        sys_all = list(sys_all.filter_excluding_items((None, "")))
-        dia_all = list(dia_all.filter_excluding_items((None, "")))
-        sys_intervals = [list(Block[int](lst).filter_excluding_items((None, "")))
-                         for lst in sys_intervals]
-        dia_intervals = [list(Block[int](lst).filter_excluding_items((None, "")))
-                         for lst in dia_intervals]
-        sysa_intervals = [list(Block[int](lst).filter_excluding_items((None, "")))
-                          for lst in sysa_intervals][1::2]
-        diaa_intervals = [list(Block[int](lst).filter_excluding_items((None, "")))
-                          for lst in diaa_intervals][1::2]
-        data.append(mutil.msd(sys_all))
-        data.append(mutil.msd(sys_intervals[0] + sys_intervals[2]))
-        data.append(mutil.msd(sysa_intervals[0] + sysa_intervals[2]))
-        data.append(mutil.msd(sys_intervals[1]))
-        data.append(mutil.msd(sysa_intervals[1]))
-        data.append(mutil.msd(dia_all))
-        data.append(mutil.msd(dia_intervals[0] + dia_intervals[2]))
-        data.append(mutil.msd(diaa_intervals[0] + diaa_intervals[2]))
-        data.append(mutil.msd(dia_intervals[1]))
-        data.append(mutil.msd(diaa_intervals[1]))
-        return data
+    @PROFILER.timed("dataframe.build")
+    def _build_frame(patients: Sequence[Patient]) -> DataFrame:
+        strings, summaries, measures, msds = PatientDataFrame._prepare_values(patients)
+        columns = list(strings)
+        summaries_missing = np.ma.getmaskarray(summaries)
+        for i in range(summaries.shape[1]):
+            dtype = _CLASS_DTYPE if i < _CLASS_COLUMNS_NUM else _SUMMARY_DTYPE
+            columns.append(IntegerArray(summaries.data[:, i].astype(dtype.lower()),
+                                        summaries_missing[:, i].copy()))
+        slots_measures = measures.reshape(len(patients), PatientDataFrame._SLOT_CELLS_NUM)
+        # the cells of the missing values are left empty
+        slots_missing = np.ma.getmaskarray(slots_measures)
+        for i in range(slots_measures.shape[1]):
+            columns.append(IntegerArray(np.ascontiguousarray(slots_measures.data[:, i]),
+                                        np.ascontiguousarray(slots_missing[:, i])))
+        columns.extend(msds.T)
+        index = [patient.report_name for patient in patients] or None
+        frame = DataFrame(dict(enumerate(columns)), index=index)
+        frame.columns = MultiIndex.from_arrays(PatientDataFrame._prepare_columns())
+        return PatientDataFrame._categorize(frame)
+
+    @staticmethod
+    def _prepare_rows(patients: Sequence[Patient]) -> List[list]:
+        """
+        :return: the cells of the rows of the patients in the table
+        """
+        strings, summaries, measures, msds = PatientDataFrame._prepare_values(patients)
+        patients_num = len(patients)
+        measures = measures.reshape(patients_num, PatientDataFrame._SLOT_CELLS_NUM)
+        # the missing summary values are written as the empty value,
+        # the cells of the missing measurements and MSDs are left empty
+        measure_cells = measures.data.astype(object)
+        measure_cells[np.ma.getmaskarray(measures)] = None
+        cells = np.column_stack([np.array(strings, dtype=object).T.reshape(patients_num,
+                                                                            len(strings)),
+                                 summaries.astype(object).filled(EMPTY_VALUE_STR),
+                                 measure_cells, msds])
+        return cells.tolist()
+
+    @staticmethod
+    def _prepare_values(patients: Sequence[Patient]) -> Tuple[List[list], np.ma.MaskedArray,
+                                                               np.ma.MaskedArray, np.ndarray]:
+        """
+        :return: the ids, the names and the dates of birth of the patients, their summary values
+        from the phenotypes to the first hour of the white coat window, the measurements
+        by the time slots and the MSDs, the missing values are masked or None,
+        the MSDs of fewer than two values are the integer 0 as they have always been written
+        """
+        strings = [[patient.id for patient in patients],
+                   [patient.name for patient in patients],
+                   [patient.date_of_birth for patient in patients]]
+        summaries = []
+        for patient in patients:
+            # the patients of the unknown classes are left empty
+            summaries.append([patient.blood_pressure_phenotype or None,
+                              patient.blood_pressure_profile or None,
+                              patient.last_hour_max_systolic_blood_pressure or None]
+                             + [getattr(patient, field) for field in PatientDataFrame._AVG_FIELDS]
+                             + [patient.first_hour_of_white_coat_window_systolic_blood_pressure])
+        summaries_num = len(PatientDataFrame._EMPTY_VALUE_POSITIONS)
+        # the values which are not numbers are missing
+        summaries_missing = np.array([[not isinstance(value, (int, np.integer)) for value in row]
+                                      for row in summaries], dtype=bool)
+        summaries = np.array([[0 if is_missing else value
+                               for value, is_missing in zip(row, row_missing)]
+                              for row, row_missing in zip(summaries, summaries_missing)],
+                             dtype=np.int32)
+        summaries = np.ma.MaskedArray(summaries.reshape(len(patients), summaries_num),
+                                      summaries_missing.reshape(len(patients), summaries_num))
+        measures = PatientDataFrame._prepare_measures(patients)
+        msds = []
+        for key_index in range(2):
+            values = measures[:, :, key_index].astype(np.float64).filled(np.nan)
+            # noinspection PyUnresolvedReferences
+            for slots in PatientDataFrame.MSD_SLOTS:
+                slots_values = values[:, slots]
+                slots_msds = mutil.msd_rows(slots_values)
+                msd_cells = slots_msds.astype(object)
+                msd_cells[np.isnan(slots_msds)] = None
+                msd_cells[np.count_nonzero(~np.isnan(slots_values), axis=1) < 2] = 0
+                msds.append(msd_cells)
+        return strings, summaries, measures, np.column_stack(msds)
+
+    @staticmethod
+    def _categorize(frame: DataFrame) -> DataFrame:
+        # the ids and the names repeat across the reports of the same patients
+        for position in PatientDataFrame._CATEGORICAL_POSITIONS:
+            frame.isetitem(position, frame.iloc[:, position].astype('category'))
+        return frame
+
+    @staticmethod
+    def _prepare_measures(patients: Sequence[Patient]) -> np.ma.MaskedArray:
+        """
+        :return: the measurements of the patients by the time slots of the frame
+        and the types of the values, the slots without measurements are masked
+        """
+        patients_num = len(patients)
+        slots_num = PatientDataFrame._TIME_INTERVAL_NUM
+        measures = np.zeros((patients_num, slots_num, 3), dtype=VALUE_DTYPE)
+        missing = np.ones(measures.shape, dtype=bool)
+        if not patients_num:
+            return np.ma.MaskedArray(measures, missing)
+        counts = np.array([len(patient.measures_datetimes) for patient in patients])
+        rows = np.repeat(np.arange(patients_num), counts)
+        # the times of the day are compared in minutes
+        measure_minutes = tutil.calc_minutes_of_day(
+            np.concatenate([patient.measures_datetimes for patient in patients]))
+        slots, matched = PatientDataFrame._match_slots(measure_minutes, rows, counts)
+        series = [[patient.values.systolic_blood_pressures for patient in patients],
+                  [patient.values.diastolic_blood_pressures for patient in patients],
+                  [patient.values.heart_rates for patient in patients]]
+        for key_index, column in enumerate(series):
+            measures[rows[matched], slots[matched], key_index] = np.concatenate(
+                [np.ma.getdata(values) for values in column])[matched]
+            missing[rows[matched], slots[matched], key_index] = np.concatenate(
+                [np.ma.getmaskarray(values) for values in column])[matched]
+        return np.ma.MaskedArray(measures, missing)
+
+    @staticmethod
+    def _match_slots(measure_minutes: np.ndarray, rows: np.ndarray,
+                     counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The measurements of every patient are taken by the slots of their times one after another,
+        a measurement which fits no later slot stops the rest of them
+        :param measure_minutes: the minutes of the day of the measurements of all the patients
+        :param rows: the indices of the patients of the measurements
+        :param counts: the numbers of the measurements of the patients
+        :return: the slots of the measurements and whether they are taken
+        """
+        interval = PatientDataFrame._SLOT_INTERVAL_MINUTES
+        day_slots_num = tutil.MINUTES_IN_DAY // interval
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        day_slots = ((measure_minutes - PatientDataFrame._SLOT_MINUTES[0])
+                     % tutil.MINUTES_IN_DAY) // interval
+        # a slot of the same day goes after the previous one, the next day starts otherwise
+        next_days = np.ones(len(day_slots), dtype=np.int64)
+        next_days[1:] = day_slots[1:] <= day_slots[:-1]
+        next_days[offsets[counts > 0]] = 0
+        days = _cumsum_by_rows(next_days, rows, offsets)
+        slots = day_slots + days * day_slots_num
+        fits = ((measure_minutes % interval == 0) & (days <= 1)
+                & (slots < PatientDataFrame._TIME_INTERVAL_NUM))
+        misfits = _cumsum_by_rows((~fits).astype(np.int64), rows, offsets)
+        return slots, misfits == 0
 
     @staticmethod
     def _calc_day_night_intervals():
@@ -241,6 +351,23 @@ class PatientDataFrame(object):
                           int(sec_day_length / PatientDataFrame._TIME_INTERVAL)))
         return intervals
 
+    @staticmethod
+    def _calc_msd_slots() -> List[np.ndarray]:
+        """
+        :return: the time slots of the MSD columns: all of them, the days, the alternative days,
+        the night and the alternative night
+        """
+        # noinspection PyUnresolvedReferences
+        dn_slots = np.split(np.arange(PatientDataFrame._TIME_INTERVAL_NUM), np.cumsum(
+            [v for k, v in PatientDataFrame.DAY_NIGHT_INTERVALS])[:-1])
+        # noinspection PyUnresolvedReferences
+        dna_slots = np.split(np.arange(PatientDataFrame._TIME_INTERVAL_NUM), np.cumsum(
+            [v for k, v in PatientDataFrame.DAY_NIGHT_ALT_INTERVALS])[:-1])[1::2]
+        return [np.arange(PatientDataFrame._TIME_INTERVAL_NUM),
+                np.concatenate((dn_slots[0], dn_slots[2])),
+                np.concatenate((dna_slots[0], dna_slots[2])),
+                dn_slots[1], dna_slots[1]]
+
     @staticmethod
     def _prepare_columns():
 
@@ -300,16 +427,101 @@ class PatientDataFrame(object):
     def frame(self):
         return self.__frame
 
-    def save_csv(self, basic_output_dir: Path, basic_name: str, encoding=None, separator=','):
-        while True:
-            new_name = "%s_%d" % (basic_name, self._saves_counter)
-            output_path = Path(basic_output_dir, "tables")
-            paths.create_dir(output_path)
-            output_path = Path(output_path, new_name).with_suffix('.' + Extension.CSV.as_string())
-            if output_path.is_file():
-                self.inc_counter()
-                continue
-            else:
-                self.__frame.to_csv(str(output_path), encoding=encoding, index=False, sep=separator)
-                LOGGER.info("The output file was saved as %s" % output_path.absolute())
-                break
+    @PROFILER.timed("dataframe.save_csv")
+    def save_csv(self, basic_output_dir: Path, basic_name: str, encoding=None, separator=',',
+                 rewrite: bool = False):
+        output_path = PatientDataFrame._choose_output_path(basic_output_dir, basic_name, rewrite)
+        PatientDataFrame._write_csv(self.__frame, output_path, encoding, separator)
+        LOGGER.info("The output file was saved as %s" % output_path.absolute())
+
+    @staticmethod
+    def _write_csv(frame: DataFrame, output_path: Path, encoding: str, separator: str):
+        # the csv module formats the cells many times faster than pandas does
+        # with the nullable columns
+        columns = []
+        for position in range(frame.shape[1]):
+            column = frame.iloc[:, position]
+            empty_value = (EMPTY_VALUE_STR if position in PatientDataFrame._EMPTY_VALUE_POSITIONS
+                           else None)
+            columns.append(column.astype(object).where(column.notna(), empty_value).tolist())
+        with open(str(output_path), "w", encoding=encoding or 'utf-8', newline='') as output_file:
+            writer = csv.writer(output_file, delimiter=separator, lineterminator='\n')
+            writer.writerows(zip(*frame.columns))
+            writer.writerows(zip(*columns))
+
+
+class PatientTableWriter(object):
+    """
+    Writes the table of the patients row by row as they are parsed instead of the whole frame.
+    The header is written once when the table is opened and the rows are flushed every few
+    patients, so the memory does not grow with the number of the reports and the rows written
+    before a failure remain in the table
+    """
+
+    def __init__(self, basic_output_dir: Path, basic_name: str, encoding=None, separator=',',
+                 flush_interval: int = 100, rewrite: bool = False):
+        # noinspection PyProtectedMember
+        PatientDataFrame._init_intervals()
+        self.__basic_output_dir = basic_output_dir
+        self.__basic_name = basic_name
+        self.__encoding = encoding
+        self.__separator = separator
+        self.__flush_interval = max(1, flush_interval)
+        self.__rewrite = rewrite
+        self.__output_path = None
+        self.__output_file = None
+        self.__writer = None
+        self.__rows_num = 0
+        self.__unflushed_rows_num = 0
+
+    def __enter__(self) -> 'PatientTableWriter':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def output_path(self) -> Union[None, Path]:
+        return self.__output_path
+
+    @property
+    def rows_num(self) -> int:
+        return self.__rows_num
+
+    def open(self):
+        # noinspection PyProtectedMember
+        self.__output_path = PatientDataFrame._choose_output_path(self.__basic_output_dir,
+                                                                  self.__basic_name,
+                                                                  self.__rewrite)
+        self.__output_file = open(str(self.__output_path), "w",
+                                  encoding=self.__encoding or 'utf-8', newline='')
+        self.__writer = csv.writer(self.__output_file, delimiter=self.__separator,
+                                   lineterminator='\n')
+        # noinspection PyProtectedMember
+        self.__writer.writerows(PatientDataFrame._prepare_columns())
+        self.flush()
+
+    @PROFILER.timed("table.write")
+    def write(self, patients: Iterable[Patient]):
+        patients = list(patients)
+        if not patients:
+            return
+        # noinspection PyProtectedMember
+        self.__writer.writerows(PatientDataFrame._prepare_rows(patients))
+        self.__rows_num += len(patients)
+        self.__unflushed_rows_num += len(patients)
+        if self.__unflushed_rows_num >= self.__flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.__output_file.flush()
+        self.__unflushed_rows_num = 0
+
+    def close(self):
+        if self.__output_file is None:
+            return
+        self.__output_file.close()
+        self.__output_file = None
+        self.__writer = None
+        LOGGER.info("The output file was saved as %s" % self.__output_path.absolute())
@@ -1,12 +1,18 @@
 import re
 from enum import Enum
-from typing import Tuple, Union, List
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Tuple, Union, List
 
+import numpy as np
+
+from src.profiling import PROFILER
 from src.util import math_util as mutil
 from src.util.collections import Block
 from src.util.strings import ENTRY_DELIMITER, VALUE_DELIMITER
 
 _PATIENT_ID_LEN_BOUND = (3, 10)
+# the labels recur across the reports, so their tags are kept between the reports as well
+_TAGS_CACHE_SIZE = 8192
 
 
 class ReportItemPattern(Enum):
@@ -52,6 +58,10 @@ class ReportItemPattern(Enum):
         return self.value
 
 
+# the names of the counters of the checks of the patterns
+_PATTERN_COUNTERS = {pattern: "pattern.%s" % pattern.name for pattern in ReportItemPattern}
+
+
 class ReportItemKey(Enum):
     TIME = "time"
     INTERVAL = "interval"
@@ -109,32 +119,101 @@ class ReportItem(Enum):
         return self.__pattern
 
 
-class _SensitiveCaseReportString(object):
+def _strip_final_newline(string: str) -> str:
+    # '$' matches before the final newline as well
+    if string.endswith('\n'):
+        return string[:-1]
+    return string
 
-    def __init__(self, string: str):
-        self.__string = string
 
-    def __str__(self):
-        return self.__string
+def _match_decimal(string: str, min_length: int, max_length: int) -> Union[None, str]:
+    string = _strip_final_newline(string)
+    if min_length <= len(string) <= max_length and string.isdecimal():
+        return string
+    return None
 
-    def starts_with(self, substring: str) -> bool:
-        return str(self).startswith(substring)
 
+def _match_start_num(string: str) -> Union[None, str]:
+    if string[:1].isdecimal():
+        return string[:1]
+    return None
+
+
+# exact equivalents of the patterns which are checked without the regular expressions
+_PATTERN_PRECHECKS = {
+    ReportItemPattern.TWO_THREE_DIGITS_NUM: lambda string: _match_decimal(string, 2, 3),
+    ReportItemPattern.PATIENT_ID: lambda string: _match_decimal(string, *_PATIENT_ID_LEN_BOUND),
+    ReportItemPattern.START_NUM: _match_start_num,
+}  # type: Dict[ReportItemPattern, Callable[[str], Union[None, str]]]
+
+
+class ReportItemClassifier(object):
+    """
+    Tags a string with all the patterns it matches in one pass of a combined matcher.
+    Every pattern is wrapped into an optional lookahead which searches for it from
+    the start of the string, so each group captures what a search of its pattern would.
+    """
+
+    def __init__(self, cache_size: int = _TAGS_CACHE_SIZE):
+        self.__patterns = list(ReportItemPattern)
+        self.__matcher = re.compile(''.join("(?=(?:(?s:.*?)(?P<%s>%s))?)"
+                                            % (pattern.name, pattern.as_string())
+                                            for pattern in self.__patterns))
+        self.classify = lru_cache(maxsize=cache_size)(self.__classify)
 
-class _InsensitiveCaseReportString(_SensitiveCaseReportString):
+    def __classify(self, string: str) -> Dict[ReportItemPattern, str]:
+        """
+        Find the patterns the string matches
+        :param string: a string of the report
+        :return: the matched parts of the string by the patterns
+        """
+        PROFILER.count("classifier.evaluations")
+        groups = self.__matcher.match(string).groupdict()
+        return {pattern: groups[pattern.name] for pattern in self.__patterns
+                if groups[pattern.name] is not None}
+
+
+_CLASSIFIER = ReportItemClassifier()
+
+
+def match_pattern(string: str, pattern: ReportItemPattern) -> Union[None, str]:
+    if PROFILER.enabled:
+        PROFILER.count(_PATTERN_COUNTERS[pattern])
+    precheck = _PATTERN_PRECHECKS.get(pattern)
+    if precheck is not None:
+        return precheck(string)
+    return _CLASSIFIER.classify(string).get(pattern)
+
+
+class _InsensitiveCaseReportString(object):
+    __slots__ = ('__string',)
 
     def __init__(self, string: str):
-        super().__init__(string.lower())
+        self.__string = string.lower()
+
+    def __str__(self):
+        return self.__string
 
     def starts_with(self, substring: str) -> bool:
-        return str(self).startswith(substring.lower())
+        return self.__string.startswith(substring.lower())
+
+
+# marks the lazy attributes which have not been computed yet, None is a valid value for them
+_NOT_COMPUTED = object()
 
 
 class ReportString(object):
+    """
+    The strings are shared within a block, so their tags, numeric values
+    and case-insensitive views are computed on demand and at most once.
+    """
+    __slots__ = ('__string', '__tags', '__number', '__case_insensitive_string')
 
     def __init__(self, string: str):
         self.__string = string
-        self.__sensitive_case_string = _SensitiveCaseReportString(string)
+        self.__tags = None
+        self.__number = _NOT_COMPUTED
+        self.__case_insensitive_string = None
 
     def __str__(self):
         return self.__string
@@ -142,11 +221,29 @@ class ReportString(object):
     def __bool__(self):
         return bool(self.__string)
 
+    @property
+    def tags(self) -> Dict[ReportItemPattern, str]:
+        if self.__tags is None:
+            self.__tags = _CLASSIFIER.classify(self.__string)
+        return self.__tags
+
+    @property
+    def number(self) -> Union[None, int]:
+        """
+        The integer the string consists of or None
+        """
+        if self.__number is _NOT_COMPUTED:
+            string = _strip_final_newline(self.__string)
+            self.__number = int(string) if string.isdecimal() else None
+        return self.__number
+
     def matches(self, pattern: ReportItemPattern) -> str:
-        pattern_str = pattern.as_string()
-        match = re.search(pattern_str, self.__string)
-        if match:
-            return match.group()
+        if PROFILER.enabled:
+            PROFILER.count(_PATTERN_COUNTERS[pattern])
+        precheck = _PATTERN_PRECHECKS.get(pattern)
+        if precheck is not None:
+            return precheck(self.__string)
+        return self.tags.get(pattern)
 
     def __has_entry_delimiter(self) -> bool:
         return ENTRY_DELIMITER in self.__string
@@ -169,33 +266,91 @@ class ReportString(object):
             return key, value
 
     def starts_with(self, substring: str) -> bool:
-        return self.__sensitive_case_string.starts_with(substring)
+        return self.__string.startswith(substring)
 
     def cut_header(self, number_of_cut_symbols: int) -> str:
         return self.__string[number_of_cut_symbols:].lstrip()
 
     def case_insensitive(self) -> _InsensitiveCaseReportString:
-        return _InsensitiveCaseReportString(self.__string)
+        if self.__case_insensitive_string is None:
+            self.__case_insensitive_string = _InsensitiveCaseReportString(self.__string)
+        return self.__case_insensitive_string
+
+
+_EMPTY_REPORT_STRING = ReportString("")
+
+
+class NumberColumn(object):
+    """
+    The groups of the consecutive two- and three-digit numbers of a column block:
+    the numbers of all the groups are in one array, the group i takes the numbers
+    from offsets[i] to offsets[i + 1]
+    """
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.__values = values
+        self.__offsets = offsets
+
+    def __len__(self):
+        return len(self.__offsets) - 1
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.__values[self.__offsets[index]:self.__offsets[index + 1]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.__values
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self.__offsets
+
+    @property
+    def groups_lengths(self) -> np.ndarray:
+        return np.diff(self.__offsets)
 
 
 class ReportBlock(Block[str]):
+    """
+    The block remembers where the search of each pattern has stopped: the remaining strings
+    before that position do not match the pattern, so the next search starts from there.
+    Equal strings of the block are represented by the same ReportString.
+    """
+
+    def __init__(self, inner_list: List[str]):
+        super().__init__(inner_list)
+        self.__cursors = {}
+        self.__report_strings = {}
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.__cursors = {}
+        self.__report_strings = {}
+
+    def get_report_string(self, index: int) -> ReportString:
+        return self.__intern(self[index])
 
     def search_first_occurrence_by_pattern(
             self, pattern: ReportItemPattern) -> Tuple[Union[int, None], ReportString]:
-        for i, string in enumerate(self.inner_list):
-            report_string = ReportString(string)
-            if report_string.matches(pattern):
-                return i, report_string
-        return None, ReportString("")
+        position = self._search_position(pattern)
+        if position is None:
+            return None, _EMPTY_REPORT_STRING
+        return self._to_index(position), self.__intern(self._get_by_position(position))
 
     def remove_item(self, pattern: ReportItemPattern) -> ReportString:
         return self.search_first_occurrence_by_pattern_and_remove(pattern)
 
     def search_first_occurrence_by_pattern_and_remove(self,
                                                       pattern: ReportItemPattern) -> ReportString:
-        i, report_string = self.search_first_occurrence_by_pattern(pattern)
-        self.remove_by_index(i)
-        return report_string
+        position = self._search_position(pattern)
+        if position is None:
+            return _EMPTY_REPORT_STRING
+        self._remove_positions((position,))
+        return self.__intern(self._get_by_position(position))
 
     def replace_item(self, pattern: ReportItemPattern, replacement: str) -> ReportString:
         return self.search_first_occurrence_by_pattern_and_replace(pattern, replacement)
@@ -206,25 +361,74 @@ class ReportBlock(Block[str]):
         self.replace_by_index(i, replacement)
         return report_string
 
+    def tokenize_numbers(self) -> NumberColumn:
+        """
+        Find the groups of the consecutive strings matching TWO_THREE_DIGITS_NUM
+        and convert them into the integers in one pass over the block
+        """
+        strings = np.array(self.inner_list, dtype=np.str_)
+        lengths = np.char.str_len(strings)
+        is_number = (lengths >= 2) & (lengths <= 3) & np.char.isdecimal(strings)
+        # '$' matches before the final newline, such strings are checked one by one
+        for index in np.flatnonzero(np.char.endswith(strings, '\n')):
+            is_number[index] = _match_decimal(str(strings[index]), 2, 3) is not None
+        edges = np.diff(np.concatenate(([0], is_number.view(np.int8), [0])))
+        groups_lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        offsets = np.concatenate(([0], np.cumsum(groups_lengths))).astype(np.intp)
+        return NumberColumn(strings[is_number].astype(np.int64), offsets)
+
+    def replace_by_index(self, index: int, replacement: str):
+        position = self._to_position(index)
+        self._replace_by_position(position, replacement)
+        self.__rewind_cursors(position)
+
+    def eliminate_voids(self):
+        super().eliminate_voids()
+        self.__cursors = {}
+
+    def _search_position(self, pattern: ReportItemPattern) -> Union[int, None]:
+        for position, string in self._iter_positions(self.__cursors.get(pattern, 0)):
+            if match_pattern(string, pattern):
+                self.__cursors[pattern] = position
+                return position
+        self.__cursors[pattern] = self._positions_num
+        return None
+
+    def _compact(self):
+        # the cursors are moved back by the number of the removed strings before them
+        for pattern, position in self.__cursors.items():
+            self.__cursors[pattern] = self._to_index(position)
+        super()._compact()
+
+    def __intern(self, string: str) -> ReportString:
+        report_string = self.__report_strings.get(string)
+        if report_string is None:
+            report_string = self.__report_strings[string] = ReportString(string)
+        return report_string
+
+    def __rewind_cursors(self, position: int):
+        # the new string may match any pattern
+        for pattern, cursor in self.__cursors.items():
+            self.__cursors[pattern] = min(cursor, position)
+
     def _search_neighbor(self, neighbor_index: int,
                          neighbor_pattern: ReportItemPattern) -> ReportString:
-        neighbor_str = self.inner_list[neighbor_index]
-        neighbor_report_str = ReportString(neighbor_str)
-        if neighbor_report_str.matches(neighbor_pattern):
-            return neighbor_report_str
+        neighbor_str = self[neighbor_index]
+        if match_pattern(neighbor_str, neighbor_pattern):
+            return self.__intern(neighbor_str)
 
     def search_among_neighbors(self, item_index: int,
                                neighbor_pattern: ReportItemPattern) -> Tuple[int, ReportString]:
         left_neighbor_index = item_index - 1
         right_neighbor_index = item_index + 1
         neighbor_index = None
-        neighbor_report_string = ReportString("")
+        neighbor_report_string = _EMPTY_REPORT_STRING
         if item_index > 0:
             neighbor_index = left_neighbor_index
             neighbor_report_string = self._search_neighbor(neighbor_index, neighbor_pattern)
             if neighbor_report_string is not None:
                 return neighbor_index, neighbor_report_string
-        if right_neighbor_index < len(self.inner_list):
+        if right_neighbor_index < len(self):
             neighbor_index = right_neighbor_index
             neighbor_report_string = self._search_neighbor(neighbor_index, neighbor_pattern)
             if neighbor_report_string is not None:
@@ -236,14 +440,14 @@ class ReportBlock(Block[str]):
                                           ReportItemPattern) -> ReportString:
         left_neighbor_index = item_index - 1
         right_neighbor_index = item_index + 1
-        neighbor_report_string = ReportString("")
+        neighbor_report_string = _EMPTY_REPORT_STRING
         if item_index > 0:
             neighbor_index = left_neighbor_index
             neighbor_report_string = self._search_neighbor(neighbor_index, neighbor_pattern)
             if neighbor_report_string is not None:
                 self.remove_by_indices(neighbor_index, neighbor_index + 2)
                 return neighbor_report_string
-        if right_neighbor_index < len(self.inner_list):
+        if right_neighbor_index < len(self):
             neighbor_index = right_neighbor_index
             neighbor_report_string = self._search_neighbor(neighbor_index, neighbor_pattern)
             if neighbor_report_string is not None:
@@ -251,26 +455,32 @@ class ReportBlock(Block[str]):
                 return neighbor_report_string
         return neighbor_report_string
 
-    def _search_sequence_indices_by_header_pattern(self, header_pattern: ReportItemPattern,
-                                                   sequence_length: int) -> Tuple[int, int, int]:
-        header_index, header = self.search_first_occurrence_by_pattern(header_pattern)
-        if header_index is not None:
-            start_sequence_index = header_index + 1
-            finish_sequence_index = header_index + sequence_length + 1
-            return header_index, start_sequence_index, finish_sequence_index
+    def _search_sequence_positions_by_header_pattern(self, header_pattern: ReportItemPattern,
+                                                     sequence_length: int) -> Tuple[int,
+                                                                                    List[int]]:
+        header_position = self._search_position(header_pattern)
+        if header_position is not None:
+            sequence_positions = []
+            for position, _ in self._iter_positions(header_position + 1):
+                if len(sequence_positions) == sequence_length:
+                    break
+                sequence_positions.append(position)
+            return header_position, sequence_positions
 
     def search_sequence_by_header_pattern(self, header_pattern: ReportItemPattern,
                                           sequence_length: int) -> Tuple[str, List[str]]:
-        indices = self._search_sequence_indices_by_header_pattern(header_pattern, sequence_length)
-        header_index, start_sequence_index, finish_sequence_index = indices
-        header = self.inner_list[header_index]
-        sequence = self.inner_list[start_sequence_index:finish_sequence_index]
+        positions = self._search_sequence_positions_by_header_pattern(header_pattern,
+                                                                      sequence_length)
+        header_position, sequence_positions = positions
+        header = self._get_by_position(header_position)
+        sequence = [self._get_by_position(position) for position in sequence_positions]
         return header, sequence
 
     def search_sequence_by_header_pattern_and_remove(self, header_pattern: ReportItemPattern,
                                                      sequence_length: int) -> List[str]:
-        indices = self._search_sequence_indices_by_header_pattern(header_pattern, sequence_length)
-        header_index, start_sequence_index, finish_sequence_index = indices
-        sequence = self.inner_list[start_sequence_index:finish_sequence_index]
-        self.remove_by_indices(header_index, finish_sequence_index)
+        positions = self._search_sequence_positions_by_header_pattern(header_pattern,
+                                                                      sequence_length)
+        header_position, sequence_positions = positions
+        sequence = [self._get_by_position(position) for position in sequence_positions]
+        self._remove_positions([header_position] + sequence_positions)
         return sequence
@@ -1,7 +1,7 @@
 from pathlib import Path
 
 import logging
-from typing import Iterable
+from typing import Iterable, Sized, Union
 
 LOGGER = logging.getLogger('main_logger')
 MESSAGE_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -30,16 +30,40 @@ init_logger()
 
 
 class ReportsStatistics(object):
-
-    def __init__(self, reports_paths: Iterable[Path]):
-        number_of_reports = len(list(reports_paths))
-        self.__number_of_reports = number_of_reports
+    """
+    Counters of the handled reports. The number of the reports may be unknown in advance,
+    then it is counted as the reports are handled
+    """
+
+    def __init__(self, reports_paths: Union[None, Sized, Iterable[Path]]):
+        if reports_paths is None:
+            number_of_reports = None
+        elif isinstance(reports_paths, Sized):
+            number_of_reports = len(reports_paths)
+        else:
+            number_of_reports = len(list(reports_paths))
+        self.__expected_number_of_reports = number_of_reports
+        self.__number_of_counted_reports = 0
         self.__number_of_fails = 0
-        self.__number_of_successes = number_of_reports
+
+    @classmethod
+    def of_number(cls, number_of_reports: Union[None, int]) -> 'ReportsStatistics':
+        statistics = cls(None)
+        statistics.__expected_number_of_reports = number_of_reports
+        return statistics
+
+    @property
+    def expected_number_of_reports(self) -> Union[None, int]:
+        """
+        The number of the reports known in advance or None
+        """
+        return self.__expected_number_of_reports
 
     @property
     def number_of_reports(self):
-        return self.__number_of_reports
+        if self.__expected_number_of_reports is None:
+            return self.__number_of_counted_reports
+        return self.__expected_number_of_reports
 
     @property
     def number_of_fails(self):
@@ -47,8 +71,10 @@ class ReportsStatistics(object):
 
     @property
     def number_of_successes(self):
-        self.__number_of_successes = self.__number_of_reports - self.__number_of_fails
-        return self.__number_of_successes
+        return self.number_of_reports - self.__number_of_fails
+
+    def count_report(self):
+        self.__number_of_counted_reports += 1
 
     def inc_counter_of_fails(self):
         self.__number_of_fails += 1
@@ -59,7 +85,11 @@ class ReportEventMessageBuilder(object):
     def __init__(self, report_name: str, report_index: int,
                  report_statistics: ReportsStatistics):
         self.__header = "Report %s" % report_name
-        self.__counter = "(%d/%d)" % (report_index, report_statistics.number_of_reports)
+        number_of_reports = report_statistics.expected_number_of_reports
+        if number_of_reports is None:
+            self.__counter = "(%d)" % report_index
+        else:
+            self.__counter = "(%d/%d)" % (report_index, number_of_reports)
 
     def create_message(self, core_text: str):
         return "%s %s %s" % (self.__header, core_text, self.__counter)
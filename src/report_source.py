@@ -0,0 +1,215 @@
+import hashlib
+import os
+import tarfile
+import zipfile
+import zlib
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Iterator, List, Union
+
+from src.report_logging import LOGGER
+from src.util import paths
+from src.util.paths import Extension
+
+_HASH_CHUNK_SIZE = 1024 ** 2
+_NANOSECONDS_IN_SECOND = 10 ** 9
+ARCHIVE_EXTENSIONS = (Extension.ZIP, Extension.TAR, Extension.TAR_GZ, Extension.TGZ,
+                      Extension.TAR_BZ2, Extension.TAR_XZ)
+
+
+class ReportSource(object):
+    """
+    A report file or a member of an archive read into memory.
+    The key identifies the report among all the inputs, a member is keyed by the path of
+    its archive joined with its name inside the archive.
+    """
+
+    def __init__(self, key: str, name: str, data: Union[Path, bytes], size: int = None,
+                 mtime: int = None):
+        self.__key = key
+        self.__name = name
+        self.__data = data
+        self.__size = size
+        self.__mtime = mtime
+
+    @classmethod
+    def of_file(cls, path: Path) -> 'ReportSource':
+        return cls(str(path), path.stem, path)
+
+    @classmethod
+    def of_archive_member(cls, archive_path: Path, member_name: str, content: bytes,
+                          mtime: int) -> 'ReportSource':
+        key = os.path.join(str(archive_path), member_name)
+        return cls(key, PurePosixPath(member_name).stem, content, len(content), mtime)
+
+    @classmethod
+    def of(cls, source: Union[Path, 'ReportSource']) -> 'ReportSource':
+        if isinstance(source, ReportSource):
+            return source
+        return cls.of_file(Path(source))
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def data(self) -> Union[Path, bytes]:
+        """
+        The path of the report file or the content of the archive member
+        """
+        return self.__data
+
+    @property
+    def size(self) -> int:
+        if self.__size is None:
+            self.__stat()
+        return self.__size
+
+    @property
+    def mtime(self) -> int:
+        """
+        Modification time in nanoseconds
+        """
+        if self.__mtime is None:
+            self.__stat()
+        return self.__mtime
+
+    def digest(self) -> str:
+        if isinstance(self.__data, bytes):
+            return hashlib.sha256(self.__data).hexdigest()
+        content_hash = hashlib.sha256()
+        with open(str(self.__data), "rb") as raw_file:
+            for chunk in iter(lambda: raw_file.read(_HASH_CHUNK_SIZE), b''):
+                content_hash.update(chunk)
+        return content_hash.hexdigest()
+
+    def __stat(self):
+        path_stat = self.__data.stat()
+        self.__size = path_stat.st_size
+        self.__mtime = path_stat.st_mtime_ns
+
+
+class ReportSourceCollection(object):
+    """
+    The reports of the folder: its report files and the report members of its archives.
+    The archives are read sequentially and one member at a time,
+    so they are never unpacked to the disk or loaded into memory as a whole.
+    """
+
+    def __init__(self, dir_path: Union[str, Path], ext: Extension):
+        self.__ext = ext
+        self.__files_paths = list(paths.collect_dir_content_by_extension(dir_path, ext))
+        archives_paths = set()
+        for archive_ext in ARCHIVE_EXTENSIONS:
+            archives_paths.update(paths.collect_dir_content_by_extension(dir_path, archive_ext))
+        self.__archives_paths = sorted(archives_paths)
+        self.__length = None
+
+    @property
+    def files_paths(self) -> List[Path]:
+        return self.__files_paths
+
+    @property
+    def archives_paths(self) -> List[Path]:
+        return self.__archives_paths
+
+    @property
+    def length(self) -> Union[None, int]:
+        """
+        The number of the reports counted by the archive indices.
+        A compressed TAR has none and it is not decompressed just to be counted,
+        so the number is None until all the reports have been streamed
+        """
+        if self.__length is None:
+            length = len(self.__files_paths)
+            for path in self.__archives_paths:
+                members_num = self.__count_members(path)
+                if members_num is None:
+                    return None
+                length += members_num
+            self.__length = length
+        return self.__length
+
+    def __iter__(self) -> Iterator[ReportSource]:
+        length = 0
+        for path in self.__files_paths:
+            length += 1
+            yield ReportSource.of_file(path)
+        for path in self.__archives_paths:
+            for source in self.__stream_members(path):
+                length += 1
+                yield source
+        self.__length = length
+
+    def __is_report_member(self, member_name: str) -> bool:
+        return member_name.lower().endswith('.' + self.__ext.as_string())
+
+    def __count_members(self, archive_path: Path) -> Union[None, int]:
+        try:
+            if zipfile.is_zipfile(str(archive_path)):
+                with zipfile.ZipFile(str(archive_path)) as archive:
+                    return sum(1 for info in archive.infolist()
+                               if not info.is_dir() and self.__is_report_member(info.filename))
+            # the headers of a plain TAR are read by seeking over the members' contents
+            with tarfile.open(str(archive_path), "r:") as archive:
+                return sum(1 for member in archive.getmembers()
+                           if member.isfile() and self.__is_report_member(member.name))
+        except tarfile.ReadError:
+            # the archive is compressed or broken, it is found out while it is streamed
+            return None
+        except (OSError, zipfile.BadZipFile, tarfile.TarError) as err:
+            LOGGER.error("Archive %s has not been read" % archive_path.name)
+            LOGGER.debug(err)
+            return 0
+
+    def __stream_members(self, archive_path: Path) -> Iterator[ReportSource]:
+        try:
+            if zipfile.is_zipfile(str(archive_path)):
+                yield from self.__stream_zip_members(archive_path)
+            else:
+                yield from self.__stream_tar_members(archive_path)
+        except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError) as err:
+            LOGGER.error("Archive %s has not been read to the end" % archive_path.name)
+            LOGGER.debug(err)
+
+    def __stream_zip_members(self, archive_path: Path) -> Iterator[ReportSource]:
+        with zipfile.ZipFile(str(archive_path)) as archive:
+            # the members are ordered as they are stored, so the archive is read sequentially
+            infos = sorted(archive.infolist(), key=lambda info: info.header_offset)
+            for info in infos:
+                if info.is_dir() or not self.__is_report_member(info.filename):
+                    continue
+                try:
+                    content = archive.read(info)
+                except (RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error) as err:
+                    # the member is encrypted, compressed in an unsupported way or broken,
+                    # the other members are still read
+                    LOGGER.error("Report %s of archive %s has not been read"
+                                 % (info.filename, archive_path.name))
+                    LOGGER.debug(err)
+                    continue
+                yield ReportSource.of_archive_member(archive_path, info.filename, content,
+                                                     self.__get_zip_member_mtime(archive_path,
+                                                                                 info))
+
+    @staticmethod
+    def __get_zip_member_mtime(archive_path: Path, info: zipfile.ZipInfo) -> int:
+        try:
+            return int(datetime(*info.date_time).timestamp()) * _NANOSECONDS_IN_SECOND
+        except (ValueError, OverflowError, OSError):
+            # the date of the member is malformed, the archive is as old as its member
+            return archive_path.stat().st_mtime_ns
+
+    def __stream_tar_members(self, archive_path: Path) -> Iterator[ReportSource]:
+        # the stream mode never seeks back, so compressed archives are decompressed once
+        with tarfile.open(str(archive_path), "r|*") as archive:
+            for member in archive:
+                if not member.isfile() or not self.__is_report_member(member.name):
+                    continue
+                content = archive.extractfile(member).read()
+                mtime = int(member.mtime) * _NANOSECONDS_IN_SECOND
+                yield ReportSource.of_archive_member(archive_path, member.name, content, mtime)
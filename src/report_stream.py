@@ -0,0 +1,173 @@
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple, Union
+
+from pdfminer.psparser import PSException
+
+from src.file_process import InvalidPdfError
+from src.manifest import RunManifest
+from src.patient import Patient
+from src.profiling import PROFILER
+from src.quarantine import Quarantine
+from src.report import Report
+from src.report_builder import ReportBuilder
+from src.report_logging import LOGGER, ReportEventMessageBuilder, ReportsStatistics
+from src.report_source import ReportSource
+from src.worker_pool import GuardedProcessPoolExecutor, RenewablePoolExecutor, WorkerLimitError, \
+    WorkerLimits
+
+# the number of reports submitted to the pool ahead of the one being logged, per worker
+WORKER_QUEUE_SIZE = 2
+
+
+def stream_patients_with_logging(reports_paths: Iterable[Union[Path, ReportSource]],
+                                 report_statistics: ReportsStatistics,
+                                 workers_num: int = 1, report_builder: ReportBuilder = None,
+                                 manifest: RunManifest = None, worker_limits: WorkerLimits = None,
+                                 quarantine: Quarantine = None, executor: Executor = None):
+    """
+    Parse the reports and make up their patients
+    :param executor: the pool to parse the reports in, if it is not given,
+    a pool is created for these reports by workers_num and worker_limits and shut down after them
+    """
+    # the sources are streamed lazily, so that the archives are read one member at a time
+    reports_sources = map(ReportSource.of, reports_paths)
+    if report_builder is None:
+        report_builder = ReportBuilder()
+    queue_size = max(1, workers_num) * WORKER_QUEUE_SIZE
+    if executor is None:
+        executor = create_executor(workers_num, worker_limits)
+        if executor is not None:
+            with executor:
+                yield from __stream_patients(reports_sources, report_statistics, report_builder,
+                                             manifest, quarantine, executor, queue_size)
+            return
+    yield from __stream_patients(reports_sources, report_statistics, report_builder, manifest,
+                                 quarantine, executor, queue_size)
+
+
+def create_executor(workers_num: int,
+                    worker_limits: WorkerLimits = None) -> Union[None, Executor]:
+    """
+    Create the pool the reports are parsed in
+    :param workers_num: the number of the worker processes
+    :param worker_limits: the limits of the workers
+    :return: the pool or None if the reports should be parsed in the current process
+    """
+    if worker_limits is not None:
+        # the limits are enforced by isolating the reports in workers, even in a single one
+        return GuardedProcessPoolExecutor(workers_num, worker_limits)
+    if workers_num > 1:
+        return RenewablePoolExecutor(partial(ProcessPoolExecutor, max_workers=workers_num))
+    return None
+
+
+def __stream_patients(reports_sources: Iterable[ReportSource], statistics: ReportsStatistics,
+                      report_builder: ReportBuilder, manifest: RunManifest = None,
+                      quarantine: Quarantine = None, executor: Executor = None,
+                      queue_size: int = 1) -> Iterator[Patient]:
+    jobs = __stream_report_jobs(reports_sources, manifest, quarantine, executor, queue_size,
+                                report_builder)
+    for index, (source, restored_report, future) in enumerate(jobs):
+        start_num = index + 1
+        statistics.count_report()
+        if restored_report is not None:
+            log_restored_report(start_num, source, statistics)
+            yield Patient(restored_report)
+            continue
+        if quarantine is not None and quarantine.contains(source):
+            log_quarantined_report(start_num, source, statistics, quarantine)
+            continue
+        report = build_report_with_logging(start_num, source, statistics, report_builder,
+                                           future, quarantine)
+        if manifest is not None:
+            manifest.record(source, report)
+        if report is not None:
+            yield Patient(report)
+
+
+def __stream_report_jobs(reports_sources: Iterable[ReportSource],
+                         manifest: Union[None, RunManifest], quarantine: Union[None, Quarantine],
+                         executor: Union[None, Executor], queue_size: int,
+                         report_builder: ReportBuilder
+                         ) -> Iterator[Tuple[ReportSource, Union[None, Report],
+                                             Union[None, Future]]]:
+    # the reports restored from the manifest and the quarantined ones
+    # are not submitted to the pool, but they keep their places in the stream
+    queue = deque()
+    for source in reports_sources:
+        restored_report = None
+        future = None
+        if manifest is not None:
+            restored_report = manifest.restore(source)
+        is_quarantined = quarantine is not None and quarantine.contains(source)
+        if restored_report is None and not is_quarantined and executor is not None:
+            future = executor.submit(report_builder.build, source, complete=True)
+        queue.append((source, restored_report, future))
+        if len(queue) >= queue_size:
+            yield queue.popleft()
+    while queue:
+        yield queue.popleft()
+
+
+def log_restored_report(index: int, source: ReportSource, statistics: ReportsStatistics):
+    message_builder = ReportEventMessageBuilder(source.name, index, statistics)
+    LOGGER.info(message_builder.create_message("has been restored from the previous run"))
+
+
+def log_quarantined_report(index: int, source: ReportSource, statistics: ReportsStatistics,
+                           quarantine: Quarantine):
+    message_builder = ReportEventMessageBuilder(source.name, index, statistics)
+    statistics.inc_counter_of_fails()
+    LOGGER.error(message_builder.create_message("has been skipped as quarantined (%s)"
+                                                % quarantine.entries[source.key]["reason"]))
+
+
+def build_report_with_logging(index: int, source: ReportSource, statistics: ReportsStatistics,
+                              report_builder: ReportBuilder, future: Future = None,
+                              quarantine: Quarantine = None) -> Report:
+    message_builder = ReportEventMessageBuilder(source.name, index, statistics)
+    try:
+        if future is None:
+            report = report_builder.build(source)
+        else:
+            report = future.result()
+        PROFILER.merge(report.take_profile_sample())
+        if report.success:
+            message = message_builder.create_message("has been parsed")
+            LOGGER.info(message)
+        else:
+            message = message_builder.create_message("has been parsed with missing values (%s)"
+                                                     % report.message)
+            LOGGER.warning(message)
+        return report
+    except WorkerLimitError as err:
+        message = message_builder.create_message("has been quarantined (%s)" % err)
+        statistics.inc_counter_of_fails()
+        LOGGER.error(message)
+        if quarantine is not None:
+            quarantine.add(source, str(err))
+    except (InvalidPdfError, PSException) as err:
+        # the syntax errors of pdfminer derive from PSException,
+        # a malformed report fails the same way on every run, so it is quarantined
+        reason = "the PDF is malformed: %s" % (str(err) or type(err).__name__)
+        message = message_builder.create_message("has not been parsed as %s" % reason)
+        statistics.inc_counter_of_fails()
+        LOGGER.error(message)
+        if quarantine is not None:
+            quarantine.add(source, reason)
+    except BrokenExecutor as err:
+        # the report may be fine, it has been lost with a worker which has died,
+        # the pool is replaced on the next submission
+        message = message_builder.create_message("has not been parsed as the pool of the "
+                                                 "workers is broken")
+        statistics.inc_counter_of_fails()
+        LOGGER.error(message)
+        LOGGER.debug(err)
+    except Exception as err:
+        message = message_builder.create_message("has not been parsed")
+        statistics.inc_counter_of_fails()
+        LOGGER.error(message)
+        LOGGER.debug(err, exc_info=True)
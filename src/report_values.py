@@ -0,0 +1,86 @@
+from typing import Sequence
+
+import numpy as np
+
+from src.util import time_util as tutil
+
+# the blood pressures and the heart rates have at most three digits
+VALUE_DTYPE = np.dtype(np.int16)
+
+
+class ReportValues(object):
+    """
+    The periodic measurements of the report by columns: the times of the measurements
+    and the blood pressures and the heart rates taken at them. The values which have not been
+    parsed are masked, their measurements have to be entered manually
+    """
+
+    def __init__(self, datetimes: np.ndarray, systolic_blood_pressures: np.ma.MaskedArray,
+                 diastolic_blood_pressures: np.ma.MaskedArray, heart_rates: np.ma.MaskedArray):
+        self.__datetimes = datetimes
+        self.__systolic_blood_pressures = systolic_blood_pressures
+        self.__diastolic_blood_pressures = diastolic_blood_pressures
+        self.__heart_rates = heart_rates
+
+    @staticmethod
+    def of_column(datetimes: np.ndarray, systolic_blood_pressures: Sequence[int] = None,
+                  diastolic_blood_pressures: Sequence[int] = None,
+                  heart_rates: Sequence[int] = None) -> 'ReportValues':
+        """
+        Make up the values of a column of the report
+        :param datetimes: the times of the measurements
+        :param systolic_blood_pressures: the values taken at the times or None if they have
+        not been parsed, the same for the other values
+        """
+        values_num = len(datetimes)
+        return ReportValues(np.asarray(datetimes, dtype=tutil.DATETIME_DTYPE),
+                            ReportValues.__mask_column(systolic_blood_pressures, values_num),
+                            ReportValues.__mask_column(diastolic_blood_pressures, values_num),
+                            ReportValues.__mask_column(heart_rates, values_num))
+
+    @staticmethod
+    def __mask_column(values: Sequence[int], values_num: int) -> np.ma.MaskedArray:
+        if values is None:
+            return np.ma.masked_all(values_num, dtype=VALUE_DTYPE)
+        if len(values) != values_num:
+            raise ValueError("There are %d values for %d times" % (len(values), values_num))
+        return np.ma.MaskedArray(np.asarray(values, dtype=VALUE_DTYPE))
+
+    @staticmethod
+    def concatenate(columns: Sequence['ReportValues']) -> 'ReportValues':
+        if not columns:
+            raise ValueError("There are no values to concatenate")
+        return ReportValues(np.concatenate([column.datetimes for column in columns]),
+                            np.ma.concatenate([column.systolic_blood_pressures
+                                               for column in columns]),
+                            np.ma.concatenate([column.diastolic_blood_pressures
+                                               for column in columns]),
+                            np.ma.concatenate([column.heart_rates for column in columns]))
+
+    def __len__(self):
+        return len(self.__datetimes)
+
+    @property
+    def datetimes(self) -> np.ndarray:
+        return self.__datetimes
+
+    @property
+    def systolic_blood_pressures(self) -> np.ma.MaskedArray:
+        return self.__systolic_blood_pressures
+
+    @property
+    def diastolic_blood_pressures(self) -> np.ma.MaskedArray:
+        return self.__diastolic_blood_pressures
+
+    @property
+    def heart_rates(self) -> np.ma.MaskedArray:
+        return self.__heart_rates
+
+    @property
+    def missing(self) -> np.ndarray:
+        """
+        :return: the mask of the measurements which have any of their values missing
+        """
+        return (np.ma.getmaskarray(self.__systolic_blood_pressures)
+                | np.ma.getmaskarray(self.__diastolic_blood_pressures)
+                | np.ma.getmaskarray(self.__heart_rates))
@@ -0,0 +1,82 @@
+import io
+import mmap
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class MemoryReader(io.RawIOBase):
+    """
+    Read-only seekable file over a buffer which is already in memory.
+    The buffer is not copied, only the chunks which are read are.
+    """
+
+    def __init__(self, buffer: Buffer):
+        super().__init__()
+        self.__view = memoryview(buffer).cast('B')
+        self.__position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.__position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.__position + offset
+        elif whence == io.SEEK_END:
+            position = len(self.__view) + offset
+        else:
+            raise ValueError("invalid whence (%r)" % whence)
+        if position < 0:
+            raise ValueError("negative seek position %d" % position)
+        self.__position = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        start = min(self.__position, len(self.__view))
+        if size is None or size < 0:
+            end = len(self.__view)
+        else:
+            end = min(start + size, len(self.__view))
+        self.__position = end
+        return self.__view[start:end].tobytes()
+
+    def readinto(self, buffer) -> int:
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        if not self.closed:
+            # the mapped file can be closed only after the view of it is released
+            self.__view.release()
+        super().close()
+
+
+@contextmanager
+def map_file(path: Union[str, Path]) -> Iterator[Buffer]:
+    """
+    Map the file into memory for reading
+    :param path: a path of the file
+    :return: the mapped content of the file
+    """
+    with open(str(path), "rb") as raw_file:
+        try:
+            content = mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can not be mapped
+            yield b''
+            return
+        try:
+            yield content
+        finally:
+            content.close()
@@ -1,4 +1,5 @@
-import collections
+import collections.abc
+import itertools
 from typing import List, Iterable, Tuple, Callable, TypeVar, Generic, Iterator, Any, Union
 
 T = TypeVar('T')
@@ -33,27 +34,50 @@ def are_equal(a: Iterable[T], b: Iterable[T]) -> bool:
     return len(new_a) == len([i for i, j in zip(new_a, new_b) if i == j])
 
 
-# TODO: Try to make it collections.Iterable
-class Block(Generic[T], collections.Iterable):
+class Block(Generic[T], collections.abc.Iterable):
+    """
+    The items are removed by marking them with tombstones, so a removal does not shift
+    the rest of the list. The logical indices of the items are converted into their positions
+    in the list, which is compacted only when it is accessed as a whole.
+    """
 
     def __init__(self, inner_list: List[T]):
         self.__inner_list = inner_list
+        # the flags of the removed items, created with the first removal
+        self.__removed = None
+        self.__removed_num = 0
 
     def __len__(self):
-        return len(self.__inner_list)
+        return len(self.__inner_list) - self.__removed_num
 
-    def __getitem__(self, indices: slice):
-        return self.__inner_list[indices]
+    def __getitem__(self, indices: Union[int, slice]):
+        if isinstance(indices, slice):
+            return self.inner_list[indices]
+        return self.__inner_list[self._to_position(indices)]
 
     def __iter__(self):
-        return iter(self.__inner_list)
+        if not self.__removed_num:
+            return iter(self.__inner_list)
+        return (item for _, item in self._iter_positions())
+
+    def __getstate__(self):
+        return {'_Block__inner_list': self.inner_list}
+
+    def __setstate__(self, state):
+        self.__inner_list = state['_Block__inner_list']
+        self.__removed = None
+        self.__removed_num = 0
 
     @property
     def inner_list(self) -> List[T]:
+        self._compact()
         return self.__inner_list
 
     def extend(self, block: 'Block[T]'):
-        self.inner_list.extend(block.inner_list)
+        items = list(block)
+        self.__inner_list.extend(items)
+        if self.__removed is not None:
+            self.__removed.extend(bytes(len(items)))
 
     def eliminate_voids(self):
         self.__inner_list = list(filter(len, self.inner_list))
@@ -80,11 +104,73 @@ class Block(Generic[T], collections.Iterable):
         return filter(item_excluder, self.inner_list)
 
     def replace_by_index(self, index: int, replacement: T):
-        self.inner_list[index] = replacement
+        self._replace_by_position(self._to_position(index), replacement)
 
     def remove_by_index(self, index: Union[None, int]):
         if index is not None:
-            del self.inner_list[index]
+            self._remove_positions((self._to_position(index),))
 
     def remove_by_indices(self, start_index: int, finish_index: int):
-        del self.inner_list[start_index:finish_index]
+        self._remove_positions(self._to_positions(start_index, finish_index))
+
+    # the positions are the indices of the items in the list including the removed ones,
+    # they are kept by the removals and changed by the compaction only
+
+    @property
+    def _positions_num(self) -> int:
+        return len(self.__inner_list)
+
+    def _iter_positions(self, start_position: int = 0) -> Iterator[Tuple[int, T]]:
+        """
+        Iterate over the remaining items starting from the position with their positions
+        """
+        items = self.__inner_list
+        removed = self.__removed
+        for position in range(start_position, len(items)):
+            if removed is None or not removed[position]:
+                yield position, items[position]
+
+    def _get_by_position(self, position: int) -> T:
+        return self.__inner_list[position]
+
+    def _replace_by_position(self, position: int, replacement: T):
+        self.__inner_list[position] = replacement
+
+    def _remove_positions(self, positions: Iterable[int]):
+        if self.__removed is None:
+            self.__removed = bytearray(len(self.__inner_list))
+        removed = self.__removed
+        for position in positions:
+            if not removed[position]:
+                removed[position] = 1
+                self.__removed_num += 1
+
+    def _to_position(self, index: int) -> int:
+        index = range(len(self))[index]
+        return self._to_positions(index, index + 1)[0]
+
+    def _to_positions(self, start_index: int, finish_index: int) -> List[int]:
+        """
+        :return: the positions of the remaining items within the indices sliced as a list is
+        """
+        indices = range(len(self))[start_index:finish_index]
+        if not self.__removed_num:
+            return list(indices)
+        # the items before the start position which are removed are made up for
+        # by skipping as many remaining items from it
+        skipped_num = self.__removed.count(1, 0, indices.start)
+        positions = self._iter_positions(indices.start)
+        return [position for position, _ in itertools.islice(positions, skipped_num,
+                                                              skipped_num + len(indices))]
+
+    def _to_index(self, position: int) -> int:
+        if not self.__removed_num:
+            return position
+        return position - self.__removed.count(1, 0, position)
+
+    def _compact(self):
+        if not self.__removed_num:
+            return
+        self.__inner_list = [item for _, item in self._iter_positions()]
+        self.__removed = None
+        self.__removed_num = 0
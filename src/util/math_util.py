@@ -57,6 +57,27 @@ def msd(numbers: List[int]) -> float:
         return np.sqrt(msd_terms_sum / (n - 2))
 
 
+def msd_rows(values: np.ndarray) -> np.ndarray:
+    """
+    The same as msd of every row of the matrix without the values which are not numbers,
+    the rows of two values are not numbers as well
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rows_num = values.shape[0]
+    rows, columns = np.nonzero(~np.isnan(values))
+    present_values = values[rows, columns]
+    # the terms are taken between the neighbouring values of the same row
+    same_row = rows[1:] == rows[:-1]
+    terms = (present_values[1:] - present_values[:-1])[same_row] ** 2
+    terms_sums = np.bincount(rows[1:][same_row], weights=terms, minlength=rows_num)
+    n = np.bincount(rows, minlength=rows_num)
+    result = np.zeros(rows_num, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.sqrt(terms_sums / (n - 2), out=result, where=n >= 2)
+    result[n == 2] = np.nan
+    return result
+
+
 def mean(numbers):
     return float(sum(numbers)) / max(len(numbers), 1)
 
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+# the index of the group, the first part and the part after the last one it covers,
+# and whether it holds the both columns one after the other
+Piece = Tuple[int, int, int, bool]
+# the parts the two columns have reached, the larger one goes first
+_State = Tuple[int, int]
+
+
+def _calc_bounds(parts_lengths: Sequence[int]) -> Tuple[List[int], Dict[int, int]]:
+    bounds = [0]
+    for length in parts_lengths:
+        bounds.append(bounds[-1] + length)
+    # the empty parts are skipped, so an offset leads to the last part starting there
+    parts_by_bounds = {bound: i for i, bound in enumerate(bounds)}
+    return bounds, parts_by_bounds
+
+
+def _calc_transitions(state: _State, group_index: int, group_length: int, bounds: List[int],
+                      parts_by_bounds: Dict[int, int]) -> List[Tuple[_State, Piece]]:
+    reached, other_reached = state
+    transitions = []
+    # the column which lags behind is extended first, so the columns are filled evenly
+    # when the groups may be taken either way
+    extended_parts = [(other_reached, reached)]
+    if reached != other_reached:
+        extended_parts.append((reached, other_reached))
+    for part, other_part in extended_parts:
+        next_part = parts_by_bounds.get(bounds[part] + group_length)
+        if next_part is not None:
+            next_state = max(next_part, other_part), min(next_part, other_part)
+            transitions.append((next_state, (group_index, part, next_part, False)))
+    if reached == other_reached and group_length % 2 == 0:
+        next_part = parts_by_bounds.get(bounds[reached] + group_length // 2)
+        if next_part is not None:
+            transitions.append(((next_part, next_part),
+                                (group_index, reached, next_part, True)))
+    return transitions
+
+
+def partition_into_column_pair(groups_lengths: Sequence[int],
+                               parts_lengths: Sequence[int]) -> Union[None, List[Piece]]:
+    """
+    Choose the groups which make up two columns split into the parts of the given lengths.
+    A group covers one or more consecutive parts of a column or the same parts of the both
+    columns, the other groups are skipped. The groups of a column follow in their order.
+    The program goes over the groups once keeping the parts the columns have reached.
+    The columns are completed by the earliest groups possible and, among the ways to do it,
+    by the fewest groups holding the both columns.
+    :return: the chosen groups in their order or None if the columns can not be made up
+    """
+    bounds, parts_by_bounds = _calc_bounds(parts_lengths)
+    first_part = parts_by_bounds[0]
+    last_part = parts_by_bounds[bounds[-1]]
+    start_state = first_part, first_part
+    goal_state = last_part, last_part
+    # the fewest double groups each state has been reached with
+    # and the chosen groups in the reverse order as a linked list
+    paths = {start_state: (0, None)}  # type: Dict[_State, Tuple[int, Union[None, tuple]]]
+    for group_index, group_length in enumerate(groups_lengths):
+        if goal_state in paths:
+            break
+        reached = {}
+        for state, (doubles_num, path) in paths.items():
+            for next_state, piece in _calc_transitions(state, group_index, int(group_length),
+                                                       bounds, parts_by_bounds):
+                next_doubles_num = doubles_num + piece[3]
+                best_path = reached.get(next_state, paths.get(next_state))
+                if best_path is None or next_doubles_num < best_path[0]:
+                    reached[next_state] = next_doubles_num, (piece, path)
+        paths.update(reached)
+    if goal_state not in paths:
+        return None
+    pieces = []
+    _, path = paths[goal_state]
+    while path is not None:
+        piece, path = path
+        pieces.append(piece)
+    pieces.reverse()
+    return pieces
+
+
+def merge_column_pair(groups: Sequence[np.ndarray],
+                      pieces: List[Piece]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join the chosen groups into the two columns. Between the parts where the both columns
+    break the column with the greater mean goes first.
+    """
+    pieces_by_parts = defaultdict(list)
+    for piece in pieces:
+        pieces_by_parts[piece[1]].append(piece)
+    first_column = []
+    second_column = []
+    part = min(pieces_by_parts) if pieces else None
+    while pieces_by_parts.get(part):
+        starting_pieces = pieces_by_parts[part]
+        piece = starting_pieces.pop(0)
+        group = groups[piece[0]]
+        if piece[3]:
+            half_length = len(group) // 2
+            columns = [group[:half_length], group[half_length:]]
+            part = piece[2]
+        else:
+            chains = [[piece], [starting_pieces.pop(0)]]
+            # the column which has covered fewer parts is followed until the both break
+            while chains[0][-1][2] != chains[1][-1][2]:
+                chain = min(chains, key=lambda pieces_chain: pieces_chain[-1][2])
+                chain.append(pieces_by_parts[chain[-1][2]].pop(0))
+            columns = [np.concatenate([groups[chain_piece[0]] for chain_piece in chain])
+                       for chain in chains]
+            part = chains[0][-1][2]
+        if columns[0].mean() < columns[1].mean():
+            columns.reverse()
+        first_column.append(columns[0])
+        second_column.append(columns[1])
+    if not first_column:
+        empty_column = np.array([], dtype=np.int64)
+        return empty_column, empty_column.copy()
+    return np.concatenate(first_column), np.concatenate(second_column)
@@ -16,6 +16,13 @@ class Extension(Enum):
     EXECUTABLE = "exe"
     PDF = "pdf"
     PNG = "png"
+    ZIP = "zip"
+    TAR = "tar"
+    TAR_GZ = "tar.gz"
+    TGZ = "tgz"
+    TAR_BZ2 = "tar.bz2"
+    TAR_XZ = "tar.xz"
+    REPORT_ARCHIVE = "wcr"
 
     def as_string(self):
         return self.value
@@ -0,0 +1,48 @@
+from datetime import datetime, time
+from typing import List, Union
+
+import numpy as np
+
+MINUTES_IN_HOUR = 60
+MINUTES_IN_DAY = 24 * MINUTES_IN_HOUR
+DATETIME_DTYPE = np.dtype('datetime64[m]')
+
+_EPOCH = datetime(1970, 1, 1)
+_SECONDS_IN_MINUTE = 60
+_TIME_SEPARATOR = ':'
+
+
+def parse_date(date_str: str, date_format: str) -> int:
+    """
+    Parse a date
+    :return: minutes since the epoch to the start of the day
+    """
+    date = datetime.strptime(date_str, date_format)
+    return int((date - _EPOCH).total_seconds()) // _SECONDS_IN_MINUTE
+
+
+def parse_time(time_str: str) -> int:
+    """
+    Parse a time in the HH:MM format, the hours may have one digit
+    :return: minutes since midnight
+    """
+    hours, separator, minutes = time_str.partition(_TIME_SEPARATOR)
+    if (separator and 1 <= len(hours) <= 2 and len(minutes) == 2
+            and hours.isdecimal() and minutes.isdecimal()):
+        hours, minutes = int(hours), int(minutes)
+        if hours < 24 and minutes < MINUTES_IN_HOUR:
+            return hours * MINUTES_IN_HOUR + minutes
+    raise ValueError("time data %r does not match format '%%H:%%M'" % time_str)
+
+
+def to_datetimes(minutes: List[int]) -> np.ndarray:
+    """
+    :param minutes: minutes since the epoch
+    """
+    return np.array(minutes, dtype=np.int64).astype(DATETIME_DTYPE)
+
+
+def calc_minutes_of_day(datetimes: Union[np.ndarray, datetime, time]) -> Union[np.ndarray, int]:
+    if isinstance(datetimes, (datetime, time)):
+        return datetimes.hour * MINUTES_IN_HOUR + datetimes.minute
+    return np.asarray(datetimes, dtype=DATETIME_DTYPE).astype(np.int64) % MINUTES_IN_DAY
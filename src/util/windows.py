@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import List, Tuple, Union
+
+import numpy as np
+
+# the bound of a window, None for no bound
+Bound = Union[None, np.datetime64, datetime]
+
+
+def _build_sparse_table(values: np.ndarray, ufunc: np.ufunc) -> List[np.ndarray]:
+    """
+    :return: the levels of the table, the k-th level holds the results of the function
+    over the runs of 2 ** k values starting at its indices
+    """
+    levels = [values]
+    run = 1
+    while 2 * run <= len(values):
+        previous_level = levels[-1]
+        levels.append(ufunc(previous_level[:-run], previous_level[run:]))
+        run *= 2
+    return levels
+
+
+def _query_sparse_table(levels: List[np.ndarray], ufunc: np.ufunc, start: int, end: int):
+    # two runs of the same length which overlap cover the range
+    level = (end - start).bit_length() - 1
+    values = levels[level]
+    return ufunc(values[start], values[end - (1 << level)])
+
+
+class WindowIndex(object):
+    """
+    Answers the queries over the values of a series within the windows of time.
+    The window is found by the binary search of the times, the sums come from the prefix sums
+    and the extremes from the sparse tables, so every query takes O(log n).
+    The values which are masked are left out of the series
+    """
+
+    def __init__(self, times: np.ndarray, values: Union[np.ndarray, np.ma.MaskedArray]):
+        if len(times) != len(values):
+            raise ValueError("There are %d values for %d times" % (len(values), len(times)))
+        times = np.asarray(times)
+        present = ~np.ma.getmaskarray(values)
+        values = np.ma.getdata(values)
+        order = np.argsort(times, kind='stable')
+        order = order[present[order]]
+        self.__times = times[order]
+        self.__values = values[order].astype(np.int64)
+        self.__sums = np.concatenate(([0], np.cumsum(self.__values)))
+        squared_deltas = np.diff(self.__values) ** 2
+        self.__squared_delta_sums = np.concatenate(([0], np.cumsum(squared_deltas)))
+        self.__max_levels = _build_sparse_table(self.__values, np.maximum)
+        self.__min_levels = _build_sparse_table(self.__values, np.minimum)
+
+    def __len__(self):
+        return len(self.__times)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.__times
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.__values
+
+    def bounds(self, start: Bound = None, end: Bound = None) -> Tuple[int, int]:
+        """
+        :param start: the first time of the window, the window is open if it is None,
+        the same for the last time
+        :return: the index of the first value within the window and the index after the last one
+        """
+        first = 0
+        last = len(self.__times)
+        if start is not None:
+            first = int(np.searchsorted(self.__times, np.asarray(start, self.__times.dtype),
+                                        side='left'))
+        if end is not None:
+            last = int(np.searchsorted(self.__times, np.asarray(end, self.__times.dtype),
+                                       side='right'))
+        return first, max(first, last)
+
+    def count(self, start: Bound = None, end: Bound = None) -> int:
+        first, last = self.bounds(start, end)
+        return last - first
+
+    def sum(self, start: Bound = None, end: Bound = None) -> int:
+        first, last = self.bounds(start, end)
+        return int(self.__sums[last] - self.__sums[first])
+
+    def mean(self, start: Bound = None, end: Bound = None) -> Union[None, float]:
+        first, last = self.bounds(start, end)
+        if first == last:
+            return None
+        return float(self.__sums[last] - self.__sums[first]) / (last - first)
+
+    def max(self, start: Bound = None, end: Bound = None) -> Union[None, int]:
+        first, last = self.bounds(start, end)
+        if first == last:
+            return None
+        return int(_query_sparse_table(self.__max_levels, np.maximum, first, last))
+
+    def min(self, start: Bound = None, end: Bound = None) -> Union[None, int]:
+        first, last = self.bounds(start, end)
+        if first == last:
+            return None
+        return int(_query_sparse_table(self.__min_levels, np.minimum, first, last))
+
+    def msd(self, start: Bound = None, end: Bound = None) -> float:
+        """
+        The same as math_util.msd of the values within the window,
+        it is not a number for two values, which math_util.msd divides by zero
+        """
+        first, last = self.bounds(start, end)
+        n = last - first
+        if n < 2:
+            return 0
+        if n == 2:
+            return np.nan
+        squared_deltas_sum = self.__squared_delta_sums[last - 1] - self.__squared_delta_sums[first]
+        return np.sqrt(squared_deltas_sum / (n - 2))
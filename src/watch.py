@@ -0,0 +1,50 @@
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from src.util import paths
+from src.util.paths import Extension
+
+# modification time and size of a file
+FileState = Tuple[int, int]
+
+
+class ReportFolderWatcher(object):
+    """
+    Polls the folder for the reports which are new or have changed since they were last seen.
+    A report is reported once its state stays the same for two polls in a row,
+    so that the files which are still being copied are not picked up.
+    The reports which have been reported and then deleted are reported as removed.
+    """
+
+    def __init__(self, dir_path: Union[str, Path], ext: Extension):
+        self.__dir_path = Path(dir_path)
+        self.__ext = ext
+        self.__seen_states = {}
+        self.__handled_states = {}
+
+    def poll(self) -> Tuple[List[Path], List[Path]]:
+        """
+        :return: the paths of the reports which are new or have changed
+        and the paths of the removed ones
+        """
+        current_states = self.__collect_states()
+        ready_paths = []
+        for path, state in current_states.items():
+            if self.__seen_states.get(path) == state and self.__handled_states.get(path) != state:
+                self.__handled_states[path] = state
+                ready_paths.append(path)
+        removed_paths = [path for path in self.__handled_states if path not in current_states]
+        for path in removed_paths:
+            del self.__handled_states[path]
+        self.__seen_states = current_states
+        return sorted(ready_paths), sorted(removed_paths)
+
+    def __collect_states(self) -> Dict[Path, FileState]:
+        states = {}
+        for path in paths.collect_dir_content_by_extension(self.__dir_path, self.__ext):
+            try:
+                path_stat = path.stat()
+            except OSError:
+                continue
+            states[path] = path_stat.st_mtime_ns, path_stat.st_size
+        return states
@@ -0,0 +1,291 @@
+import signal
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+from time import monotonic
+from typing import Callable, List, Union
+
+try:
+    import resource
+except ImportError:
+    # the memory limit is not enforced where the resource limits are not supported
+    resource = None
+
+from src.report_logging import LOGGER
+
+_RETIREMENT_TIMEOUT = 5
+
+
+class WorkerLimitError(Exception):
+    pass
+
+
+class ReportTimeoutError(WorkerLimitError):
+    pass
+
+
+class ReportMemoryLimitError(WorkerLimitError):
+    pass
+
+
+class WorkerCrashedError(WorkerLimitError):
+    pass
+
+
+class WorkerLimits(object):
+    """
+    Limits of a worker process: the wall-clock time of one task in seconds,
+    the address space of the process in bytes and the number of tasks
+    the process handles before it is replaced with a new one. None disables a limit.
+    """
+
+    def __init__(self, timeout: float = None, memory_limit: int = None,
+                 max_tasks_per_worker: int = None):
+        self.__timeout = timeout
+        self.__memory_limit = memory_limit
+        self.__max_tasks_per_worker = max_tasks_per_worker
+
+    @property
+    def timeout(self) -> Union[None, float]:
+        return self.__timeout
+
+    @property
+    def memory_limit(self) -> Union[None, int]:
+        return self.__memory_limit
+
+    @property
+    def max_tasks_per_worker(self) -> Union[None, int]:
+        return self.__max_tasks_per_worker
+
+
+def _work(connection: Connection, memory_limit: Union[None, int]):
+    # the interruption is handled by the parent process, which stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_limit is not None and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        fn, args, kwargs = task
+        try:
+            connection.send((True, fn(*args, **kwargs)))
+        except MemoryError:
+            if memory_limit is None:
+                message = "the memory of the worker has run out"
+            else:
+                message = "the memory limit of %d bytes has been exceeded" % memory_limit
+            connection.send((False, ReportMemoryLimitError(message)))
+            # the heap of the process may stay fragmented, so it is replaced
+            break
+        except Exception as err:
+            try:
+                connection.send((False, err))
+            except Exception:
+                # the exception can not be pickled
+                connection.send((False, RuntimeError(repr(err))))
+    connection.close()
+
+
+class _Worker(object):
+
+    def __init__(self, memory_limit: Union[None, int]):
+        self.connection, child_connection = Pipe()
+        self.process = Process(target=_work, args=(child_connection, memory_limit), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.future = None
+        self.deadline = None
+        self.tasks_num = 0
+
+    @property
+    def is_busy(self) -> bool:
+        return self.future is not None
+
+    def retire(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(_RETIREMENT_TIMEOUT)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class GuardedProcessPoolExecutor(Executor):
+    """
+    Process pool which enforces the worker limits: a worker which runs a task for longer
+    than the timeout is killed, a worker which runs out of its memory limit or crashes
+    is replaced, and every worker is replaced after the given number of tasks.
+    The futures of such tasks fail with a WorkerLimitError.
+    """
+
+    def __init__(self, max_workers: int, limits: WorkerLimits = None):
+        self.__max_workers = max(1, max_workers)
+        self.__limits = limits or WorkerLimits()
+        if self.__limits.memory_limit is not None and resource is None:
+            LOGGER.warning("The memory limit of the workers is not supported on this platform")
+        self.__workers = []
+        self.__tasks = deque()
+        self.__lock = threading.Lock()
+        self.__is_shut_down = False
+        self.__wakeup_reader, self.__wakeup_writer = Pipe(duplex=False)
+        self.__manager = threading.Thread(target=self.__manage, daemon=True)
+        self.__manager.start()
+
+    @property
+    def limits(self) -> WorkerLimits:
+        return self.__limits
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        with self.__lock:
+            if self.__is_shut_down:
+                raise RuntimeError("cannot schedule new tasks after shutdown")
+            self.__tasks.append((future, fn, args, kwargs))
+        self.__wake_up()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.__lock:
+            self.__is_shut_down = True
+            if cancel_futures:
+                while self.__tasks:
+                    future, _, _, _ = self.__tasks.popleft()
+                    future.cancel()
+        self.__wake_up()
+        if wait:
+            self.__manager.join()
+
+    def __wake_up(self):
+        with self.__lock:
+            self.__wakeup_writer.send_bytes(b'')
+
+    def __manage(self):
+        while True:
+            self.__dispatch()
+            busy_workers = [worker for worker in self.__workers if worker.is_busy]
+            with self.__lock:
+                if self.__is_shut_down and not self.__tasks and not busy_workers:
+                    break
+            waitables = [self.__wakeup_reader]
+            for worker in busy_workers:
+                waitables.extend((worker.connection, worker.process.sentinel))
+            ready = wait(waitables, self.__calc_wait_timeout(busy_workers))
+            while self.__wakeup_reader.poll():
+                self.__wakeup_reader.recv_bytes()
+            for worker in busy_workers:
+                if worker.connection in ready or worker.process.sentinel in ready:
+                    self.__collect(worker)
+            self.__enforce_deadlines()
+        for worker in self.__workers:
+            worker.retire()
+        self.__workers = []
+
+    def __dispatch(self):
+        while True:
+            with self.__lock:
+                if not self.__tasks:
+                    return
+                worker = self.__get_idle_worker()
+                if worker is None:
+                    return
+                future, fn, args, kwargs = self.__tasks.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.connection.send((fn, args, kwargs))
+            except Exception as err:
+                future.set_exception(err)
+                self.__discard(worker)
+                continue
+            worker.future = future
+            if self.__limits.timeout is not None:
+                worker.deadline = monotonic() + self.__limits.timeout
+
+    def __get_idle_worker(self) -> Union[None, _Worker]:
+        for worker in self.__workers:
+            if not worker.is_busy:
+                return worker
+        if len(self.__workers) < self.__max_workers:
+            worker = _Worker(self.__limits.memory_limit)
+            self.__workers.append(worker)
+            return worker
+        return None
+
+    def __calc_wait_timeout(self, busy_workers: List[_Worker]) -> Union[None, float]:
+        deadlines = [worker.deadline for worker in busy_workers if worker.deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - monotonic())
+
+    def __collect(self, worker: _Worker):
+        future = worker.future
+        worker.future = None
+        worker.deadline = None
+        try:
+            succeeded, value = worker.connection.recv()
+        except (EOFError, OSError):
+            worker.process.join()
+            future.set_exception(WorkerCrashedError("the worker has exited with code %s"
+                                                    % worker.process.exitcode))
+            self.__discard(worker)
+            return
+        worker.tasks_num += 1
+        if succeeded:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+        max_tasks = self.__limits.max_tasks_per_worker
+        if (isinstance(value, ReportMemoryLimitError)
+                or max_tasks is not None and worker.tasks_num >= max_tasks):
+            worker.retire()
+            self.__workers.remove(worker)
+
+    def __enforce_deadlines(self):
+        now = monotonic()
+        for worker in list(self.__workers):
+            if worker.is_busy and worker.deadline is not None and now >= worker.deadline:
+                future = worker.future
+                worker.future = None
+                future.set_exception(ReportTimeoutError("the report has not been parsed in %s s"
+                                                        % self.__limits.timeout))
+                self.__discard(worker)
+
+    def __discard(self, worker: _Worker):
+        worker.kill()
+        self.__workers.remove(worker)
+
+
+class RenewablePoolExecutor(Executor):
+    """
+    Process pool which is replaced with a new one once it is broken by a worker
+    which has died abruptly. The tasks pending in the broken pool fail with
+    a BrokenExecutor error, the tasks submitted after it go to the new pool.
+    """
+
+    def __init__(self, create_pool: Callable[[], Executor]):
+        self.__create_pool = create_pool
+        self.__pool = create_pool()
+        self.__lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self.__lock:
+            try:
+                return self.__pool.submit(fn, *args, **kwargs)
+            except BrokenExecutor:
+                LOGGER.warning("The pool of the workers is broken, it is replaced with a new one")
+                self.__pool.shutdown(wait=False)
+                self.__pool = self.__create_pool()
+                return self.__pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.__lock:
+            self.__pool.shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -0,0 +1,36 @@
+from src.file_process import BlockStore, ReportSpace
+from src.report_item import ReportBlock
+
+# the strings of the blocks of a report which has all its fields
+_STRINGS = {
+    ReportSpace.ALL: ["Page 1 of 1", "ABPM Report", "Physician: Dr House",
+                      "Study Date: 01.02.2020", "Readings", "Measurement period", "John Smith",
+                      "987654"],
+    ReportSpace.PATIENT: ["123456", "John Smith", "Male", "45 years", "01.01.1975"],
+    ReportSpace.DAY_NIGHT: ["Period", "Time", "07:00", "23:00", "Interval", "15 min", "30 min",
+                            "Awake - Asleep", "Awake: 07:00", "Asleep: 23:00", "BP Threshold",
+                            "Day: 135/85 mmHg", "Night: 120/70 mmHg"],
+    ReportSpace.READINGS_BP: ["Total Readings: 50", "45 (90%)", "BP Load", "Day 20%",
+                              "Night 10%"],
+    ReportSpace.AVG_BP: ["Average Blood Pressure"] + ["(%d)" % i for i in range(9)]
+                        + ["Sys", "120", "Dia", "80", "HR", "70", "24-h", "Awake", "125", "85",
+                           "72", "Asleep", "110", "70", "60"],
+    ReportSpace.WHITE_COAT_WINDOW: ["White Coat Window", "Night time dip %", "Readings",
+                                    "1st h Max", "Sys", "130", "140", "Dia", "85", "90",
+                                    "HR", "75", "80"],
+    ReportSpace.NIGHT_TIME_DIP: ["Night time dip %", "Sys", "12,5", "Dia", "10,0"],
+    ReportSpace.VALUES_1_COLUMN_SD: ["01.02.2020", "10:00", "10:15", "10:30", "120", "125",
+                                     "130", "80", "85", "90"],
+    ReportSpace.VALUES_1_COLUMN_HR: ["70", "72", "74"],
+}
+
+
+def create_blocks(patient_id: str = "123456") -> BlockStore:
+    """
+    Make up the blocks of a report as they are extracted from its file
+    :param patient_id: the ID of the patient of the report
+    """
+    blocks = {space.index: ReportBlock(list(strings)) for space, strings in _STRINGS.items()}
+    blocks[ReportSpace.PATIENT.index] = ReportBlock([patient_id]
+                                                    + _STRINGS[ReportSpace.PATIENT][1:])
+    return BlockStore(blocks)
@@ -0,0 +1,106 @@
+import os
+import random
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from src.block_cache import BlockCache
+from src.file_process import BlockStore, InputMode, ReportSpace
+from src.report_item import ReportBlock
+
+_SIZE_LIMIT = 1 << 20
+
+
+def _create_blocks(seed: int) -> BlockStore:
+    generator = random.Random(seed)
+    strings = ["%032x" % generator.getrandbits(128) for _ in range(64)]
+    return BlockStore({ReportSpace.PATIENT.index: ReportBlock(strings)})
+
+
+def _get_strings(blocks: BlockStore):
+    return list(blocks.get(ReportSpace.PATIENT))
+
+
+class TestBlockCache(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cache_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __create_cache(self, size_limit: int = _SIZE_LIMIT,
+                       layout_version: str = "v1") -> BlockCache:
+        return BlockCache(self.cache_dir, size_limit, layout_version)
+
+    def __get_entry_path(self, cache: BlockCache, digest: str) -> Path:
+        return Path(cache.dir, digest + ".blocks")
+
+    def testMissAndHit(self):
+        cache = self.__create_cache()
+        content = b"not a pdf"
+        digest = BlockCache.digest(content)
+        self.assertIsNone(cache.load(digest))
+        blocks = _create_blocks(0)
+        cache.store(digest, blocks)
+        self.assertEqual(_get_strings(blocks), _get_strings(cache.load(digest)))
+        # the content is not parsed on a hit, so it does not have to be a report
+        self.assertEqual(_get_strings(blocks), _get_strings(cache.extract_blocks(content)))
+
+    def testHitByPath(self):
+        cache = self.__create_cache()
+        content = b"not a pdf"
+        report_path = Path(self.temp_dir.name, "report.pdf")
+        report_path.write_bytes(content)
+        blocks = _create_blocks(0)
+        cache.store(BlockCache.digest(content), blocks)
+        for source in (report_path, str(report_path)):
+            for input_mode in InputMode:
+                self.assertEqual(_get_strings(blocks),
+                                 _get_strings(cache.extract_blocks(source, input_mode=input_mode)))
+
+    def testHitInAnotherInstance(self):
+        blocks = _create_blocks(0)
+        self.__create_cache().store("digest", blocks)
+        self.assertEqual(_get_strings(blocks), _get_strings(self.__create_cache().load("digest")))
+
+    def testLeastRecentlyUsedEntriesAreEvicted(self):
+        cache = self.__create_cache()
+        digests = ["entry%d" % i for i in range(4)]
+        for i, digest in enumerate(digests[:3]):
+            cache.store(digest, _create_blocks(i))
+            entry_time = 1000 * (i + 1)
+            os.utime(str(self.__get_entry_path(cache, digest)), (entry_time, entry_time))
+        sizes = [self.__get_entry_path(cache, digest).stat().st_size for digest in digests[:3]]
+        # the load makes the oldest entry the most recently used one
+        self.assertIsNotNone(cache.load(digests[0]))
+        # the entries are of about the same size, so the new entry exceeds the limit
+        # and the two entries used least recently have to go to get within the trimmed size
+        size_limit = int((sizes[0] + 1.5 * sizes[2]) / 0.9)
+        cache = self.__create_cache(size_limit)
+        cache.store(digests[3], _create_blocks(3))
+        self.assertIsNotNone(cache.load(digests[0]))
+        self.assertIsNone(cache.load(digests[1]))
+        self.assertIsNone(cache.load(digests[2]))
+        self.assertIsNotNone(cache.load(digests[3]))
+
+    def testCorruptEntryIsDropped(self):
+        cache = self.__create_cache()
+        cache.store("digest", _create_blocks(0))
+        entry_path = self.__get_entry_path(cache, "digest")
+        with open(str(entry_path), "r+b") as entry_file:
+            entry_file.truncate(entry_path.stat().st_size // 2)
+        self.assertIsNone(cache.load("digest"))
+        self.assertFalse(entry_path.exists())
+
+    def testLayoutVersionChangeInvalidatesEntries(self):
+        old_cache = self.__create_cache(layout_version="v1")
+        old_cache.store("digest", _create_blocks(0))
+        new_cache = self.__create_cache(layout_version="v2")
+        self.assertIsNone(new_cache.load("digest"))
+        self.assertFalse(old_cache.dir.exists())
+
+    def testDefaultLayoutVersion(self):
+        cache = BlockCache(self.cache_dir, _SIZE_LIMIT)
+        self.assertEqual(ReportSpace.version(), cache.dir.name)
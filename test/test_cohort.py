@@ -0,0 +1,147 @@
+import itertools
+import random
+from typing import Union
+from unittest import TestCase
+
+import numpy as np
+
+from src.cohort import UNKNOWN_CLASS, CohortClassifier
+from src.patient import EMPTY_VALUE_STR, Patient
+from src.report_item import ReportItemKey
+from src.report_values import ReportValues
+
+Value = Union[str, float]
+
+
+def _classify_phenotype(avg_awake_systolic: Value, first_hour_systolic: Value,
+                        norm: float = 135, difference_norm: float = 10) -> int:
+    # the classification of one patient the patients used to have, a missing average
+    # gives the unknown class as well
+    if EMPTY_VALUE_STR in (avg_awake_systolic, first_hour_systolic):
+        return UNKNOWN_CLASS
+    diff = abs(avg_awake_systolic - first_hour_systolic)
+    if avg_awake_systolic < norm and first_hour_systolic < norm and diff < difference_norm:
+        return 1
+    elif avg_awake_systolic < norm and first_hour_systolic < norm and diff >= difference_norm:
+        return 2
+    elif (avg_awake_systolic >= norm or first_hour_systolic >= norm) and diff < difference_norm:
+        return 3
+    elif avg_awake_systolic >= norm > first_hour_systolic and diff >= difference_norm:
+        return 4
+    elif avg_awake_systolic < norm <= first_hour_systolic and diff >= difference_norm:
+        return 5
+    elif avg_awake_systolic >= norm and first_hour_systolic >= norm and diff >= difference_norm:
+        return 6
+
+
+def _classify_profile(dip: Value, dip_bounds=(0., 10., 20.)) -> int:
+    if dip == EMPTY_VALUE_STR:
+        return UNKNOWN_CLASS
+    reverse_dipper_bound, non_dipper_bound, dipper_bound = dip_bounds
+    if non_dipper_bound < dip <= dipper_bound:
+        return 1
+    elif reverse_dipper_bound < dip <= non_dipper_bound:
+        return 2
+    elif dip <= reverse_dipper_bound:
+        return 3
+    elif dipper_bound < dip:
+        return 4
+
+
+def _to_float(value: Value) -> float:
+    return np.nan if value == EMPTY_VALUE_STR else value
+
+
+class _ParsedReport(object):
+    # has the fields of a parsed report a patient is made of
+
+    def __init__(self, avg_awake_systolic: Value, first_hour_systolic: Value, dip: Value):
+        self.name = "report"
+        self.patient_id = "000001"
+        self.patient_name = "Name Surname"
+        self.patient_date_of_birth = "01.02.1950"
+        self.avg_bp = {key: {period: 120 for period in (ReportItemKey.TWENTY_FOUR_HOURS,
+                                                        ReportItemKey.AWAKE,
+                                                        ReportItemKey.ASLEEP)}
+                       for key in (ReportItemKey.SYSTOLIC, ReportItemKey.DIASTOLIC,
+                                   ReportItemKey.HEART_RATE)}
+        self.avg_bp[ReportItemKey.SYSTOLIC][ReportItemKey.AWAKE] = avg_awake_systolic
+        self.white_coat_window = {ReportItemKey.SYSTOLIC: {ReportItemKey.READINGS: 4,
+                                                           ReportItemKey.FIRST_HOUR:
+                                                               first_hour_systolic}}
+        self.night_time_dip = {ReportItemKey.SYSTOLIC: {ReportItemKey.DIP: dip}}
+        self.values = ReportValues.of_column(np.arange(0, 60, 15).astype('datetime64[m]'),
+                                             [120, 130, 140, 125])
+
+
+class TestCohortClassifier(TestCase):
+
+    # the values on the norms and the bounds and just around them
+    _SYSTOLIC = [EMPTY_VALUE_STR, 100, 124, 124.5, 125, 125.5, 126, 134, 134.5, 135, 135.5, 136,
+                 144, 144.5, 145, 145.5, 146, 170]
+    _DIPS = [EMPTY_VALUE_STR, -15., -0.5, -0., 0., 0.5, 9.5, 10., 10.5, 19.5, 20., 20.5, 35.]
+
+    def setUp(self):
+        self.classifier = CohortClassifier()
+
+    def testPhenotypesOnEdges(self):
+        pairs = list(itertools.product(TestCohortClassifier._SYSTOLIC, repeat=2))
+        phenotypes = self.classifier.classify_phenotypes(
+            [_to_float(avg) for avg, _ in pairs], [_to_float(first) for _, first in pairs])
+        self.assertEqual([_classify_phenotype(*pair) for pair in pairs], phenotypes.tolist())
+
+    def testProfilesOnEdges(self):
+        dips = TestCohortClassifier._DIPS
+        profiles = self.classifier.classify_profiles([_to_float(dip) for dip in dips])
+        self.assertEqual([_classify_profile(dip) for dip in dips], profiles.tolist())
+
+    def testOtherNormsAndBounds(self):
+        generator = random.Random(0)
+        classifier = CohortClassifier(140, 5, (-5., 5., 15.))
+        avg = [generator.choice([EMPTY_VALUE_STR, generator.randint(120, 160)])
+               for _ in range(1000)]
+        first = [generator.choice([EMPTY_VALUE_STR, generator.randint(120, 160)])
+                 for _ in range(1000)]
+        dips = [generator.choice([EMPTY_VALUE_STR, generator.randint(-10, 20) / 2])
+                for _ in range(1000)]
+        phenotypes = classifier.classify_phenotypes([_to_float(value) for value in avg],
+                                                    [_to_float(value) for value in first])
+        self.assertEqual([_classify_phenotype(*pair, norm=140, difference_norm=5)
+                          for pair in zip(avg, first)], phenotypes.tolist())
+        profiles = classifier.classify_profiles([_to_float(dip) for dip in dips])
+        self.assertEqual([_classify_profile(dip, (-5., 5., 15.)) for dip in dips],
+                         profiles.tolist())
+
+    def testMaskedAndNotNumbersAreUnknown(self):
+        avg = np.ma.MaskedArray([130., 130., np.nan, 150.], mask=[False, True, False, False])
+        first = np.ma.MaskedArray([130., 130., 130., 150.], mask=[False, False, False, True])
+        self.assertEqual([1, UNKNOWN_CLASS, UNKNOWN_CLASS, UNKNOWN_CLASS],
+                         self.classifier.classify_phenotypes(avg, first).tolist())
+        dips = np.ma.MaskedArray([15., 15., np.nan], mask=[False, True, False])
+        self.assertEqual([1, UNKNOWN_CLASS, UNKNOWN_CLASS],
+                         self.classifier.classify_profiles(dips).tolist())
+
+    def testAgreesWithPatients(self):
+        systolic = TestCohortClassifier._SYSTOLIC
+        dips = TestCohortClassifier._DIPS
+        reports = [_ParsedReport(avg, first, dips[i % len(dips)])
+                   for i, (avg, first) in enumerate(itertools.product(systolic, repeat=2))]
+        patients = [Patient(report) for report in reports]
+        phenotypes = self.classifier.classify_phenotypes(
+            [_to_float(report.avg_bp[ReportItemKey.SYSTOLIC][ReportItemKey.AWAKE])
+             for report in reports],
+            [_to_float(report.white_coat_window[ReportItemKey.SYSTOLIC][
+                           ReportItemKey.FIRST_HOUR]) for report in reports])
+        profiles = self.classifier.classify_profiles(
+            [_to_float(report.night_time_dip[ReportItemKey.SYSTOLIC][ReportItemKey.DIP])
+             for report in reports])
+        self.assertEqual([patient.blood_pressure_phenotype for patient in patients],
+                         phenotypes.tolist())
+        self.assertEqual([patient.blood_pressure_profile for patient in patients],
+                         profiles.tolist())
+
+    def testWrongArguments(self):
+        with self.assertRaises(ValueError):
+            CohortClassifier(dip_bounds=(10., 0., 20.))
+        with self.assertRaises(ValueError):
+            self.classifier.classify_phenotypes([130., 140.], [130.])
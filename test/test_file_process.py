@@ -0,0 +1,93 @@
+import random
+from typing import Dict, List
+from unittest import TestCase
+
+import numpy as np
+from pdfminer.layout import LTComponent
+
+from src.file_process import ReportBlockCoordinates, ReportSpace, ReportSpaceTable
+
+
+def _define_block_keys(item: LTComponent) -> List[int]:
+    # the search of the spaces one by one, which the table has to agree with
+    keys = [ReportSpace.ALL.index]
+    if ReportSpace.VALUES.includes_item(item):
+        keys.append(ReportSpace.VALUES.index)
+        for value_column_space in ReportSpaceTable.VALUE_COLUMN_SPACES:
+            if value_column_space.includes_item(item):
+                keys.append(value_column_space.index)
+                break
+        return keys
+    for block_space in ReportSpaceTable.COMPLEX_VALUES_BLOCK_SPACES:
+        if block_space.includes_item(item):
+            keys.append(block_space.index)
+            break
+    return keys
+
+
+def _includes_item(coordinates: Dict[ReportSpace, ReportBlockCoordinates],
+                   space: ReportSpace, item: LTComponent) -> bool:
+    return ReportSpace._corresponds_to_borders(coordinates[space], tuple(item.bbox))
+
+
+def _random_bbox(generator: random.Random) -> tuple:
+    x0 = generator.uniform(0, 560)
+    y0 = generator.uniform(0, 760)
+    return x0, y0, x0 + generator.expovariate(1 / 40), y0 + generator.expovariate(1 / 10)
+
+
+def _boundary_bboxes() -> List[tuple]:
+    # the boxes on the borders of the spaces and just beyond them
+    bboxes = []
+    for space in ReportSpace:
+        x0, y0, x1, y1 = space.coordinates
+        for delta in (-0.5, 0., 0.5):
+            bboxes.append((x0 + delta, y0 + delta, x1 - delta, y1 - delta))
+            bboxes.append((x0 + delta, y0, x0 + 1, y0 + 1))
+            bboxes.append((x1 - 1, y1 - 1, x1 + delta, y1 + delta))
+    return bboxes
+
+
+class TestReportSpaceTable(TestCase):
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.bboxes = [_random_bbox(generator) for _ in range(5000)] + _boundary_bboxes()
+        self.items = [LTComponent(bbox) for bbox in self.bboxes]
+
+    def testKeysAgreeWithSequentialSearch(self):
+        keys = ReportSpaceTable().define_blocks_keys(np.array(self.bboxes))
+        self.assertEqual([_define_block_keys(item) for item in self.items], keys)
+
+    def testInclusionsAgreeWithSpaces(self):
+        coordinates = {space: space.coordinates for space in ReportSpace}
+        spaces = ([ReportSpace.VALUES] + ReportSpaceTable.VALUE_COLUMN_SPACES
+                  + ReportSpaceTable.COMPLEX_VALUES_BLOCK_SPACES)
+        inclusions = ReportSpaceTable(coordinates).includes_items(np.array(self.bboxes))
+        expected = [[_includes_item(coordinates, space, item) for space in spaces]
+                    for item in self.items]
+        self.assertEqual(expected, inclusions.tolist())
+
+    def testFirstOverlappingSpaceWins(self):
+        coordinates = {space: space.coordinates for space in ReportSpace}
+        # the second column and the day and night space cover the ones after them entirely
+        coordinates[ReportSpace.VALUES_2_COLUMN_SD] = (140, 80, 560, 380)
+        coordinates[ReportSpace.DAY_NIGHT] = (50, 380, 560, 635)
+        table = ReportSpaceTable(coordinates)
+        bboxes = [(150, 100, 160, 110), (300, 100, 310, 110), (540, 100, 545, 110),
+                  (100, 400, 110, 410), (300, 400, 310, 410), (500, 390, 510, 400),
+                  (300, 700, 310, 710)]
+        expected = [[ReportSpace.ALL.index, ReportSpace.VALUES.index,
+                     ReportSpace.VALUES_1_COLUMN_HR.index],
+                    [ReportSpace.ALL.index, ReportSpace.VALUES.index,
+                     ReportSpace.VALUES_2_COLUMN_SD.index],
+                    [ReportSpace.ALL.index, ReportSpace.VALUES.index,
+                     ReportSpace.VALUES_2_COLUMN_SD.index],
+                    [ReportSpace.ALL.index, ReportSpace.DAY_NIGHT.index],
+                    [ReportSpace.ALL.index, ReportSpace.DAY_NIGHT.index],
+                    [ReportSpace.ALL.index, ReportSpace.DAY_NIGHT.index],
+                    [ReportSpace.ALL.index]]
+        self.assertEqual(expected, table.define_blocks_keys(np.array(bboxes)))
+
+    def testNoItems(self):
+        self.assertEqual([], ReportSpaceTable().define_blocks_keys(np.empty((0, 4))))
@@ -0,0 +1,124 @@
+import json
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from src.manifest import ReportOutcome, RunManifest
+
+
+class _ParsedReport(object):
+    # stands in for a report, the manifest only completes it, pickles it
+    # and asks if it has succeeded
+
+    def __init__(self, name: str, success: bool = True):
+        self.name = name
+        self.success = success
+
+    def parse_all(self):
+        pass
+
+
+class TestRunManifest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.manifest_dir = Path(self.temp_dir.name, "manifest")
+        self.reports_dir = Path(self.temp_dir.name, "reports")
+        self.reports_dir.mkdir()
+        self.manifest_path = Path(self.manifest_dir, "manifest.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __write_report(self, name: str, content: bytes) -> Path:
+        path = Path(self.reports_dir, name + ".pdf")
+        path.write_bytes(content)
+        return path
+
+    def __count_lines(self) -> int:
+        with open(str(self.manifest_path), encoding='utf-8') as manifest_file:
+            return sum(1 for _ in manifest_file)
+
+    def testRestoreParsedReport(self):
+        path = self.__write_report("first", b"first")
+        RunManifest(self.manifest_dir).record(path, _ParsedReport("first"))
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual(ReportOutcome.PARSED, manifest.entries[str(path)].outcome)
+        self.assertEqual("first", manifest.restore(path).name)
+
+    def testReportsWhichAreNotRestored(self):
+        failed_path = self.__write_report("failed", b"failed")
+        changed_path = self.__write_report("changed", b"changed")
+        new_path = self.__write_report("new", b"new")
+        manifest = RunManifest(self.manifest_dir)
+        manifest.record(failed_path, None)
+        manifest.record(changed_path, _ParsedReport("changed"))
+        changed_path.write_bytes(b"changed again")
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual(ReportOutcome.FAILED, manifest.entries[str(failed_path)].outcome)
+        self.assertIsNone(manifest.restore(failed_path))
+        self.assertIsNone(manifest.restore(changed_path))
+        self.assertIsNone(manifest.restore(new_path))
+
+    def testReportsOfSameContent(self):
+        first_path = self.__write_report("first", b"same")
+        second_path = self.__write_report("second", b"same")
+        manifest = RunManifest(self.manifest_dir)
+        manifest.record(first_path, _ParsedReport("first"))
+        manifest.record(second_path, _ParsedReport("second"))
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual("first", manifest.restore(first_path).name)
+        self.assertEqual("second", manifest.restore(second_path).name)
+
+    def testChangedReportDropsPreviousResult(self):
+        path = self.__write_report("first", b"first")
+        manifest = RunManifest(self.manifest_dir)
+        manifest.record(path, _ParsedReport("first"))
+        path.write_bytes(b"first changed")
+        manifest.record(path, _ParsedReport("first"))
+        self.assertEqual(1, len(list(Path(self.manifest_dir, "results").iterdir())))
+        self.assertEqual("first", RunManifest(self.manifest_dir).restore(path).name)
+
+    def testOtherLayoutVersionIsNotRestored(self):
+        path = self.__write_report("first", b"first")
+        RunManifest(self.manifest_dir, "v1").record(path, _ParsedReport("first"))
+        self.assertIsNone(RunManifest(self.manifest_dir, "v2").restore(path))
+
+    def testTouchedButUnchangedReport(self):
+        path = self.__write_report("first", b"first")
+        RunManifest(self.manifest_dir).record(path, _ParsedReport("first"))
+        mtime = path.stat().st_mtime_ns + 10 ** 9
+        os.utime(str(path), ns=(mtime, mtime))
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual("first", manifest.restore(path).name)
+        # the new modification time is remembered, so the report is not hashed again
+        self.assertEqual(mtime, RunManifest(self.manifest_dir).entries[str(path)].mtime)
+
+    def testTruncatedLastLine(self):
+        first_path = self.__write_report("first", b"first")
+        second_path = self.__write_report("second", b"second")
+        manifest = RunManifest(self.manifest_dir)
+        manifest.record(first_path, _ParsedReport("first"))
+        manifest.record(second_path, _ParsedReport("second"))
+        # the run has been interrupted while the last line was written
+        with open(str(self.manifest_path), "r+b") as manifest_file:
+            manifest_file.truncate(self.manifest_path.stat().st_size - 10)
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual([str(first_path)], list(manifest.entries))
+        manifest.record(second_path, _ParsedReport("second"))
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual("first", manifest.restore(first_path).name)
+        self.assertEqual("second", manifest.restore(second_path).name)
+
+    def testCompaction(self):
+        path = self.__write_report("first", b"first")
+        manifest = RunManifest(self.manifest_dir)
+        for _ in range(5):
+            manifest.record(path, _ParsedReport("first"))
+        self.assertEqual(5, self.__count_lines())
+        manifest = RunManifest(self.manifest_dir)
+        self.assertEqual(1, self.__count_lines())
+        with open(str(self.manifest_path), encoding='utf-8') as manifest_file:
+            self.assertEqual(str(path), json.loads(manifest_file.readline())["path"])
+        self.assertEqual("first", manifest.restore(path).name)
@@ -0,0 +1,125 @@
+import csv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Iterator, List
+from unittest import TestCase
+
+from src.manifest import RunManifest
+from src.pipeline import ReportPipeline
+from src.quarantine import Quarantine
+from src.report import Report
+from src.report_archive import ReportArchive
+from src.report_logging import ReportsStatistics
+from src.report_source import ReportSource
+from test.report_fixture import create_blocks
+
+_REPORTS_NUM = 12
+# the rows of the header of the table
+_HEADER_ROWS_NUM = 3
+
+
+class _ReportBuilder(object):
+    # builds the reports from the blocks of the fixture, the later reports are built faster,
+    # so they are done before the earlier ones
+
+    def __init__(self):
+        self.built_names = []
+        self.__lock = threading.Lock()
+
+    def build(self, report_source: ReportSource, complete: bool = False) -> Report:
+        index = int(report_source.name[len("report"):])
+        time.sleep(0.005 * (_REPORTS_NUM - index))
+        with self.__lock:
+            self.built_names.append(report_source.name)
+        if report_source.name.endswith("3"):
+            raise ValueError("the report can not be parsed")
+        report = Report(report_source.name, create_blocks("%06d" % index))
+        if complete:
+            report.parse_all()
+        return report
+
+
+def _fail_after(paths: List[Path], paths_num: int) -> Iterator[Path]:
+    yield from paths[:paths_num]
+    raise OSError("the folder has become unavailable")
+
+
+class TestReportPipeline(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        root_dir = Path(self.temp_dir.name)
+        self.output_dir = Path(root_dir, "output")
+        self.archive_path = Path(root_dir, "reports.archive")
+        self.manifest_dir = Path(root_dir, "manifest")
+        self.quarantine_path = Path(root_dir, "quarantine.json")
+        reports_dir = Path(root_dir, "reports")
+        reports_dir.mkdir()
+        self.reports_paths = []
+        for index in range(_REPORTS_NUM):
+            path = Path(reports_dir, "report%02d.pdf" % index)
+            path.write_bytes(b"report %d" % index)
+            self.reports_paths.append(path)
+        self.report_builder = _ReportBuilder()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __run(self, reports_paths, manifest: RunManifest = None, quarantine: Quarantine = None):
+        statistics = ReportsStatistics.of_number(len(self.reports_paths))
+        with ThreadPoolExecutor(4) as executor:
+            pipeline = ReportPipeline(self.report_builder, executor, 3, manifest, quarantine,
+                                      self.archive_path, table_flush_interval=2)
+            sizes_of_groups, table_path = pipeline.run(reports_paths, statistics,
+                                                       self.output_dir, "output")
+        return statistics, sizes_of_groups, table_path
+
+    @staticmethod
+    def __read_ids(table_path: Path) -> List[str]:
+        with open(str(table_path), encoding='utf-8', newline='') as table_file:
+            rows = list(csv.reader(table_file))
+        return [row[0] for row in rows[_HEADER_ROWS_NUM:]]
+
+    def __expected_ids(self) -> List[str]:
+        return ["'%06d'" % index for index in range(_REPORTS_NUM) if index % 10 != 3]
+
+    def testRowsFollowListingOrder(self):
+        statistics, sizes_of_groups, table_path = self.__run(self.reports_paths)
+        self.assertEqual(self.__expected_ids(), self.__read_ids(table_path))
+        self.assertEqual(_REPORTS_NUM - 1, statistics.number_of_successes)
+        self.assertEqual(_REPORTS_NUM - 1, sum(sizes_of_groups))
+        archive = ReportArchive(self.archive_path)
+        self.assertEqual([path.stem for path in self.reports_paths if not path.stem.endswith("3")],
+                         [report.name for report in archive])
+        # the later reports have been built first, so the rows have been put in order
+        self.assertNotEqual(sorted(self.report_builder.built_names),
+                            self.report_builder.built_names)
+
+    def testFailingStageCancelsOthers(self):
+        with self.assertRaises(OSError):
+            self.__run(_fail_after(self.reports_paths, 5))
+        self.assertFalse(self.archive_path.exists())
+        self.assertEqual([], [path for path in self.archive_path.parent.iterdir()
+                              if path.name.startswith(self.archive_path.name)])
+        # the reports after the failure are not built
+        self.assertLessEqual(len(self.report_builder.built_names), 5)
+
+    def testManifestRestoresReports(self):
+        self.__run(self.reports_paths, RunManifest(self.manifest_dir))
+        self.report_builder.built_names.clear()
+        statistics, _, table_path = self.__run(self.reports_paths, RunManifest(self.manifest_dir))
+        # only the failed report is built again
+        self.assertEqual(["report03"], self.report_builder.built_names)
+        self.assertEqual(self.__expected_ids(), self.__read_ids(table_path))
+        self.assertEqual(_REPORTS_NUM - 1, statistics.number_of_successes)
+
+    def testQuarantinedReportsAreSkipped(self):
+        quarantine = Quarantine(self.quarantine_path)
+        quarantine.add(self.reports_paths[0], "the report has taken too long")
+        statistics, _, table_path = self.__run(self.reports_paths, quarantine=quarantine)
+        self.assertNotIn("report00", self.report_builder.built_names)
+        self.assertEqual(self.__expected_ids()[1:], self.__read_ids(table_path))
+        self.assertEqual(_REPORTS_NUM - 2, statistics.number_of_successes)
@@ -0,0 +1,171 @@
+import random
+import struct
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Union
+from unittest import TestCase
+
+import numpy as np
+
+from src.cohort import UNKNOWN_CLASS, CohortClassifier
+from src.patient import EMPTY_VALUE_STR
+# noinspection PyProtectedMember
+from src.report_archive import (_AVG_KEYS, _NIGHT_TIME_DIP_KEYS, _STRING_FIELDS, _VALUES_KEYS,
+                                _WHITE_COAT_WINDOW_KEYS, FORMAT_VERSION, ReportArchive,
+                                ReportArchiveWriter)
+from src.report_item import ReportItemKey
+from src.report_values import ReportValues
+
+
+class _ParsedReport(object):
+    # has the fields of a parsed report which are archived
+
+    def __init__(self, generator: random.Random, index: int):
+        strings = ["report %d" % index, "%06d" % index, "Ім'я Прізвище", "01.02.1950", ""]
+        for field, string in zip(_STRING_FIELDS, strings):
+            setattr(self, field, None if generator.random() < 0.2 else string)
+        self.avg_bp = self.__create_table(generator, _VALUES_KEYS, _AVG_KEYS)
+        self.white_coat_window = self.__create_table(generator, _VALUES_KEYS,
+                                                     _WHITE_COAT_WINDOW_KEYS)
+        self.night_time_dip = {
+            row_key: {ReportItemKey.DIP: generator.choice([EMPTY_VALUE_STR, float('nan'),
+                                                           generator.uniform(-10, 30)])}
+            for row_key in _NIGHT_TIME_DIP_KEYS}
+        self.success = generator.random() < 0.8
+        values_num = generator.randint(0, 20)
+        start = generator.randint(0, 10 ** 7)
+        self.values = ReportValues(
+            np.arange(start, start + 15 * values_num, 15).astype('datetime64[m]'),
+            *[np.ma.MaskedArray([generator.randint(40, 250) for _ in range(values_num)],
+                                mask=[generator.random() < 0.2 for _ in range(values_num)],
+                                dtype=np.int16)
+              for _ in _VALUES_KEYS])
+
+    @staticmethod
+    def __create_table(generator: random.Random, row_keys, column_keys) -> dict:
+        # the values are either missing from the table or empty if they have not been parsed
+        return {row_key: {column_key: generator.choice([generator.randint(40, 250),
+                                                        EMPTY_VALUE_STR])
+                          for column_key in column_keys if generator.random() < 0.9}
+                for row_key in row_keys if generator.random() < 0.9}
+
+
+def _expected_table(table: dict, row_keys, column_keys) -> dict:
+    return {row_key: {column_key: table.get(row_key, {}).get(column_key, EMPTY_VALUE_STR)
+                      for column_key in column_keys}
+            for row_key in row_keys}
+
+
+def _expected_dips(report: _ParsedReport) -> dict:
+    # the dips which are not numbers are restored as the empty value as well
+    table = {}
+    for row_key in _NIGHT_TIME_DIP_KEYS:
+        dip = report.night_time_dip[row_key][ReportItemKey.DIP]
+        if isinstance(dip, float) and np.isnan(dip):
+            dip = EMPTY_VALUE_STR
+        table[row_key] = {ReportItemKey.DIP: dip}
+    return table
+
+
+def _masked_to_list(values: np.ma.MaskedArray) -> List[Union[None, int]]:
+    return values.astype(object).filled(None).tolist()
+
+
+class TestReportArchive(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.archive_path = Path(self.temp_dir.name, "reports.archive")
+        generator = random.Random(0)
+        self.reports = [_ParsedReport(generator, index) for index in range(50)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def testRoundTrip(self):
+        ReportArchive.write(self.archive_path, self.reports)
+        archive = ReportArchive(self.archive_path)
+        self.assertEqual(len(self.reports), len(archive))
+        for report, archived_report in zip(self.reports, archive):
+            for field in _STRING_FIELDS:
+                self.assertEqual(getattr(report, field), getattr(archived_report, field))
+            self.assertEqual(report.success, archived_report.success)
+            self.assertEqual(_expected_table(report.avg_bp, _VALUES_KEYS, _AVG_KEYS),
+                             archived_report.avg_bp)
+            self.assertEqual(_expected_table(report.white_coat_window, _VALUES_KEYS,
+                                             _WHITE_COAT_WINDOW_KEYS),
+                             archived_report.white_coat_window)
+            self.assertEqual(_expected_dips(report), archived_report.night_time_dip)
+            self.assertEqual(report.values.datetimes.tolist(),
+                             archived_report.values.datetimes.tolist())
+            for column, archived_column in zip(
+                    (report.values.systolic_blood_pressures,
+                     report.values.diastolic_blood_pressures, report.values.heart_rates),
+                    (archived_report.values.systolic_blood_pressures,
+                     archived_report.values.diastolic_blood_pressures,
+                     archived_report.values.heart_rates)):
+                self.assertEqual(_masked_to_list(column), _masked_to_list(archived_column))
+        self.assertEqual([report.patient_id for report in self.reports],
+                         archive.read_strings("patient_id"))
+        self.assertEqual(sum(len(report.values) for report in self.reports),
+                         len(archive.values))
+
+    def testNegativeIndex(self):
+        ReportArchive.write(self.archive_path, self.reports)
+        archive = ReportArchive(self.archive_path)
+        self.assertEqual(self.reports[-1].name, archive[-1].name)
+        with self.assertRaises(IndexError):
+            archive[len(self.reports)]
+
+    def testClassify(self):
+        ReportArchive.write(self.archive_path, self.reports)
+        classifier = CohortClassifier()
+        phenotypes, profiles = ReportArchive(self.archive_path).classify(classifier)
+        for report, phenotype, profile in zip(self.reports, phenotypes, profiles):
+            avg_awake = report.avg_bp.get(ReportItemKey.SYSTOLIC, {}).get(ReportItemKey.AWAKE)
+            first_hour = report.white_coat_window.get(ReportItemKey.SYSTOLIC, {}).get(
+                ReportItemKey.FIRST_HOUR)
+            if not isinstance(avg_awake, int) or not isinstance(first_hour, int):
+                self.assertEqual(UNKNOWN_CLASS, phenotype)
+            else:
+                self.assertEqual(classifier.classify_phenotypes([avg_awake], [first_hour])[0],
+                                 phenotype)
+            dip = _expected_dips(report)[ReportItemKey.SYSTOLIC][ReportItemKey.DIP]
+            if dip == EMPTY_VALUE_STR:
+                self.assertEqual(UNKNOWN_CLASS, profile)
+            else:
+                self.assertEqual(classifier.classify_profiles([dip])[0], profile)
+
+    def testEmptyArchive(self):
+        ReportArchive.write(self.archive_path, [])
+        archive = ReportArchive(self.archive_path)
+        self.assertEqual(0, len(archive))
+        self.assertEqual([], list(archive))
+        self.assertEqual(0, len(archive.values))
+
+    def testDiscardedWriterLeavesNoArchive(self):
+        with self.assertRaises(RuntimeError):
+            with ReportArchiveWriter(self.archive_path) as writer:
+                writer.add_all(self.reports)
+                raise RuntimeError()
+        self.assertEqual([], list(self.archive_path.parent.iterdir()))
+
+    def testWrongMagic(self):
+        ReportArchive.write(self.archive_path, self.reports)
+        with open(str(self.archive_path), "r+b") as archive_file:
+            archive_file.write(b"NOTARCH\0")
+        with self.assertRaises(ValueError):
+            ReportArchive(self.archive_path)
+
+    def testWrongVersion(self):
+        ReportArchive.write(self.archive_path, self.reports)
+        with open(str(self.archive_path), "r+b") as archive_file:
+            archive_file.seek(8)
+            archive_file.write(struct.pack("<I", FORMAT_VERSION + 1))
+        with self.assertRaises(ValueError):
+            ReportArchive(self.archive_path)
+
+    def testTooShortFile(self):
+        self.archive_path.write_bytes(b"WCH")
+        with self.assertRaises(ValueError):
+            ReportArchive(self.archive_path)
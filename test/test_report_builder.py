@@ -0,0 +1,41 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from src.block_cache import BlockCache
+from src.report_builder import ReportBuilder
+from src.report_source import ReportSource
+from test.report_fixture import create_blocks
+
+_CONTENT = b"not a pdf"
+
+
+class TestReportBuilder(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        # the blocks are taken from the cache, so the content is not parsed as a PDF
+        block_cache = BlockCache(Path(self.temp_dir.name), 1 << 20)
+        block_cache.store(BlockCache.digest(_CONTENT), create_blocks())
+        self.report_builder = ReportBuilder(block_cache)
+        self.source = ReportSource("reports/report.pdf", "report", _CONTENT, len(_CONTENT), 0)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def testFieldsAreParsedAsTheyAreRead(self):
+        report = self.report_builder.build(self.source)
+        self.assertEqual("report", report.name)
+        self.assertNotIn("avg_bp", vars(report))
+        avg_bp = report.avg_bp
+        self.assertIn("avg_bp", vars(report))
+        # the values, the success and the message are parsed together
+        self.assertNotIn("_values_success_message", vars(report))
+        self.assertEqual(avg_bp, self.report_builder.build(self.source, complete=True).avg_bp)
+
+    def testCompleteReport(self):
+        report = self.report_builder.build(self.source, complete=True)
+        for field in ("title", "avg_bp", "white_coat_window", "night_time_dip",
+                      "_values_success_message"):
+            self.assertIn(field, vars(report))
+        self.assertTrue(report.success)
@@ -0,0 +1,133 @@
+import random
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from src.patient import EMPTY_VALUE_STR
+from src.report_dataframe import PatientDataFrame, PatientTableWriter
+from src.report_values import ReportValues
+
+
+class _Patient(object):
+    # has the fields of a patient which go to the table
+
+    def __init__(self, generator: random.Random, index: int):
+        self.report_name = "report %d" % index
+        self.id = "%06d" % (index % 50)
+        self.name = "Name, \"Surname\" %d" % index
+        self.date_of_birth = "01.02.19%02d" % (index % 100)
+        self.blood_pressure_phenotype = generator.randint(0, 6)
+        self.blood_pressure_profile = generator.randint(0, 4)
+        self.last_hour_max_systolic_blood_pressure = generator.choice(
+            [None, generator.randint(100, 200)])
+        # noinspection PyProtectedMember
+        for field in PatientDataFrame._AVG_FIELDS + (
+                "first_hour_of_white_coat_window_systolic_blood_pressure",):
+            setattr(self, field, generator.choice([EMPTY_VALUE_STR, generator.randint(50, 200)]))
+        values_num = generator.randint(20, 120)
+        start = np.datetime64('2020-01-01T08:00') + np.timedelta64(generator.randint(-3, 5) * 15,
+                                                                   'm')
+        steps = [generator.choice([15, 15, 15, 30, 7]) for _ in range(values_num)]
+        datetimes = start + np.cumsum(steps).astype('timedelta64[m]')
+        self.values = ReportValues.of_column(
+            datetimes, *[None if generator.random() < 0.05
+                         else [generator.randint(40, 220) for _ in range(values_num)]
+                         for _ in range(3)])
+        for column in (self.values.systolic_blood_pressures,
+                       self.values.diastolic_blood_pressures):
+            column[[generator.random() < 0.1 for _ in range(values_num)]] = np.ma.masked
+        self.measures_datetimes = self.values.datetimes
+
+
+class _ShortPatient(object):
+    # has the values of a patient in one hour of the day only
+
+    def __init__(self):
+        self.report_name = "report"
+        self.id = "000001"
+        self.name = "Name Surname"
+        self.date_of_birth = "01.02.1950"
+        self.blood_pressure_phenotype = 1
+        self.blood_pressure_profile = 0
+        self.last_hour_max_systolic_blood_pressure = None
+        # noinspection PyProtectedMember
+        for field in PatientDataFrame._AVG_FIELDS + (
+                "first_hour_of_white_coat_window_systolic_blood_pressure",):
+            setattr(self, field, 120)
+        self.values = ReportValues.of_column(
+            np.datetime64('2020-01-01T10:00') + np.arange(0, 60, 15).astype('timedelta64[m]'),
+            [120, 130, 125, 135], [80, 85, 80, 90], [60, 61, 62, 63])
+        self.measures_datetimes = self.values.datetimes
+
+
+def _read(path: Path) -> str:
+    return path.read_text(encoding='utf-8')
+
+
+class TestPatientTableWriter(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+        generator = random.Random(0)
+        self.patients = [_Patient(generator, index) for index in range(60)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __save_frame(self, patients) -> str:
+        PatientDataFrame(patients).save_csv(self.output_dir, "frame")
+        return _read(next(Path(self.output_dir, "tables").glob("frame_*.csv")))
+
+    def testSameAsFrame(self):
+        with PatientTableWriter(self.output_dir, "table", flush_interval=7) as writer:
+            for start in range(0, len(self.patients), 9):
+                writer.write(self.patients[start:start + 9])
+            writer.write([])
+        self.assertEqual(len(self.patients), writer.rows_num)
+        self.assertEqual(self.__save_frame(self.patients), _read(writer.output_path))
+
+    def testBaselineRow(self):
+        # the cells the table has always had, the MSDs of fewer than two values are written as 0
+        with PatientTableWriter(self.output_dir, "table") as writer:
+            writer.write([_ShortPatient()])
+        row = _read(writer.output_path).splitlines()[-1].split(',')
+        self.assertEqual(["000001", "Name Surname", "01.02.1950", "1", EMPTY_VALUE_STR,
+                          EMPTY_VALUE_STR] + ["120"] * 6, row[:12])
+        self.assertEqual(["10.606601717798213"] * 3 + ["0"] * 2
+                         + ["8.660254037844387"] * 3 + ["0"] * 2, row[-10:])
+
+    def testNoPatients(self):
+        with PatientTableWriter(self.output_dir, "table") as writer:
+            pass
+        self.assertEqual(0, writer.rows_num)
+        self.assertEqual(self.__save_frame([]), _read(writer.output_path))
+
+    def testFlushInterval(self):
+        with PatientTableWriter(self.output_dir, "table", flush_interval=5) as writer:
+            header = _read(writer.output_path)
+            self.assertTrue(header)
+            writer.write(self.patients[:4])
+            self.assertEqual(header, _read(writer.output_path))
+            writer.write(self.patients[4:5])
+            flushed = _read(writer.output_path)
+            self.assertEqual(header.count('\n') + 5, flushed.count('\n'))
+            writer.write(self.patients[5:6])
+            self.assertEqual(flushed, _read(writer.output_path))
+
+    def testRowsRemainAfterFailure(self):
+        with self.assertRaises(RuntimeError):
+            with PatientTableWriter(self.output_dir, "table", flush_interval=100) as writer:
+                writer.write(self.patients[:10])
+                raise RuntimeError()
+        self.assertEqual(self.__save_frame(self.patients[:10]), _read(writer.output_path))
+
+    def testExistingTableIsNotOverwritten(self):
+        with PatientTableWriter(self.output_dir, "table") as first_writer:
+            first_writer.write(self.patients[:1])
+        with PatientTableWriter(self.output_dir, "table") as second_writer:
+            second_writer.write(self.patients[1:2])
+        self.assertNotEqual(first_writer.output_path, second_writer.output_path)
+        self.assertEqual(self.__save_frame(self.patients[:1]), _read(first_writer.output_path))
@@ -0,0 +1,92 @@
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from src.report_source import ReportSourceCollection
+from src.util.paths import Extension
+
+_CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+# the offsets of the flags and of the name in the central directory header of a member
+_CENTRAL_HEADER_FLAGS_OFFSET = 8
+_CENTRAL_HEADER_NAME_OFFSET = 46
+
+
+def _mark_encrypted(archive_path: Path, member_name: str):
+    # the member is not encrypted, but it is read as if it were
+    data = bytearray(archive_path.read_bytes())
+    header_start = data.find(_CENTRAL_HEADER_SIGNATURE)
+    while header_start >= 0:
+        name_start = header_start + _CENTRAL_HEADER_NAME_OFFSET
+        if data[name_start:name_start + len(member_name)] == member_name.encode():
+            data[header_start + _CENTRAL_HEADER_FLAGS_OFFSET] |= 1
+        header_start = data.find(_CENTRAL_HEADER_SIGNATURE, header_start + 1)
+    archive_path.write_bytes(bytes(data))
+
+
+class TestReportSourceCollection(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.reports_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __read(self):
+        collection = ReportSourceCollection(self.reports_dir, Extension.PDF)
+        return collection, {source.name: source for source in collection}
+
+    def testFilesAndArchives(self):
+        Path(self.reports_dir, "file.pdf").write_bytes(b"file")
+        with zipfile.ZipFile(str(Path(self.reports_dir, "reports.zip")), "w") as archive:
+            archive.writestr("zip.pdf", b"zip")
+            archive.writestr("notes.txt", b"notes")
+        with tarfile.open(str(Path(self.reports_dir, "reports.tar.gz")), "w:gz") as archive:
+            info = tarfile.TarInfo("tar.pdf")
+            info.size = 3
+            info.mtime = 1000
+            archive.addfile(info, io.BytesIO(b"tar"))
+        collection = ReportSourceCollection(self.reports_dir, Extension.PDF)
+        # the compressed TAR is not counted before it is streamed
+        self.assertIsNone(collection.length)
+        sources = {source.name: source for source in collection}
+        self.assertEqual(3, collection.length)
+        self.assertEqual(["file", "tar", "zip"], sorted(sources))
+        self.assertEqual(b"tar", sources["tar"].data)
+        self.assertEqual(1000 * 10 ** 9, sources["tar"].mtime)
+        self.assertEqual(os.path.join(str(Path(self.reports_dir, "reports.zip")), "zip.pdf"),
+                         sources["zip"].key)
+
+    def testMalformedMemberDate(self):
+        archive_path = Path(self.reports_dir, "reports.zip")
+        with zipfile.ZipFile(str(archive_path), "w") as archive:
+            archive.writestr(zipfile.ZipInfo("bad_date.pdf", date_time=(2020, 1, 0, 0, 0, 0)),
+                             b"bad date")
+            archive.writestr(zipfile.ZipInfo("good.pdf", date_time=(2020, 1, 2, 0, 0, 0)),
+                             b"good")
+        collection, sources = self.__read()
+        self.assertEqual(["bad_date", "good"], sorted(sources))
+        # the member falls back to the modification time of its archive
+        self.assertEqual(archive_path.stat().st_mtime_ns, sources["bad_date"].mtime)
+        self.assertEqual(b"bad date", sources["bad_date"].data)
+
+    def testEncryptedMemberIsSkipped(self):
+        archive_path = Path(self.reports_dir, "reports.zip")
+        with zipfile.ZipFile(str(archive_path), "w") as archive:
+            archive.writestr("first.pdf", b"first")
+            archive.writestr("encrypted.pdf", b"encrypted")
+            archive.writestr("last.pdf", b"last")
+        _mark_encrypted(archive_path, "encrypted.pdf")
+        collection, sources = self.__read()
+        self.assertEqual(["first", "last"], sorted(sources))
+        self.assertEqual(2, collection.length)
+
+    def testBrokenArchiveIsSkipped(self):
+        Path(self.reports_dir, "file.pdf").write_bytes(b"file")
+        Path(self.reports_dir, "broken.zip").write_bytes(b"not an archive")
+        collection, sources = self.__read()
+        self.assertEqual(["file"], sorted(sources))
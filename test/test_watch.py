@@ -0,0 +1,51 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from src.util.paths import Extension
+from src.watch import ReportFolderWatcher
+
+
+class TestReportFolderWatcher(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.reports_dir = Path(self.temp_dir.name)
+        self.watcher = ReportFolderWatcher(self.reports_dir, Extension.PDF)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __write_report(self, name: str, content: bytes) -> Path:
+        path = Path(self.reports_dir, name + ".pdf")
+        path.write_bytes(content)
+        return path
+
+    def testReportIsReadyOnceItStaysTheSame(self):
+        path = self.__write_report("first", b"first")
+        self.assertEqual(([], []), self.watcher.poll())
+        self.assertEqual(([path], []), self.watcher.poll())
+        self.assertEqual(([], []), self.watcher.poll())
+
+    def testChangedReport(self):
+        path = self.__write_report("first", b"first")
+        self.watcher.poll()
+        self.watcher.poll()
+        path.write_bytes(b"first changed")
+        self.assertEqual(([], []), self.watcher.poll())
+        self.assertEqual(([path], []), self.watcher.poll())
+
+    def testRemovedReport(self):
+        first_path = self.__write_report("first", b"first")
+        second_path = self.__write_report("second", b"second")
+        self.watcher.poll()
+        self.watcher.poll()
+        first_path.unlink()
+        self.assertEqual(([], [first_path]), self.watcher.poll())
+        self.assertEqual(([], []), self.watcher.poll())
+        # the report which has not been reported yet is not reported as removed either
+        third_path = self.__write_report("third", b"third")
+        self.watcher.poll()
+        third_path.unlink()
+        second_path.unlink()
+        self.assertEqual(([], [second_path]), self.watcher.poll())
@@ -0,0 +1,107 @@
+import os
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from functools import partial
+from unittest import TestCase, skipIf
+
+from src.worker_pool import (GuardedProcessPoolExecutor, RenewablePoolExecutor,
+                             ReportMemoryLimitError, ReportTimeoutError, WorkerCrashedError,
+                             WorkerLimits, resource)
+
+_MEMORY_LIMIT = 1024 ** 3
+
+
+# the tasks are sent to the workers, so they are defined at the module level
+
+def _get_pid(_: int = 0) -> int:
+    return os.getpid()
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _fail(message: str):
+    raise ValueError(message)
+
+
+def _allocate(bytes_num: int) -> int:
+    return len(bytearray(bytes_num))
+
+
+def _run_out_of_memory():
+    raise MemoryError()
+
+
+def _exit(code: int):
+    os._exit(code)
+
+
+class TestGuardedProcessPoolExecutor(TestCase):
+
+    def testResultsAndErrors(self):
+        with GuardedProcessPoolExecutor(2) as executor:
+            self.assertEqual([0.0, 0.01], [executor.submit(_sleep, seconds).result()
+                                           for seconds in (0.0, 0.01)])
+            with self.assertRaisesRegex(ValueError, "wrong"):
+                executor.submit(_fail, "wrong").result()
+
+    def testTimeout(self):
+        with GuardedProcessPoolExecutor(1, WorkerLimits(timeout=0.5)) as executor:
+            pid = executor.submit(_get_pid).result()
+            start = time.monotonic()
+            with self.assertRaises(ReportTimeoutError):
+                executor.submit(_sleep, 30).result()
+            self.assertLess(time.monotonic() - start, 10)
+            # the killed worker is replaced
+            self.assertNotEqual(pid, executor.submit(_get_pid).result())
+
+    @skipIf(resource is None, "the resource limits are not supported")
+    def testMemoryLimit(self):
+        with GuardedProcessPoolExecutor(1, WorkerLimits(memory_limit=_MEMORY_LIMIT)) as executor:
+            pid = executor.submit(_get_pid).result()
+            self.assertEqual(1024, executor.submit(_allocate, 1024).result())
+            with self.assertRaises(ReportMemoryLimitError):
+                executor.submit(_allocate, 2 * _MEMORY_LIMIT).result()
+            self.assertNotEqual(pid, executor.submit(_get_pid).result())
+
+    def testMemoryErrorWithoutMemoryLimit(self):
+        with GuardedProcessPoolExecutor(1, WorkerLimits(timeout=30)) as executor:
+            with self.assertRaises(ReportMemoryLimitError):
+                executor.submit(_run_out_of_memory).result()
+
+    def testCrash(self):
+        with GuardedProcessPoolExecutor(1) as executor:
+            with self.assertRaises(WorkerCrashedError):
+                executor.submit(_exit, 3).result()
+            self.assertEqual(1.0, executor.submit(_sleep, 1.0).result())
+
+    def testRetirement(self):
+        with GuardedProcessPoolExecutor(1, WorkerLimits(max_tasks_per_worker=2)) as executor:
+            pids = [executor.submit(_get_pid, i).result() for i in range(4)]
+        self.assertEqual(pids[0], pids[1])
+        self.assertEqual(pids[2], pids[3])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def testShutdownCancelsPendingTasks(self):
+        executor = GuardedProcessPoolExecutor(1)
+        running_future = executor.submit(_sleep, 0.5)
+        while not running_future.running():
+            time.sleep(0.01)
+        pending_futures = [executor.submit(_sleep, 0.5) for _ in range(3)]
+        executor.shutdown(cancel_futures=True)
+        self.assertEqual(0.5, running_future.result())
+        self.assertTrue(all(future.cancelled() for future in pending_futures))
+        with self.assertRaises(RuntimeError):
+            executor.submit(_get_pid)
+
+
+class TestRenewablePoolExecutor(TestCase):
+
+    def testBrokenPoolIsReplaced(self):
+        with RenewablePoolExecutor(partial(ProcessPoolExecutor, max_workers=1)) as executor:
+            pid = executor.submit(_get_pid).result()
+            with self.assertRaises(BrokenExecutor):
+                executor.submit(_exit, 3).result()
+            self.assertNotEqual(pid, executor.submit(_get_pid).result())
@@ -1,12 +1,16 @@
+import random
+import re
+from typing import List, Union
 from unittest import TestCase
 
+from src.report_item import ReportBlock, ReportItemPattern
 from src.util import collections
-from src.util.collections import ReportBlock, Block
+from src.util.collections import Block
 
 
 class TestBlocks(TestCase):
 
-    _TWO_THREE_DIGITS_NUM_PATTERN = r"^\d{2,3}$"
+    _TWO_THREE_DIGITS_NUM_PATTERN = ReportItemPattern.TWO_THREE_DIGITS_NUM
 
     def testAreEqual(self):
         a = [1, 2, 3]
@@ -36,9 +40,10 @@ class TestBlocks(TestCase):
     def testSearchFirstOccurrenceByPattern(self):
         strings = ["john", "doe", "56", "alex"]
         block = ReportBlock(strings)
-        actual = block.search_first_occurrence_by_pattern(TestBlocks._TWO_THREE_DIGITS_NUM_PATTERN)
+        index, report_string = block.search_first_occurrence_by_pattern(
+            TestBlocks._TWO_THREE_DIGITS_NUM_PATTERN)
         expected = 2, "56"
-        self.assertTrue(collections.are_equal(expected, actual))
+        self.assertEqual(expected, (index, str(report_string)))
 
     def testReplaceByIndex(self):
         strings = ["john", "doe", "56", "alex"]
@@ -71,8 +76,8 @@ class TestBlocks(TestCase):
 
     def testSearchSequenceByHeaderPattern(self):
         strings = ["john", "cindy", "alex", "56"]
-        header = "names"
-        header_pattern = "^%s$" % header
+        header = "Readings"
+        header_pattern = ReportItemPattern.READINGS
         strings = [header] + strings
         block = ReportBlock(strings)
         sequence_start_index = 1
@@ -84,6 +89,136 @@ class TestBlocks(TestCase):
     def testSearchAmongNeighbors(self):
         strings = ["names", "john", "cindy", "alex", "56"]
         block = ReportBlock(strings)
-        actual = block.search_among_neighbors(3, TestBlocks._TWO_THREE_DIGITS_NUM_PATTERN)
+        index, report_string = block.search_among_neighbors(
+            3, TestBlocks._TWO_THREE_DIGITS_NUM_PATTERN)
         expected = (4, strings[4])
-        self.assertTrue(collections.are_equal(expected, actual))
+        self.assertEqual(expected, (index, str(report_string)))
+
+
+def _matches(string: str, pattern: ReportItemPattern) -> bool:
+    return re.search(pattern.value, string) is not None
+
+
+def _search_first(strings: List[str], pattern: ReportItemPattern) -> Union[None, int]:
+    return next((i for i, string in enumerate(strings) if _matches(string, pattern)), None)
+
+
+class TestReportBlockAgainstList(TestCase):
+    """
+    The block removes its strings with tombstones and resumes its searches from the cursors,
+    a plain list which is searched from the start every time has to give the same results
+    """
+
+    _STRINGS = ["12", "123", "1234", "7", "99\n", "Sys", "Dia", "HR", "Readings", "Report",
+                "abc", ""]
+    _PATTERNS = [ReportItemPattern.TWO_THREE_DIGITS_NUM, ReportItemPattern.START_NUM,
+                 ReportItemPattern.PATIENT_ID, ReportItemPattern.SYSTOLIC,
+                 ReportItemPattern.HEART_RATE, ReportItemPattern.READINGS,
+                 ReportItemPattern.TITLE]
+    _STEPS_NUM = 200
+    _RUNS_NUM = 100
+
+    def setUp(self):
+        self.generator = random.Random(0)
+
+    def testRandomOperations(self):
+        for _ in range(TestReportBlockAgainstList._RUNS_NUM):
+            strings = [self.__random_string()
+                       for _ in range(self.generator.randint(0, 40))]
+            block = ReportBlock(strings[:])
+            for _ in range(TestReportBlockAgainstList._STEPS_NUM):
+                self.__step(block, strings)
+                self.assertEqual(len(strings), len(block))
+                self.assertEqual(strings, list(block))
+                for index, (position, _) in enumerate(block._iter_positions()):
+                    self.assertEqual(index, block._to_index(position))
+            self.assertEqual(strings, block.inner_list)
+
+    def __random_string(self) -> str:
+        return self.generator.choice(TestReportBlockAgainstList._STRINGS)
+
+    def __random_pattern(self) -> ReportItemPattern:
+        return self.generator.choice(TestReportBlockAgainstList._PATTERNS)
+
+    def __step(self, block: ReportBlock, strings: List[str]):
+        generator = self.generator
+        pattern = self.__random_pattern()
+        found_index = _search_first(strings, pattern)
+        operation = generator.randrange(10)
+        if operation == 0:
+            index, report_string = block.search_first_occurrence_by_pattern(pattern)
+            self.assertEqual(found_index, index)
+            self.assertEqual("" if index is None else strings[index], str(report_string))
+        elif operation == 1:
+            report_string = block.search_first_occurrence_by_pattern_and_remove(pattern)
+            expected = ""
+            if found_index is not None:
+                expected = strings.pop(found_index)
+            self.assertEqual(expected, str(report_string))
+        elif operation == 2 and found_index is not None:
+            replacement = self.__random_string()
+            report_string = block.search_first_occurrence_by_pattern_and_replace(pattern,
+                                                                                replacement)
+            self.assertEqual(strings[found_index], str(report_string))
+            strings[found_index] = replacement
+        elif operation == 3 and strings:
+            # the replacement may match the patterns whose searches have gone past it
+            index = generator.randrange(-len(strings), len(strings))
+            replacement = self.__random_string()
+            block.replace_by_index(index, replacement)
+            strings[index] = replacement
+        elif operation == 4 and strings:
+            index = generator.randrange(-len(strings), len(strings))
+            block.remove_by_index(index)
+            del strings[index]
+        elif operation == 5:
+            start_index = generator.randint(-len(strings) - 2, len(strings) + 2)
+            finish_index = generator.randint(-len(strings) - 2, len(strings) + 2)
+            block.remove_by_indices(start_index, finish_index)
+            del strings[start_index:finish_index]
+        elif operation == 6 and strings:
+            index = generator.randrange(len(strings))
+            self.assertEqual(strings[index], block[index])
+            self.assertEqual(strings[index], str(block.get_report_string(index)))
+        elif operation == 7 and strings:
+            self.__check_neighbors(block, strings, generator.randrange(len(strings)), pattern)
+        elif operation == 8 and found_index is not None:
+            sequence_length = generator.randint(0, 4)
+            sequence = strings[found_index + 1:found_index + 1 + sequence_length]
+            if generator.random() < 0.5:
+                header, actual = block.search_sequence_by_header_pattern(pattern,
+                                                                         sequence_length)
+                self.assertEqual(strings[found_index], header)
+            else:
+                actual = block.search_sequence_by_header_pattern_and_remove(pattern,
+                                                                            sequence_length)
+                del strings[found_index:found_index + 1 + sequence_length]
+            self.assertEqual(sequence, actual)
+        elif operation == 9:
+            # the compaction moves the cursors back along with the strings
+            self.assertEqual(strings, block.inner_list)
+
+    def __check_neighbors(self, block: ReportBlock, strings: List[str], item_index: int,
+                          pattern: ReportItemPattern):
+        # the left neighbor goes first, the index of the last checked one is given
+        # if none matches
+        expected_index, expected_string, removed = None, "", None
+        for neighbor_index, removed_start in ((item_index - 1, item_index - 1),
+                                              (item_index + 1, item_index)):
+            if not 0 <= neighbor_index < len(strings):
+                continue
+            expected_index = neighbor_index
+            if _matches(strings[neighbor_index], pattern):
+                expected_string = strings[neighbor_index]
+                removed = removed_start
+                break
+            expected_string = None
+        if self.generator.random() < 0.5:
+            index, report_string = block.search_among_neighbors(item_index, pattern)
+            self.assertEqual(expected_index, index)
+        else:
+            report_string = block.search_among_neighbors_and_remove(item_index, pattern)
+            if removed is not None:
+                del strings[removed:removed + 2]
+        self.assertEqual(expected_string,
+                         None if report_string is None else str(report_string))
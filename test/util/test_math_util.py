@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.util import math_util as mutil
+
+
+class TestMsdRows(TestCase):
+
+    def testRowsAreTheSameAsMsd(self):
+        rows = [[120, 125, 135, 130, 140], [80, 95, 85, 90, 70]]
+        expected = [mutil.msd(row) for row in rows]
+        np.testing.assert_allclose(expected, mutil.msd_rows(np.array(rows)))
+
+    def testMissingValuesAreSkipped(self):
+        rows = np.array([[120, np.nan, 135, 130, np.nan, 140]])
+        self.assertAlmostEqual(mutil.msd([120, 135, 130, 140]), mutil.msd_rows(rows)[0])
+
+    def testShortRows(self):
+        rows = np.array([[np.nan, np.nan, np.nan], [120, np.nan, np.nan], [120, 130, np.nan]])
+        msds = mutil.msd_rows(rows)
+        self.assertEqual([0, 0], msds[:2].tolist())
+        self.assertTrue(np.isnan(msds[2]))
+
+    def testNoRows(self):
+        self.assertEqual((0,), mutil.msd_rows(np.empty((0, 4))).shape)
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.util import partition
+
+
+class TestPartition(TestCase):
+
+    def testPairsOfParts(self):
+        pieces = partition.partition_into_column_pair([3, 3, 5, 5], (3, 5))
+        expected = [(0, 0, 1, False), (1, 0, 1, False), (2, 1, 2, False), (3, 1, 2, False)]
+        self.assertEqual(expected, pieces)
+
+    def testDoubleGroupsAndSkippedGroups(self):
+        pieces = partition.partition_into_column_pair([1, 4, 2, 6, 3], (2, 3))
+        expected = [(1, 0, 1, True), (3, 1, 2, True)]
+        self.assertEqual(expected, pieces)
+
+    def testColumnOfSeveralParts(self):
+        pieces = partition.partition_into_column_pair([2, 4, 3, 9], (2, 4, 3))
+        expected = [(0, 0, 1, False), (1, 1, 2, False), (2, 2, 3, False), (3, 0, 3, False)]
+        self.assertEqual(expected, pieces)
+
+    def testEqualPartsArePaired(self):
+        pieces = partition.partition_into_column_pair([2, 2, 2, 2], (2, 2))
+        expected = [(0, 0, 1, False), (1, 0, 1, False), (2, 1, 2, False), (3, 1, 2, False)]
+        self.assertEqual(expected, pieces)
+
+    def testMismatch(self):
+        self.assertIsNone(partition.partition_into_column_pair([2, 3, 4], (2, 2)))
+
+    def testMergeByMean(self):
+        groups = [np.array([80, 85]), np.array([130, 135]),
+                  np.array([140, 145, 150, 90, 95, 100]), np.array([7])]
+        pieces = partition.partition_into_column_pair([len(group) for group in groups], (2, 3))
+        systolic, diastolic = partition.merge_column_pair(groups, pieces)
+        self.assertEqual([130, 135, 140, 145, 150], systolic.tolist())
+        self.assertEqual([80, 85, 90, 95, 100], diastolic.tolist())
+
+    def testMergeColumnOfSeveralParts(self):
+        groups = [np.array([120, 125, 130]), np.array([80, 85]), np.array([90, 95, 75]),
+                  np.array([110, 115])]
+        pieces = partition.partition_into_column_pair([len(group) for group in groups], (3, 2))
+        systolic, diastolic = partition.merge_column_pair(groups, pieces)
+        self.assertEqual([120, 125, 130, 110, 115], systolic.tolist())
+        self.assertEqual([90, 95, 75, 80, 85], diastolic.tolist())
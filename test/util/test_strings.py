@@ -1,6 +1,8 @@
+import random
+import re
 from unittest import TestCase
 
-from src.util.strings import ReportString
+from src.report_item import ReportItemClassifier, ReportItemPattern, ReportString, match_pattern
 from src.util import collections
 
 
@@ -16,8 +18,9 @@ class TestReportString(TestCase):
         self.assertEqual(expected, actual)
 
     def testMatches(self):
-        pattern = "B[a-z]+ P[a-z]+"
-        self.__report_str.matches(pattern)
+        pattern = ReportItemPattern.PATIENT_NAME
+        self.assertEqual(self.__str, self.__report_str.matches(pattern))
+        self.assertIsNone(self.__report_str.matches(ReportItemPattern.TITLE))
 
     def testAsValue(self):
         value_str = "120 mm"
@@ -46,3 +49,40 @@ class TestReportString(TestCase):
             actual = report_str.cut_header(len(start))
         expected = "Pressure"
         self.assertEqual(expected, actual)
+
+
+class TestReportItemClassifier(TestCase):
+    """
+    The combined matcher and the prechecks have to give what a search of each pattern gives
+    """
+
+    # the pieces of the labels and the values of the reports, the digits of other scripts
+    # and the newlines are where the lookaheads and the prechecks could go wrong
+    _PIECES = ["Report", "report", "Physician", "Readings", "readings", "Total ", "Sys", "Dia",
+               "HR", "Awake", "Asleep", "wake", "sleep", "Date", "/", "Time", "Dip", "dip",
+               "%", "Night", "1st", "h", "Max", "Page", " of ", "BP Load", "break", "Female",
+               "Male", "(", ")", ",", ".", ":", "-", "24-h", "1", "23", "456", "7890", "0",
+               "\u0663", "\uff15", " ", "\t", "\n", "a", "A", "_"]
+    _STRINGS_NUM = 10000
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.strings = ["".join(generator.choice(TestReportItemClassifier._PIECES)
+                                for _ in range(generator.randint(0, 6)))
+                        for _ in range(TestReportItemClassifier._STRINGS_NUM)]
+
+    def testAgreesWithSearch(self):
+        classifier = ReportItemClassifier(cache_size=0)
+        for string in self.strings:
+            tags = classifier.classify(string)
+            for pattern in ReportItemPattern:
+                found = re.search(pattern.as_string(), string)
+                expected = None if found is None else found.group()
+                self.assertEqual(expected, tags.get(pattern), (string, pattern))
+                self.assertEqual(expected, match_pattern(string, pattern), (string, pattern))
+
+    def testCachedTagsAreTheSame(self):
+        classifier = ReportItemClassifier(cache_size=16)
+        uncached_classifier = ReportItemClassifier(cache_size=0)
+        for string in self.strings[:1000] + self.strings[:1000]:
+            self.assertEqual(uncached_classifier.classify(string), classifier.classify(string))
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.util import math_util as mutil
+from src.util.windows import WindowIndex
+
+
+def _minutes(*minutes: int) -> np.ndarray:
+    return np.array(minutes, dtype=np.int64).astype('datetime64[m]')
+
+
+class TestWindowIndex(TestCase):
+
+    def setUp(self):
+        times = _minutes(0, 15, 30, 45, 60, 75, 90)
+        values = np.ma.MaskedArray([120, 140, 110, 150, 130, 125, 135],
+                                   mask=[False, False, False, True, False, False, False])
+        self.windows = WindowIndex(times, values)
+
+    def testWholeSeries(self):
+        self.assertEqual(6, self.windows.count())
+        self.assertEqual(140, self.windows.max())
+        self.assertEqual(110, self.windows.min())
+        self.assertAlmostEqual(mutil.mean([120, 140, 110, 130, 125, 135]), self.windows.mean())
+
+    def testClosedWindow(self):
+        start, end = np.datetime64(15, 'm'), np.datetime64(60, 'm')
+        self.assertEqual((1, 4), self.windows.bounds(start, end))
+        self.assertEqual(3, self.windows.count(start, end))
+        self.assertEqual(140, self.windows.max(start, end))
+        self.assertEqual(110, self.windows.min(start, end))
+        self.assertEqual(380, self.windows.sum(start, end))
+
+    def testOpenWindow(self):
+        self.assertEqual(135, self.windows.max(np.datetime64(80, 'm')))
+        self.assertEqual(120, self.windows.min(end=np.datetime64(10, 'm')))
+
+    def testEmptyWindow(self):
+        start, end = np.datetime64(46, 'm'), np.datetime64(59, 'm')
+        self.assertEqual(0, self.windows.count(start, end))
+        self.assertIsNone(self.windows.max(start, end))
+        self.assertIsNone(self.windows.mean(start, end))
+        self.assertEqual(0, self.windows.msd(start, end))
+
+    def testMsd(self):
+        self.assertAlmostEqual(mutil.msd([120, 140, 110, 130, 125, 135]), self.windows.msd())
+        start = np.datetime64(30, 'm')
+        self.assertAlmostEqual(mutil.msd([110, 130, 125, 135]), self.windows.msd(start))
+
+    def testUnsortedTimes(self):
+        windows = WindowIndex(_minutes(30, 0, 15), np.array([3, 1, 2]))
+        self.assertEqual([1, 2, 3], windows.values.tolist())
+        self.assertEqual(2, windows.max(end=np.datetime64(20, 'm')))